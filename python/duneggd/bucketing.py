@@ -0,0 +1,495 @@
+#!/usr/bin/env python
+'''
+Split the daughters of crowded volumes into intermediate mother boxes.
+
+Geant4 builds its smart voxels over the daughters of every volume at
+initialization; the time and memory this takes grows quickly for mothers
+with thousands of daughters. bucket_daughters() groups the daughters of
+such box volumes spatially and moves each group into an unrotated box of
+the material of the mother, sized to the bounding box of the group, so
+that no volume keeps more than max_daughters daughters.
+
+The groups come from recursive cuts by planes along the axes, each cut
+balancing the two sides while crossing as few daughters as possible:
+rows, columns and superstructures of a regular layout end up together.
+The daughters crossing a cut stay in the mother, and the boxes must miss
+them: the components of their union solids (the web and flanges of a
+beam) rather than their bounding boxes, so that the blocks set between
+the flanges of a beam can still be moved. Daughters that interlock, each
+reaching into the bounding box of the next, can not be split by boxes;
+bucket_daughters() warns about the volumes they keep over max_daughters.
+
+The moved placements keep their names, volumes and copy numbers and get
+a position relative to their box, so the world transforms of all the
+volumes are unchanged.
+The TPC and wire plane volumes, whose daughters LArSoft expects to find
+directly inside them, are left alone.
+'''
+
+import numpy as np
+
+from gegede import Quantity
+from duneggd.transforms import rotation_matrix, placement_transform
+from duneggd.wiretable import is_tpc, is_plane
+
+
+def shape_bounds(shapes, structure, name):
+    '''
+    (low, high) corners in cm of a box containing the shape in its own
+    frame, or None for shapes it does not know.
+    '''
+    shape = shapes[name]
+    typename = type(shape).__name__
+    # a subtraction or intersection fits in its first solid
+    while typename in ('Subtraction', 'Intersection') or \
+          (typename == 'Boolean' and shape.type != 'union'):
+        shape = shapes[shape.first]
+        typename = type(shape).__name__
+    def cm(q):
+        return q.to('cm').magnitude
+    def half(x, y, z):
+        h = np.array([x, y, z], dtype=float)
+        return -h, h
+
+    if typename == 'Box':
+        return half(cm(shape.dx), cm(shape.dy), cm(shape.dz))
+    if typename in ('Tubs', 'EllipticalTube'):
+        r = cm(shape.rmax) if typename == 'Tubs' else max(cm(shape.dx), cm(shape.dy))
+        return half(r, r, cm(shape.dz))
+    if typename == 'CutTubs':
+        r = cm(shape.rmax)
+        return half(r, r, cm(shape.dz) + r)
+    if typename == 'Cone':
+        r = max(cm(shape.rmax1), cm(shape.rmax2))
+        return half(r, r, cm(shape.dz))
+    if typename == 'Sphere':
+        r = cm(shape.rmax)
+        return half(r, r, r)
+    if typename == 'Torus':
+        r = cm(shape.rtor) + cm(shape.rmax)
+        return half(r, r, cm(shape.rmax))
+    if typename == 'Trapezoid':
+        return half(max(cm(shape.dx1), cm(shape.dx2)), max(cm(shape.dy1), cm(shape.dy2)),
+                    cm(shape.dz))
+    if typename == 'TwistedBox':
+        r = np.hypot(cm(shape.dx), cm(shape.dy))
+        return half(r, r, cm(shape.dz))
+    if typename in ('Union', 'Boolean', 'MultiUnion'):
+        if typename == 'MultiUnion':
+            parts = list(zip(shape.solids, shape.positions, shape.rotations))
+        else:
+            parts = [(shape.first, None, None), (shape.second, shape.pos, shape.rot)]
+        return union_bounds(shapes, structure, parts)
+    return None
+
+def union_bounds(shapes, structure, parts):
+    '''
+    Bounds of the union of the (solid, position, rotation) parts.
+    '''
+    lows, highs = [], []
+    for solid, pos, rot in parts:
+        bounds = shape_bounds(shapes, structure, solid)
+        if bounds is None:
+            return None
+        lo, hi = bounds
+        center = np.zeros(3)
+        if pos:
+            p = structure[pos]
+            center = np.array([p.x.to('cm').magnitude, p.y.to('cm').magnitude,
+                               p.z.to('cm').magnitude])
+        if rot:
+            # the box of the rotated component, for either sense of the
+            # rotation, around the half sizes of its bounds
+            r = np.abs(rotation_matrix(structure[rot]))
+            h = np.maximum(np.abs(lo), np.abs(hi))
+            h = np.maximum(r @ h, r.T @ h)
+            lo, hi = -h, h
+        lows.append(center + lo)
+        highs.append(center + hi)
+    return np.min(lows, axis=0), np.max(highs, axis=0)
+
+def shape_parts(shapes, structure, name):
+    '''
+    List of (low, high) boxes in cm covering the shape in its own frame:
+    one per unrotated component of a union (e.g. the web and the flanges
+    of an I-beam), the bounds of the shape otherwise. None for shapes
+    shape_bounds() does not know.
+    '''
+    shape = shapes[name]
+    typename = type(shape).__name__
+    while typename in ('Subtraction', 'Intersection') or \
+          (typename == 'Boolean' and shape.type != 'union'):
+        shape = shapes[shape.first]
+        typename = type(shape).__name__
+    if typename not in ('Union', 'Boolean', 'MultiUnion'):
+        bounds = shape_bounds(shapes, structure, shape.name)
+        return None if bounds is None else [bounds]
+    if typename == 'MultiUnion':
+        components = list(zip(shape.solids, shape.positions, shape.rotations))
+    else:
+        components = [(shape.first, None, None), (shape.second, shape.pos, shape.rot)]
+    parts = []
+    for solid, pos, rot in components:
+        if rot:
+            # a rotated component keeps the box union_bounds() gives it
+            bounds = union_bounds(shapes, structure, [(solid, pos, rot)])
+            if bounds is None:
+                return None
+            parts.append(bounds)
+            continue
+        sub = shape_parts(shapes, structure, solid)
+        if sub is None:
+            return None
+        center = np.zeros(3)
+        if pos:
+            p = structure[pos]
+            center = np.array([q.to('cm').magnitude for q in (p.x, p.y, p.z)])
+        parts += [(lo + center, hi + center) for lo, hi in sub]
+    return parts
+
+def shape_hole(shapes, structure, name):
+    '''
+    (low, high) corners in cm of the largest box subtracted, unrotated,
+    from the shape (e.g. the inside of a shell), or None.
+    '''
+    best, volume = None, 0
+    shape = shapes[name]
+    while type(shape).__name__ == 'Subtraction' or \
+          (type(shape).__name__ == 'Boolean' and shape.type == 'subtraction'):
+        second = shapes[shape.second]
+        if type(second).__name__ == 'Box' and not shape.rot:
+            lo, hi = shape_bounds(shapes, structure, second.name)
+            if shape.pos:
+                p = structure[shape.pos]
+                center = np.array([q.to('cm').magnitude for q in (p.x, p.y, p.z)])
+                lo, hi = lo + center, hi + center
+            if np.prod(hi - lo) > volume:
+                best, volume = (lo, hi), np.prod(hi - lo)
+        shape = shapes[shape.first]
+    return best
+
+def transform_bounds(bounds, rot, trans):
+    '''
+    Axis aligned bounds of a box (low, high) after a rotation and translation.
+    '''
+    lo, hi = bounds
+    corners = np.array([[x, y, z] for x in (lo[0], hi[0])
+                        for y in (lo[1], hi[1]) for z in (lo[2], hi[2])])
+    corners = corners @ rot.T + trans
+    return corners.min(axis=0), corners.max(axis=0)
+
+def is_axis_aligned(rot, tolerance=1e-9):
+    '''
+    Whether the rotation maps the axes onto the axes.
+    '''
+    return np.all((np.abs(rot) < tolerance) | (np.abs(np.abs(rot) - 1) < tolerance))
+
+
+class Bucketer(object):
+    '''
+    Bounds of the volumes of a geometry and the bucketing of their daughters.
+    '''
+
+    def __init__(self, geom, max_daughters, tolerance=1e-9):
+        self.geom = geom
+        self.store = geom.store.structure
+        self.max_daughters = max_daughters
+        self.tolerance = tolerance
+        self._bounds = {}
+        self._holes = {}
+        self._parts = {}
+        self._transforms = {}
+        self._nboxes = {}
+
+    def volume_bounds(self, vname):
+        '''
+        Bounds of a volume in its frame, those of its daughters for an assembly.
+        '''
+        if vname not in self._bounds:
+            vol = self.store[vname]
+            if vol.shape:
+                bounds = shape_bounds(self.geom.store.shapes, self.store, vol.shape)
+            else:
+                daughters = [self.placement_bounds(p) for p in vol.placements]
+                if not daughters or any(b is None for b in daughters):
+                    bounds = None
+                else:
+                    bounds = (np.min([b[0][0] for b in daughters], axis=0),
+                              np.max([b[0][1] for b in daughters], axis=0))
+            self._bounds[vname] = bounds
+        return self._bounds[vname]
+
+    def volume_parts(self, vname):
+        '''
+        Boxes covering a volume in its frame (see shape_parts()), its
+        bounds for an assembly.
+        '''
+        if vname not in self._parts:
+            vol = self.store[vname]
+            if vol.shape:
+                parts = shape_parts(self.geom.store.shapes, self.store, vol.shape)
+            else:
+                bounds = self.volume_bounds(vname)
+                parts = None if bounds is None else [bounds]
+            self._parts[vname] = parts
+        return self._parts[vname]
+
+    def transform(self, place):
+        '''
+        placement_transform() of a placement, computed once: a moved
+        placement is a new record.
+        '''
+        if place not in self._transforms:
+            self._transforms[place] = placement_transform(self.store, place)
+        return self._transforms[place]
+
+    def placement_bounds(self, pname):
+        '''
+        Bounds and hole (or None) of a placement in the frame of its mother.
+        '''
+        place = self.store[pname]
+        bounds = self.volume_bounds(place.volume)
+        if bounds is None:
+            return None
+        rot, trans = self.transform(place)
+        vol = self.store[place.volume]
+        if vol.name not in self._holes:
+            self._holes[vol.name] = vol.shape and shape_hole(self.geom.store.shapes,
+                                                             self.store, vol.shape)
+        hole = self._holes[vol.name]
+        if hole is not None and is_axis_aligned(rot):
+            hole = transform_bounds(hole, rot, trans)
+        else:
+            hole = None
+        return transform_bounds(bounds, rot, trans), hole
+
+    def placement_parts(self, pname):
+        '''
+        Boxes covering a placement in the frame of its mother, or None.
+        '''
+        place = self.store[pname]
+        parts = self.volume_parts(place.volume)
+        if parts is None:
+            return None
+        rot, trans = self.transform(place)
+        return [transform_bounds(part, rot, trans) for part in parts]
+
+    def cut(self, lo, hi, index):
+        '''
+        Best plane cutting the items of index (rows of the lo and hi
+        bounds): the one that minimizes the size of the larger side plus
+        the number of items it crosses. Returns the indices below, above
+        and across it, or None.
+        '''
+        n = len(index)
+        best = None
+        for axis in range(3):
+            ilo, ihi = lo[index, axis], hi[index, axis]
+            slo, shi = np.sort(ilo), np.sort(ihi)
+            planes = np.unique(np.concatenate([slo, shi]))
+            below = np.searchsorted(shi, planes + self.tolerance, side='right')
+            above = n - np.searchsorted(slo, planes - self.tolerance, side='left')
+            ok = (below > 0) & (above > 0) & (below + above <= n)
+            if not ok.any():
+                continue
+            score = np.where(ok, n - np.minimum(below, above), n + 1)
+            i = int(np.argmin(score))
+            if best is None or score[i] < best[0]:
+                best = (score[i], axis, planes[i])
+        if best is None:
+            return None
+        score, axis, plane = best
+        below = hi[index, axis] <= plane + self.tolerance
+        above = ~below & (lo[index, axis] >= plane - self.tolerance)
+        return index[below], index[above], index[~below & ~above]
+
+    def missed(self, bounds, blo, bhi, obstacles):
+        '''
+        Whether the box from blo to bhi misses each obstacle, that is each
+        of its parts, or sits in its hole.
+        '''
+        lo, hi, hlo, hhi, plo, phi, owner = bounds
+        parts = np.flatnonzero(np.isin(owner, obstacles))
+        hit = ~(np.any(bhi <= plo[parts] + self.tolerance, axis=1) |
+                np.any(blo >= phi[parts] - self.tolerance, axis=1))
+        apart = ~np.isin(obstacles, owner[parts[hit]])
+        inside = np.all(blo >= hlo[obstacles] - self.tolerance, axis=1) & \
+                 np.all(bhi <= hhi[obstacles] + self.tolerance, axis=1)
+        return apart | inside
+
+    def clear(self, bounds, index, obstacles):
+        '''
+        Whether the bounds of the items of index miss the obstacles.
+        '''
+        if not len(obstacles):
+            return True
+        lo, hi = bounds[:2]
+        return bool(np.all(self.missed(bounds, lo[index].min(axis=0), hi[index].max(axis=0),
+                                       obstacles)))
+
+    def blocked(self, bounds, index, obstacles):
+        '''
+        Mask of the items of index whose own bounds hit an obstacle, as
+        missed() tells, for all of them at once.
+        '''
+        lo, hi, hlo, hhi, plo, phi, owner = bounds
+        # only the parts of the obstacles reaching the items matter
+        parts = np.flatnonzero(np.isin(owner, obstacles) &
+                               np.all(phi > lo[index].min(axis=0) + self.tolerance, axis=1) &
+                               np.all(plo < hi[index].max(axis=0) - self.tolerance, axis=1))
+        plo, phi = plo[parts], phi[parts]
+        hlo, hhi = hlo[owner[parts]], hhi[owner[parts]]
+        stuck = np.zeros(len(index), dtype=bool)
+        # in chunks of items, to bound the memory of the item-part arrays
+        for start in range(0, len(index), 256):
+            i = index[start:start + 256, None]
+            hit = np.all((hi[i] > plo + self.tolerance) & (lo[i] < phi - self.tolerance), axis=2)
+            row, col = np.nonzero(hit)
+            i = i[row, 0]
+            inside = np.all((lo[i] >= hlo[col] - self.tolerance) &
+                            (hi[i] <= hhi[col] + self.tolerance), axis=1)
+            stuck[start + row[~inside]] = True
+        return stuck
+
+    def split(self, bounds):
+        '''
+        Cut the items in groups of at most max_daughters items whose bounds
+        miss each other and the remaining items. Returns the groups and the
+        remaining items, those crossing the cuts or that could not be
+        separated, as arrays of indices.
+        '''
+        lo, hi = bounds[:2]
+        groups, rest = [], []
+        work = [(np.arange(len(lo)), np.zeros(0, dtype=int))]
+        while work:
+            index, obstacles = work.pop()
+            if len(index) <= self.max_daughters and self.clear(bounds, index, obstacles):
+                groups.append(index)
+                continue
+            if len(obstacles):
+                # the items overlapping an obstacle can not be moved, and
+                # become obstacles to the others
+                stuck = self.blocked(bounds, index, obstacles)
+                if stuck.any():
+                    rest.append(index[stuck])
+                    if not stuck.all():
+                        work.append((index[~stuck], np.concatenate([obstacles, index[stuck]])))
+                    continue
+            cut = None if len(index) == 1 else self.cut(lo, hi, index)
+            if cut is None:
+                rest.append(index)
+                continue
+            below, above, across = cut
+            rest.append(across)
+            obstacles = np.concatenate([obstacles, across])
+            work += [(below, obstacles), (above, obstacles)]
+        return groups, np.concatenate(rest) if rest else np.zeros(0, dtype=int)
+
+    def bucket(self, vname):
+        '''
+        Move the daughters of the volume into boxes. Returns the number of
+        boxes made.
+        '''
+        vol = self.store[vname]
+        shapes = self.geom.store.shapes
+        if len(vol.placements) <= self.max_daughters or not vol.shape or \
+           type(shapes[vol.shape]).__name__ != 'Box':
+            return 0
+        mlo, mhi = shape_bounds(shapes, self.store, vol.shape)
+        items, parts = [], []
+        for pname in vol.placements:
+            bounds = self.placement_bounds(pname)
+            if bounds is None:
+                print("Not bucketing %s: unknown extent of %s" % (vname, pname))
+                return 0
+            items.append(bounds)
+            parts.append(self.placement_parts(pname) or [bounds[0]])
+        nan = (np.full(3, np.nan), np.full(3, np.nan))
+        # the cuts follow the bounds of the daughters, the boxes must miss
+        # their parts: a block between the flanges of a beam can leave it
+        bounds = (np.array([b[0][0] for b in items]), np.array([b[0][1] for b in items]),
+                  np.array([(b[1] or nan)[0] for b in items]),
+                  np.array([(b[1] or nan)[1] for b in items]),
+                  np.array([part[0] for p in parts for part in p]),
+                  np.array([part[1] for p in parts for part in p]),
+                  np.repeat(np.arange(len(parts)), [len(p) for p in parts]))
+
+        groups, rest = self.split(bounds)
+        # a box must hold several daughters, fit in the mother and miss the
+        # daughters left in it
+        lo, hi = bounds[:2]
+        boxes = []
+        for index in groups:
+            blo, bhi = lo[index].min(axis=0), hi[index].max(axis=0)
+            if len(index) > 1 and np.all(blo >= mlo - self.tolerance) and \
+               np.all(bhi <= mhi + self.tolerance):
+                boxes.append(index)
+            else:
+                rest = np.concatenate([rest, index])
+        while True:
+            bad = [i for i, index in enumerate(boxes) if not self.clear(bounds, index, rest)]
+            if not bad:
+                break
+            rest = np.concatenate([rest] + [boxes[i] for i in bad])
+            boxes = [index for i, index in enumerate(boxes) if i not in bad]
+        if not boxes:
+            return 0
+
+        keep = set(vol.placements[i] for i in rest)
+        placements = [p for p in vol.placements if p in keep]
+        def cm(value):
+            return Quantity(float(value), 'cm')
+        for index in boxes:
+            name = '%sBucket%d' % (vname, self._nboxes.get(vname, 0))
+            self._nboxes[vname] = self._nboxes.get(vname, 0) + 1
+            blo, bhi = lo[index].min(axis=0), hi[index].max(axis=0)
+            center = 0.5*(blo + bhi)
+            size = 0.5*(bhi - blo)
+            shape = self.geom.shapes.Box(name + '_box', dx=cm(size[0]), dy=cm(size[1]), dz=cm(size[2]))
+            box = self.geom.structure.Volume(name, material=vol.material, shape=shape)
+            for pname in [vol.placements[i] for i in sorted(index)]:
+                place = self.store[pname]
+                rot, trans = self.transform(place)
+                local = trans - center
+                pos = self.geom.structure.Position('%s_in_%s' % (pname, name),
+                                                   x=cm(local[0]), y=cm(local[1]), z=cm(local[2]))
+                self.store[pname] = place._replace(pos=pos.name)
+                box.placements.append(pname)
+            place = self.geom.structure.Placement('place' + name, volume=box,
+                                                  pos=self.geom.structure.Position(
+                                                      'pos' + name,
+                                                      x=cm(center[0]), y=cm(center[1]), z=cm(center[2])))
+            placements.append(place.name)
+            self._bounds[name] = (blo - center, bhi - center)
+            self._holes[name] = None
+        vol.placements[:] = placements
+        return len(boxes)
+
+
+def bucket_daughters(geom, max_daughters, world=None, tolerance=1e-9):
+    '''
+    Bucket the daughters of every box volume below the world (default:
+    the one of geom) that has more than max_daughters of them, until none
+    has or no more boxes can be made. Returns {volume: number of boxes}.
+    '''
+    from gegede.iter import ascending
+    bucketer = Bucketer(geom, max_daughters, tolerance)
+    world = world or geom.world
+    made = {}
+    for vol in ascending(bucketer.store, world):
+        if is_tpc(vol.name) or is_plane(vol.name):
+            continue
+        while True:
+            nboxes = bucketer.bucket(vol.name)
+            if not nboxes:
+                break
+            made[vol.name] = made.get(vol.name, 0) + nboxes
+    for vname, nboxes in made.items():
+        print("Bucketed the daughters of %s into %d boxes, %d daughters left"
+              % (vname, nboxes, len(bucketer.store[vname].placements)))
+    for vol in ascending(bucketer.store, world):
+        if len(vol.placements) > max_daughters and not (is_tpc(vol.name) or is_plane(vol.name)):
+            print("Warning: %s keeps %d daughters, more than %d: they overlap each other's "
+                  "bounding boxes or the volume is not a box" % (vol.name, len(vol.placements),
+                                                                 max_daughters))
+    return made
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+'''
+Complexity profile of a constructed geometry.
+
+For each logical volume it reports the depth and number of leaves of the
+boolean tree of its solid, the number of shape nodes in that tree (total
+and unique), its number of daughters, how many placements refer to it and
+how many copies of it the world holds. An estimated navigation cost score
+ranks the volumes:
+
+    score = solid cost + daughters / DAUGHTERS_PER_UNIT
+
+where the solid cost of a primitive shape is 1, that of a boolean is the
+cost of its two operands plus one, and that of a multi-union (see
+duneggd.multiunion), which Geant4 voxelizes, is the cost of its largest
+component plus log2 of its number of components.
+
+Run it in the directory of the configuration, like gegede-cli:
+
+    $ cd python/duneggd/dunefdvd
+    $ python -m duneggd.complexity dunevd_v7.cfg --top 20 --json profile.json
+'''
+
+import os
+import sys
+import math
+import json
+import argparse
+
+# daughters counted as one unit of navigation cost
+DAUGHTERS_PER_UNIT = 100
+
+COLUMNS = ('score', 'depth', 'leaves', 'daughters', 'shapes', 'unique', 'placed', 'copies')
+
+
+class ShapeMetrics(object):
+    '''
+    Memoized boolean tree metrics of the shapes of a geometry store.
+    '''
+
+    def __init__(self, shapes):
+        self.shapes = shapes
+        self._cache = {}
+
+    def children(self, shape):
+        typename = type(shape).__name__
+        if typename == 'MultiUnion':
+            return list(shape.solids)
+        if typename in ('Boolean', 'Union', 'Subtraction', 'Intersection'):
+            return [shape.first, shape.second]
+        return []
+
+    def __call__(self, name):
+        '''
+        (depth, leaves, nodes, names, cost) of the tree of the shape.
+        '''
+        # post-order walk without recursion, boolean chains can be very deep
+        stack = [name]
+        while stack:
+            top = stack[-1]
+            if top in self._cache:
+                stack.pop()
+                continue
+            shape = self.shapes[top]
+            todo = [kid for kid in self.children(shape) if kid not in self._cache]
+            if todo:
+                stack.extend(todo)
+                continue
+            stack.pop()
+            self._cache[top] = self._combine(top, shape)
+        return self._cache[name]
+
+    def _combine(self, name, shape):
+        kids = [self._cache[kid] for kid in self.children(shape)]
+        if not kids:
+            return (0, 1, 1, frozenset([name]), 1.0)
+        depth = 1 + max(k[0] for k in kids)
+        leaves = sum(k[1] for k in kids)
+        nodes = 1 + sum(k[2] for k in kids)
+        names = frozenset([name]).union(*[k[3] for k in kids])
+        if type(shape).__name__ == 'MultiUnion':
+            cost = max(k[4] for k in kids) + math.log2(len(kids))
+        else:
+            cost = 1.0 + sum(k[4] for k in kids)
+        return (depth, leaves, nodes, names, cost)
+
+
+def profile(geom):
+    '''
+    Return a {volume name: metrics dict} of the volumes reachable from the
+    world of the geometry.
+    '''
+    from gegede.iter import ascending
+    store = geom.store.structure
+    metrics = ShapeMetrics(geom.store.shapes)
+
+    volumes = ascending(store, geom.world)   # daughters first
+
+    placed = dict.fromkeys((vol.name for vol in volumes), 0)
+    for obj in store.values():
+        if type(obj).__name__ in ('Placement', 'Replica', 'Division') and obj.volume in placed:
+            placed[obj.volume] += 1
+
+    copies = dict.fromkeys(placed, 0)
+    copies[geom.world] = 1
+    for vol in reversed(volumes):
+        for pname in vol.placements:
+            place = store[pname]    # a replica (duneggd.replica) makes number copies
+            copies[place.volume] += getattr(place, 'number', 1)*copies[vol.name]
+
+    ret = {}
+    for vol in volumes:
+        if vol.shape:
+            depth, leaves, nodes, names, cost = metrics(vol.shape)
+        else:                   # assembly
+            depth, leaves, nodes, names, cost = 0, 0, 0, (), 0.0
+        daughters = len(vol.placements)
+        ret[vol.name] = dict(score=round(cost + daughters/DAUGHTERS_PER_UNIT, 3),
+                             depth=depth, leaves=leaves,
+                             daughters=daughters,
+                             shapes=nodes, unique=len(names),
+                             placed=placed[vol.name], copies=copies[vol.name],
+                             shape=vol.shape, material=vol.material)
+    return ret
+
+def ranked(prof, key='score'):
+    '''
+    Volume names ordered from the worst to the best by key.
+    '''
+    return sorted(prof, key=lambda name: (-prof[name][key], name))
+
+def format_table(prof, names):
+    width = max([len('volume')] + [len(name) for name in names])
+    lines = ['%-*s ' % (width, 'volume') + ' '.join('%10s' % c for c in COLUMNS)]
+    for name in names:
+        row = prof[name]
+        lines.append('%-*s ' % (width, name) + ' '.join('%10s' % row[c] for c in COLUMNS))
+    return '\n'.join(lines)
+
+def summary(geom, prof):
+    used = set()
+    metrics = ShapeMetrics(geom.store.shapes)
+    for row in prof.values():
+        if row['shape']:
+            used |= metrics(row['shape'])[3]
+    return dict(volumes=len(prof), shapes=len(geom.store.shapes), used_shapes=len(used),
+                placements=sum(row['daughters'] for row in prof.values()),
+                physical_volumes=sum(row['copies'] for row in prof.values()),
+                max_depth=max(row['depth'] for row in prof.values()))
+
+
+def build(configs, world=None):
+    '''
+    Construct the geometry of the configuration files like gegede-cli.
+    '''
+    import gegede.main
+    cfg = gegede.main.parse_config(configs)
+    wbuilder = gegede.main.make_builder(cfg, world)
+    gegede.main.configure_builder(cfg, wbuilder)
+    return gegede.main.generate_geometry(wbuilder)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Geometry complexity profile')
+    parser.add_argument('config', nargs='+', help='Configuration file(s)')
+    parser.add_argument('-w', '--world', default=None, help='World builder name')
+    parser.add_argument('-n', '--top', type=int, default=20,
+                        help='Number of volumes in the ranked table')
+    parser.add_argument('-s', '--sort', default='score', choices=COLUMNS,
+                        help='Column to rank the volumes by')
+    parser.add_argument('-j', '--json', default=None,
+                        help='Write the profile of all the volumes to this JSON file')
+    parser.add_argument('--max-depth', type=int, default=None,
+                        help='Fail if a boolean tree is deeper than this')
+    args = parser.parse_args(argv)
+
+    # the builders of a configuration are modules next to it
+    for config in args.config:
+        path = os.path.dirname(os.path.abspath(config))
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    geom = build(args.config, args.world)
+    prof = profile(geom)
+    order = ranked(prof, args.sort)
+
+    print(format_table(prof, order[:args.top]))
+    summ = summary(geom, prof)
+    print('\n' + ', '.join('%s: %d' % kv for kv in summ.items()))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(summary=summ, volumes=[dict(volume=name, **prof[name]) for name in order]),
+                      f, indent=1)
+        print('Wrote the profile of %d volumes to %s' % (len(order), args.json))
+
+    if args.max_depth is not None:
+        deep = [name for name in order if prof[name]['depth'] > args.max_depth]
+        if deep:
+            print('%d volumes have boolean trees deeper than %d: %s'
+                  % (len(deep), args.max_depth, ', '.join(deep)))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
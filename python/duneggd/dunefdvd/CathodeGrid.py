@@ -38,10 +38,75 @@ class CathodeGridBuilder(gegede.builder.Builder):
         else:
             return self.constructGrid(geom, cij, cvoid, ny, nz-1)
 
+    def voidCenters(self):
+        # centers of the 4x4 voids along one axis, as in constructGrid
+        ys = [(2.5-n)*globals.get("widthCathodeVoid") + (2.0-n + (n<=2))*globals.get("CathodeBorder")
+              for n in range(4, 0, -1)]
+        zs = [(2.5-n)*globals.get("lengthCathodeVoid") + (2.0-n + (n<=2))*globals.get("CathodeBorder")
+              for n in range(4, 0, -1)]
+        return ys, zs
+
+    def constructBars(self, geom):
+        # the frame is cut into bars along z spanning the full length between
+        # the void rows, and bars along y between the voids of each row
+        height = globals.get("heightCathode")
+        width = globals.get("widthCathode")
+        length = globals.get("lengthCathode")
+        wvoid = globals.get("widthCathodeVoid")
+        lvoid = globals.get("lengthCathodeVoid")
+        ys, zs = self.voidCenters()
+
+        def gaps(centers, size, total):
+            edges = [-0.5*total]
+            for c in centers:
+                edges += [c - 0.5*size, c + 0.5*size]
+            edges.append(0.5*total)
+            return [(lo, hi) for lo, hi in zip(edges[0::2], edges[1::2]) if hi > lo]
+
+        barvols = {}
+        def barvol(dy, dz):
+            key = (round(dy.to('cm').magnitude, 9), round(dz.to('cm').magnitude, 9))
+            if key not in barvols:
+                name = 'CathodeBar%d' % len(barvols)
+                shape = geom.shapes.Box(name, dx = 0.5*height, dy = 0.5*dy, dz = 0.5*dz)
+                barvols[key] = geom.structure.Volume('vol'+name, material = "G10", shape = shape)
+            return barvols[key]
+
+        bars = []
+        for i, (lo, hi) in enumerate(gaps(ys, wvoid, width)):
+            bars.append(('CathodeBarZ%d' % i, barvol(hi - lo, length), 0.5*(lo + hi), Q('0cm')))
+        for i, y in enumerate(ys):
+            for j, (lo, hi) in enumerate(gaps(zs, lvoid, length)):
+                bars.append(('CathodeBarY%d_%d' % (i, j), barvol(wvoid, hi - lo), y, 0.5*(lo + hi)))
+
+        # self-check: the bars hold the G10 of the block minus the voids
+        barsum = sum(((2*geom.get_shape(vol).dy)*(2*geom.get_shape(vol).dz)).to('cm**2').magnitude
+                     for name, vol, y, z in bars)
+        frame = (width*length - len(ys)*len(zs)*wvoid*lvoid).to('cm**2').magnitude
+        if abs(barsum - frame) > 1e-9*frame:
+            raise ValueError('Cathode bars hold %g cm3 of G10 instead of %g cm3' %
+                             (barsum*height.to('cm').magnitude, frame*height.to('cm').magnitude))
+
+        placements = []
+        for name, vol, y, z in bars:
+            place = geom.structure.Placement('place'+name,
+                                             volume = vol,
+                                             pos = geom.structure.Position('pos'+name,
+                                                                           x = Q('0cm'),
+                                                                           y = y,
+                                                                           z = z))
+            placements.append(place.name)
+        # an assembly: the bars go straight into the mother of the cathode,
+        # next to the photon detectors sitting in the voids
+        return geom.structure.Volume('volCathodeGrid', placements = placements)
+
     def construct(self, geom):
         # for leaf builders, get the rest of the derived global parameters
         globals.SetDerived()
         # construction begins
+        if globals.get("cathodeFrameBars"):
+            self.add_volume(self.constructBars(geom))
+            return
         cathodeblockBox = geom.shapes.Box('CathodeBlock',
                                           dx=0.5*globals.get("heightCathode"),
                                           dy=0.5*globals.get("widthCathode"),
@@ -5,7 +5,10 @@ Cryostat builder for DUNE FD-VD
 
 import gegede.builder
 from utils import *
+from duneggd.fastunits import Length
+from duneggd.gridplace import offsets, mesh, Member, place_grid
 import re
+import numpy as np
 
 # helper function for making a volume object
 def make_volume(geom, material, shape, name='', aux=False):
@@ -148,60 +151,50 @@ class CryostatBuilder(gegede.builder.Builder):
         if not globals.get("tpc"):
             return tpcenc_LV
 
-        pos_x = 0.5*globals.get("TPCEnclosure_x") - 0.5*globals.get("TPC_x") - globals.get("anodePlateWidth")
+        # plain lengths in the loops, Quantities only for the positions
+        g = {k: Length(globals.get(k)) for k in
+             ("TPCEnclosure_x", "TPCEnclosure_y", "TPCEnclosure_ybottom", "TPCEnclosure_z",
+              "TPC_x", "anodePlateWidth", "lengthCRM", "widthCRM", "borderCRP",
+              "borderCRUBottom1side_z", "borderCRUBottom_y", "gapSST1_z", "gapSST2_z",
+              "gapSST_y", "gapSST_ybottom")}
+        nSST2_z = globals.get("nSST2_z")
+        nCRM_z = globals.get("nCRM_z")
+
+        pos_x = 0.5*g["TPCEnclosure_x"] - 0.5*g["TPC_x"] - g["anodePlateWidth"]
         posbottom_x = -pos_x
-        pos_z = -0.5*globals.get("TPCEnclosure_z") + 0.5*globals.get("lengthCRM")
-        pos_z_bot = -0.5*globals.get("TPCEnclosure_z") + 0.5*globals.get("lengthCRM")
+        v = {k: l.value for k, l in g.items()}
+
+        # CRM centers along z: borders before the even CRMs and the gaps of the
+        # steel support structure, the bottom CRUs have their own borders
+        iz = np.arange(nCRM_z)
+        sst = (iz - 2) % 6 == 0
+        pos_z = offsets(nCRM_z, v["lengthCRM"], (-0.5*g["TPCEnclosure_z"] + 0.5*g["lengthCRM"]).value,
+                        gaps=[(lambda i: i % 2 == 0, v["borderCRP"]*(1 + (iz > 0))),
+                              (lambda i: (nSST2_z == 0) & (i % 6 == 0) & (i > 0), v["gapSST1_z"]),
+                              (lambda i: (nSST2_z > 0) & (i == 2), v["gapSST2_z"]),
+                              (lambda i: (nSST2_z > 0) & sst & (i > 2) & (i < nCRM_z - 2), v["gapSST1_z"]),
+                              (lambda i: (nSST2_z > 0) & sst & (i >= nCRM_z - 2), v["gapSST2_z"])])
+        pos_z_bot = offsets(nCRM_z, v["lengthCRM"], (-0.5*g["TPCEnclosure_z"] + 0.5*g["lengthCRM"]).value,
+                            gaps=[(lambda i: i >= 0, v["borderCRUBottom1side_z"]*(1 + (iz > 0)))])
+
+        # and along y
+        nCRM_y = globals.get("nCRM_y")
+        iy = np.arange(nCRM_y)
+        pos_y = offsets(nCRM_y, v["widthCRM"], (-0.5*g["TPCEnclosure_y"] + 0.5*g["widthCRM"]).value,
+                        gaps=[(lambda j: j % 2 == 0, v["borderCRP"]*(1 + (iy > 0))),
+                              (lambda j: (j % 4 == 0) & (j > 0), v["gapSST_y"])])
+        pos_y_bot = offsets(nCRM_y, v["widthCRM"], (-0.5*g["TPCEnclosure_ybottom"] + 0.5*g["widthCRM"]).value,
+                            gaps=[(lambda j: j % 2 == 0, v["borderCRUBottom_y"]*(1 + (iy > 0))),
+                                  (lambda j: (j % 4 == 0) & (j > 0), v["gapSST_ybottom"])])
 
-        idx = 0
         name = re.sub(r'vol', '', tpc_LV.name)
-        for ii in range(globals.get("nCRM_z")):
-            if ii == 0:
-                pos_z_bot += globals.get("borderCRUBottom1side_z")
-            if ii > 0:
-                pos_z_bot += 2 * globals.get("borderCRUBottom1side_z")
-            if ii % 2 == 0:
-                pos_z += globals.get("borderCRP")*(1 + int(ii > 0))
-                if (globals.get("nSST2_z") == 0) and (ii % 6 == 0) and (ii > 0):
-                    pos_z += globals.get("gapSST1_z")
-                if (globals.get("nSST2_z") > 0) and (ii == 2):
-                    pos_z += globals.get("gapSST2_z")
-                if (globals.get("nSST2_z") > 0) and ((ii-2) % 6 == 0) and (ii > 2) and (ii < globals.get("nCRM_z") - 2):
-                    pos_z += globals.get("gapSST1_z")
-                if (globals.get("nSST2_z") > 0) and ((ii-2) % 6 == 0) and (ii >= globals.get("nCRM_z") - 2):
-                    pos_z += globals.get("gapSST2_z")
-
-            pos_y = -0.5*globals.get("TPCEnclosure_y") + 0.5*globals.get("widthCRM")
-            pos_y_bot = -0.5*globals.get("TPCEnclosure_ybottom") + 0.5*globals.get("widthCRM")
-            for jj in range(globals.get("nCRM_y")):
-                if jj % 2 == 0:
-                    pos_y += globals.get("borderCRP")*(1 + int(jj > 0))
-                    pos_y_bot += globals.get("borderCRUBottom_y")*(1 + int(jj > 0))
-
-                    if (jj % 4 == 0) and (jj > 0):
-                        pos_y += globals.get("gapSST_y")
-                        pos_y_bot += globals.get("gapSST_ybottom")
-
-                place_top = geom.structure.Placement('placeTop%s-%d' % (name, idx),
-                                                     volume = tpc_LV,
-                                                     pos = geom.structure.Position('posTop%s-%d' % (name, idx),
-                                                                                   x = pos_x,
-                                                                                   y = pos_y,
-                                                                                   z = pos_z))
-                tpcenc_LV.placements.append(place_top.name)
-                if globals.get("nCRM_x") == 2:
-                    place_bot = geom.structure.Placement('placeBot%s-%d' % (name, idx),
-                                                         volume = tpc_LV,
-                                                         pos = geom.structure.Position('posBot%s-%d' % (name, idx),
-                                                                                       x = posbottom_x,
-                                                                                       y = pos_y_bot,
-                                                                                       z = pos_z_bot))
-                    tpcenc_LV.placements.append(place_bot.name)
-                idx += 1
-                pos_y += globals.get("widthCRM")
-                pos_y_bot += globals.get("widthCRM")
-            pos_z += globals.get("lengthCRM")
-            pos_z_bot += globals.get("lengthCRM")
+        labels, (iiz, jjy) = mesh(iz, iy)
+        members = [Member(tpc_LV, 'placeTop%s-{n}' % name, 'posTop%s-{n}' % name,
+                          x = pos_x.q, y = pos_y[jjy], z = pos_z[iiz])]
+        if globals.get("nCRM_x") == 2:
+            members.append(Member(tpc_LV, 'placeBot%s-{n}' % name, 'posBot%s-{n}' % name,
+                                  x = posbottom_x.q, y = pos_y_bot[jjy], z = pos_z_bot[iiz]))
+        place_grid(geom, tpcenc_LV, labels, members)
         return tpcenc_LV
 
     def placeCathodeAndAnode(self, geom, c_LV, a_LV, a_bot_LV, tpcenc_LV):
@@ -353,38 +346,29 @@ class CryostatBuilder(gegede.builder.Builder):
         pos_y = -0.5*globals.get("FieldShaperShortTubeLength") - globals.get("FieldShaperTorRad")
         pos_z = Q('0cm')
 
-        for i in range(int(globals.get("NFieldShapers").magnitude) + 1):
-            dist = i*globals.get("FieldShaperSeparation")
-            pos_x = 0.5*globals.get("Argon_x") - globals.get("HeightGaseousAr") -                                   \
-                    (globals.get("driftTPCActive") + globals.get("ReadoutPlane")) +                                 \
-                    (i + 0.5)*globals.get("FieldShaperSeparation")
-            if reversed:
-                pos_x = 0.5*globals.get("Argon_x") - globals.get("HeightGaseousAr") -                               \
-                        (globals.get("driftTPCActive") + globals.get("ReadoutPlane")) -                             \
-                        globals.get("heightCathode") -                                                              \
-                        (i + 0.5)*globals.get("FieldShaperSeparation")
-
-            name = re.sub(r'vol', '', fs_LV.name)
-            if (globals.get("pdsconfig") == 0 and dist <= Q('250cm')):
-                place = geom.structure.Placement('place%s_%d_%d_inCryo' % (fs_LV.name, int(reversed), i),
-                                                 volume = fs_LV,
-                                                 pos = geom.structure.Position('pos%s_%d_%d' %                       \
-                                                                                 (name, int(reversed), i),
-                                                                               x = pos_x,
-                                                                               y = pos_y,
-                                                                               z = pos_z),
-                                                 rot = "rPlus90AboutZ")
-                cryo_LV.placements.append(place.name)
-            else:
-                place_slim = geom.structure.Placement('place%s_%d_%d_inCryo' % (fsslim_LV.name, int(reversed), i),
-                                                      volume = fsslim_LV,
-                                                      pos = geom.structure.Position('pos%s_%d_%d' %                  \
-                                                                                      (name, int(reversed), i),
-                                                                                    x = pos_x,
-                                                                                    y = pos_y,
-                                                                                    z = pos_z),
-                                                      rot = "rPlus90AboutZ")
-                cryo_LV.placements.append(place_slim.name)
+        # all the shapers at once: the regular ones near the anode with the
+        # default photon detectors, the slim ones elsewhere
+        nshapers = int(globals.get("NFieldShapers").magnitude) + 1
+        i = np.arange(nshapers)
+        separation = globals.get("FieldShaperSeparation")
+        top_x = 0.5*globals.get("Argon_x") - globals.get("HeightGaseousAr") -                                      \
+                (globals.get("driftTPCActive") + globals.get("ReadoutPlane"))
+        if reversed:
+            pos_x = top_x - globals.get("heightCathode") - (i + 0.5)*separation
+        else:
+            pos_x = top_x + (i + 0.5)*separation
+        regular = (i*separation <= Q('250cm')) & (globals.get("pdsconfig") == 0)
+
+        name = re.sub(r'vol', '', fs_LV.name)
+        pos = 'pos%s_%d_{n}' % (name, int(reversed))
+        place_grid(geom, cryo_LV, i[:, np.newaxis],
+                   [Member(fs_LV, 'place%s_%d_{n}_inCryo' % (fs_LV.name, int(reversed)), pos,
+                           x = pos_x.magnitude, y = pos_y, z = pos_z, rot = "rPlus90AboutZ",
+                           cells = regular),
+                    Member(fsslim_LV, 'place%s_%d_{n}_inCryo' % (fsslim_LV.name, int(reversed)), pos,
+                           x = pos_x.magnitude, y = pos_y, z = pos_z, rot = "rPlus90AboutZ",
+                           cells = ~regular)],
+                   unit = str(pos_x.units))
         return cryo_LV
 
     def placeOpDetsLateral(self, geom, arapuca_LV, cryo_LV):
@@ -1,6 +1,8 @@
 import gegede.builder
 from gegede import Quantity as Q
 from utils import *
+import numpy as np
+from duneggd.gridplace import mesh, Member, place_grid
 
 class SupportEncBuilder(gegede.builder.Builder):
     def configure(self, **kwds):
@@ -66,27 +68,21 @@ class SupportEncBuilder(gegede.builder.Builder):
         box_shape_pb = geom.shapes.Box('box_namePb', dy=(BlockWidth)/2, dx=(BlockThicknessPb/2.0), dz=(BlockWidth/2))
         boxshapevolumePb = geom.structure.Volume('boxshapeLeadVol', material='lead', shape=box_shape_pb)
 
-        # start the loop
+        # 42 x 12 grid of blocks, lead under polyethylene, labelled from -1
         zbsp = self.fSpacing
         yPbBlock = -self.fht - 0.5*self.fIFlangeHeight + 0.5*BlockThicknessPb
         yBlock  = yPbBlock + BlockThicknessPb + 0.5*BlockThickness
-        for ii in range(-1, 41):
-                zpos_i = (ii-1-19)*zbsp + zbsp/2
-                for jj in range(-1, 11):
-                        xpos_i = (jj-1-4)*zbsp + zbsp/2
-                        box_name = f'ShieldingFloor_{jj}_{ii}'
-
-                        placement = geom.structure.Placement(
-                                        f'ShieldingFloor_{jj}_{ii}',
-                                        volume = boxshapevolume,
-                                        pos = geom.structure.Position(f'ShieldingFloor_{jj}_{ii}_position', x=yBlock, y=xpos_i, z=zpos_i))
-                        supportencLV.placements.append(placement.name)
-
-                        placement2 = geom.structure.Placement(
-                                        f'ShieldingFloorPb_{jj}_{ii}',
-                                        volume = boxshapevolumePb,
-                                        pos = geom.structure.Position(f'ShieldingFloorPb_{jj}_{ii}_position', x=yPbBlock, y=xpos_i, z=zpos_i))
-                        supportencLV.placements.append(placement2.name)
+        unit = str(zbsp.units)
+        zbsp = zbsp.magnitude
+        zpos = (np.arange(-1, 41)-1-19)*zbsp + zbsp/2
+        xpos = (np.arange(-1, 11)-1-4)*zbsp + zbsp/2
+        labels, (zpos_i, xpos_i) = mesh(zpos, xpos)
+        place_grid(geom, supportencLV, labels,
+                   [Member(boxshapevolume, 'ShieldingFloor_{j}_{i}', 'ShieldingFloor_{j}_{i}_position',
+                           x=yBlock, y=xpos_i, z=zpos_i),
+                    Member(boxshapevolumePb, 'ShieldingFloorPb_{j}_{i}', 'ShieldingFloorPb_{j}_{i}_position',
+                           x=yPbBlock, y=xpos_i, z=zpos_i)],
+                   unit=unit, first=-1)
         return supportencLV
 
     #-------------------------------------------------
@@ -5,6 +5,8 @@ TPC builder for DUNE FD-VD
 
 import gegede.builder
 from utils import *
+from duneggd.wiremap import write_wire_map
+from duneggd.fastunits import Length
 
 class TPCBuilder(gegede.builder.Builder):
     def configure(self, **kwds):
@@ -54,7 +56,10 @@ class TPCBuilder(gegede.builder.Builder):
 
         postpcs = {}
         tpcplanes_LV = {}
+        wiremap = []
         pid = 0
+        zero = Q('0cm')
+        activeHalf_z = 0.5*globals.get("TPCActive_z").magnitude
 
         for plane in ['U', 'V', 'Z']:
             tpcplane_LV = geom.structure.Volume('vol'+self.name+'Plane'+plane,
@@ -64,21 +69,22 @@ class TPCBuilder(gegede.builder.Builder):
             if wires:
                 n = 0
                 for w in wireinfo[plane]:
-                    if plane == 'Z' and (globals.get("TPCActive_z").magnitude < 2*abs(w[1])):
+                    wz, wy = w['center'].tolist()
+                    if plane == 'Z' and (activeHalf_z < abs(wz)):
                         print("Cannot place wire %d in view Z, as plane is too small\n" % n)
                     pos = geom.structure.Position('posWire%s%d' % (plane, n),
-                                                  x = Q('0cm'),
-                                                  y = Q(str(w[2])+'cm'),
-                                                  z = Q(str(w[1])+'cm'))
-                    id = str(n) if plane != 'Z' else w[0]
+                                                  x = zero,
+                                                  y = Length(wy).q,
+                                                  z = Length(wz).q)
+                    volname, placedlen = wires.wirevols[plane][n]
                     wire_place = geom.structure.Placement('place%sWire%s%d'%(self.name, plane, n),
-                                                          volume = wires.get_volume(
-                                                                     "vol%sWire%s%s"%(self.name, plane, id)
-                                                                   ),
+                                                          volume = wires.get_volume(volname),
                                                           pos = pos,
                                                           rot = rotation)
                     # place the wires inside each place
                     tpcplane_LV.placements.append(wire_place.name)
+                    wiremap.append((plane, int(w['channel']), wire_place.name, volname,
+                                    float(w['length']), placedlen))
                     n += 1
             tpcplanes_LV[plane] = tpcplane_LV
             postpcs[plane] = (0.5*globals.get("TPC_x") - (2.5 - pid)*globals.get("padWidth"),
@@ -86,6 +92,9 @@ class TPCBuilder(gegede.builder.Builder):
                               Q('0cm'))
             pid += 1
 
+        if wiremap and globals.get("wireMapFile"):
+            write_wire_map(globals.get("wireMapFile"), wiremap)
+
         # final placements
         tpc_LV = geom.structure.Volume('vol'+self.name,
                                        material = "LAr",
@@ -6,43 +6,60 @@ Wires builder for DUNE FD-VD
 import gegede.builder
 from utils import *
 from math import *
+import numpy as np
 import sys
 
+from duneggd.fastunits import Length
+from duneggd.wiremap import pool_wire_lengths
+
+# per wire record: channel, (z, y) center, length and (z1, y1, z2, y2) endpoints
+WIRE_DTYPE = np.dtype([('channel', 'i4'),
+                       ('center', 'f8', (2,)),
+                       ('length', 'f8'),
+                       ('endpoints', 'f8', (4,))])
+
 # line clip on the rectangle boundary
 def line_clip(x0, y0, nx, ny, rcl, rcw):
+    '''
+    Clip the lines through (x0, y0) with direction (nx, ny) to the rectangle
+    [0, rcl] x [0, rcw]. x0 and y0 are arrays (one entry per wire) sharing the
+    same direction. Returns the (N, 4) endpoints and a mask of the wires that
+    cross the rectangle; the first two borders hit in the order left, right,
+    bottom, top are kept.
+    '''
     tol = 1.0E-4
-    endpts = []
+    x0 = np.asarray(x0, dtype=float)
+    y0 = np.asarray(y0, dtype=float)
+    n = x0.size
 
     if abs(nx) < tol:
-        return [x0, 0, x0, rcw]
+        endpts = np.column_stack([x0, np.zeros(n), x0, np.full(n, rcw)])
+        return endpts, np.ones(n, dtype=bool)
     if abs(ny) < tol:
-        return [0, y0, rcl, y0]
-
-    # Left border
-    y = y0 - x0 * ny/nx
-    if 0 <= y <= rcw:
-        endpts.extend([0, y])
-
-    # Right border
-    y = y0 + (rcl-x0) * ny/nx
-    if 0 <= y <= rcw:
-        endpts.extend([rcl, y])
-        if len(endpts) == 4:
-            return endpts
-
-    # Bottom border
-    x = x0 - y0 * nx/ny
-    if 0 <= x <= rcl:
-        endpts.extend([x, 0])
-        if len(endpts) == 4:
-            return endpts
-
-    # Top border
-    x = x0 + (rcw-y0)* nx/ny
-    if 0 <= x <= rcl:
-        endpts.extend([x, rcw])
-
-    return endpts
+        endpts = np.column_stack([np.zeros(n), y0, np.full(n, rcl), y0])
+        return endpts, np.ones(n, dtype=bool)
+
+    # candidate crossings with the left, right, bottom and top borders
+    yl = y0 - x0 * ny/nx
+    yr = y0 + (rcl-x0) * ny/nx
+    xb = x0 - y0 * nx/ny
+    xt = x0 + (rcw-y0) * nx/ny
+    cx = np.column_stack([np.zeros(n), np.full(n, rcl), xb, xt])
+    cy = np.column_stack([yl, yr, np.zeros(n), np.full(n, rcw)])
+    valid = np.column_stack([(0 <= yl) & (yl <= rcw),
+                             (0 <= yr) & (yr <= rcw),
+                             (0 <= xb) & (xb <= rcl),
+                             (0 <= xt) & (xt <= rcl)])
+
+    # first and second valid border for each wire
+    rank = np.cumsum(valid, axis=1)
+    ok = rank[:, -1] >= 2
+    first = np.argmax(valid & (rank == 1), axis=1)
+    second = np.argmax(valid & (rank == 2), axis=1)
+    rows = np.arange(n)
+    endpts = np.column_stack([cx[rows, first], cy[rows, first],
+                              cx[rows, second], cy[rows, second]])
+    return endpts, ok
 
 class WiresBuilder(gegede.builder.Builder):
     def configure(self, **kwds):
@@ -50,6 +67,10 @@ class WiresBuilder(gegede.builder.Builder):
         self._generated = [False]*3 # for each plane
 
     def generate_wires(self, plane):
+        '''
+        Generate all the wires of a plane at once. The result is a structured
+        array of WIRE_DTYPE stored in self.winfos[plane] (in cm).
+        '''
         # generate the wires for a given plane
         if all(self._generated):
             print("Already generated the wires for all planes. Doing nothing")
@@ -60,40 +81,55 @@ class WiresBuilder(gegede.builder.Builder):
         if plane == 'Z':
             plane_id = 2
 
+        winfo = None
+        cache_dir = globals.get("wireCacheDir")
+        if cache_dir:
+            # the layout only depends on these parameters and on make_wires
+            from duneggd.layoutcache import LayoutCache, source_version
+            cache = LayoutCache(cache_dir, globals.get("wireCacheEntries"))
+            key = cache.key(plane, globals.get("nChans"), globals.get("wirePitch"+plane),
+                            globals.get("wireAngle"+plane) if plane != 'Z' else None,
+                            globals.get("TPCActive_y"), globals.get("TPCActive_z"),
+                            version=source_version(line_clip, WiresBuilder.make_wires))
+            winfo = cache.load(key)
+            if winfo is None:
+                winfo = self.make_wires(plane)
+                cache.store(key, winfo)
+        else:
+            winfo = self.make_wires(plane)
+
+        self.winfos[plane] = winfo
+        self._generated[plane_id] = True
+        return winfo
+
+    def make_wires(self, plane):
+        '''
+        Compute the WIRE_DTYPE array of the wires of a plane.
+        '''
         nchs = globals.get("nChans")
         pitch = globals.get("wirePitch"+plane).magnitude
         theta_deg = globals.get("wireAngle"+plane) if plane != 'Z' else Q('0deg')
         theta = theta_deg.to('radian').magnitude
-        dia = globals.get("padWidth").magnitude
-        self.winfos[plane] = []
 
         if plane == 'Z':
             length = globals.get("TPCActive_y").magnitude
             nch = nchs['Col']
-            for ch in range(nch):
-                zpos = (ch + 0.5*(1 - nch))*pitch
-                self.winfos[plane].append(['', zpos, 0., length])
+            ch = np.arange(nch)
+            zpos = (ch + 0.5*(1 - nch))*pitch
+            winfo = np.zeros(nch, dtype=WIRE_DTYPE)
+            winfo['channel'] = ch
+            winfo['center'][:, 0] = zpos
+            winfo['length'] = length
+            winfo['endpoints'] = np.column_stack([zpos, np.full(nch, -0.5*length),
+                                                  zpos, np.full(nch, 0.5*length)])
         else:
             length = globals.get("TPCActive_z").magnitude - 0.02
             width = globals.get("TPCActive_y").magnitude - 0.02
-            #  width = 0.
             nch = nchs['Ind1'] if plane == 'U' else nchs['Ind2']
-            nchb = nchs['Ind1Bot']
             # Wire and pitch direction unit vectors
             dirw = [cos(theta), sin(theta)]
             dirp = [cos(theta - pi/2), sin(theta - pi/2)]
 
-            # Alpha is angle for pitch calculations
-            #  alpha = theta if theta <= pi/2 else pi - theta
-            #
-            #  # Calculate wire spacing
-            #  dX = pitch / sin(alpha)
-            #  dY = pitch / sin(pi/2 - alpha)
-            #  if length <= 0:
-            #      length = dX * nchb
-            #  if width <= 0:
-            #      width = dY * (nch - nchb)
-
             # Starting point adjusted for direction
             orig = [0, 0]
             if dirp[0] < 0:
@@ -101,48 +137,31 @@ class WiresBuilder(gegede.builder.Builder):
             if dirp[1] < 0:
                 orig[1] = width
 
-            # Generate wires
-            offset = pitch/2.  # Starting point determined by offsets
-
-            for ch in range(nch):
-                # Reference point for this wire
-                wcn = [orig[0] + offset * dirp[0],
-                       orig[1] + offset * dirp[1]]
-
-                # Get endpoints from line clipping
-                endpts = line_clip(wcn[0], wcn[1], dirw[0], dirw[1], length, width)
-
-                if len(endpts) != 4:
-                    print("Could not find endpoints for wire %d" % ch)
-                    offset += pitch
-                    continue
-
-                # Recenter coordinates
-                endpts[0] -= length/2
-                endpts[2] -= length/2
-                endpts[1] -= width/2
-                endpts[3] -= width/2
-
-                # Calculate wire center
-                offsetZ = 0.
-                offsetY = 0.
-                wcn[0] = (endpts[0] + endpts[2])/2 + offsetZ
-                wcn[1] = (endpts[1] + endpts[3])/2 + offsetY
+            # Offsets along the pitch direction, accumulated wire after wire
+            offset = np.cumsum(np.concatenate([[pitch/2.], np.full(nch - 1, pitch)]))
 
-                # Calculate wire length
-                dx = endpts[0] - endpts[2]
-                dy = endpts[1] - endpts[3]
+            # Reference point of each wire and endpoints from line clipping
+            endpts, ok = line_clip(orig[0] + offset * dirp[0],
+                                   orig[1] + offset * dirp[1],
+                                   dirw[0], dirw[1], length, width)
+            for ch in np.flatnonzero(~ok):
+                print("Could not find endpoints for wire %d" % ch)
 
-                wlen = (dx**2 + dy**2)**(0.5)
+            # Recenter coordinates
+            endpts = endpts[ok] - [length/2, width/2, length/2, width/2]
 
-                # Store wire info
-                wire = [ch, wcn[0], wcn[1], wlen] + endpts
+            # Wire centers and lengths
+            dx = endpts[:, 0] - endpts[:, 2]
+            dy = endpts[:, 1] - endpts[:, 3]
 
-                self.winfos[plane].append(wire)
-                offset += pitch
+            winfo = np.zeros(endpts.shape[0], dtype=WIRE_DTYPE)
+            winfo['channel'] = np.flatnonzero(ok)
+            winfo['center'][:, 0] = (endpts[:, 0] + endpts[:, 2])/2
+            winfo['center'][:, 1] = (endpts[:, 1] + endpts[:, 3])/2
+            winfo['length'] = np.sqrt(dx**2 + dy**2)
+            winfo['endpoints'] = endpts
 
-        self._generated[plane_id] = True
-        return
+        return winfo
 
     # not returned as pint quantitites but raw numbers. expected that the conversion happens later
     @property
@@ -158,33 +177,62 @@ class WiresBuilder(gegede.builder.Builder):
         # don't bother if upstream builders don't want it
         if not globals.get("wires"):
             return
+        tol = globals.get("wireLengthTol")
+        # volume name and placed length for every generated wire
+        self.wirevols = {}
         for plane in ['U', 'V', 'Z']:
             # generate the wires
             self.generate_wires(plane)
             winfo = self.winfos[plane]
             if plane == 'Z':
-                z = Q(str(winfo[0][3])+'cm')
+                z = Length(float(winfo['length'][0])).q
                 shape = geom.shapes.Tubs('CRMWireZ',
                                          rmin = Q('0cm'),
                                          rmax = 0.5*globals.get("padWidth"),
                                          dz = 0.5*z,
                                          sphi = Q("0deg"),
                                          dphi = Q("360deg"))
-                vol = geom.structure.Volume('volTPCWire'+plane+str(winfo[0][0]),
+                vol = geom.structure.Volume('volTPCWire'+plane,
                                             material = "Copper_Beryllium_alloy25",
                                             shape = shape)
                 self.add_volume(vol)
-            else:
+                self.wirevols[plane] = [(vol.name, l) for l in winfo['length'].tolist()]
+            elif tol is None:
+                self.wirevols[plane] = []
                 for wire in winfo:
-                    z = Q(str(wire[3])+'cm')
-                    shape = geom.shapes.Tubs('CRMWire'+plane+str(wire[0]),
+                    z = Length(float(wire['length'])).q
+                    shape = geom.shapes.Tubs('CRMWire'+plane+str(wire['channel']),
                                              rmin = Q('0cm'),
                                              rmax = 0.5*globals.get("padWidth"),
                                              dz = 0.5*z,
                                              sphi = Q("0deg"),
                                              dphi = Q("360deg"))
-                    vol = geom.structure.Volume('volTPCWire'+plane+str(wire[0]),
+                    vol = geom.structure.Volume('volTPCWire'+plane+str(wire['channel']),
+                                                material = "Copper_Beryllium_alloy25",
+                                                shape = shape)
+                    self.add_volume(vol)
+                    self.wirevols[plane].append((vol.name, float(wire['length'])))
+            else:
+                # one shape and volume per group of wires of (nearly) equal length
+                labels, pooled = pool_wire_lengths(winfo['length'], Q(tol).to('cm').magnitude)
+                pooled = pooled.tolist()
+                names = []
+                for k, plen in enumerate(pooled):
+                    shape = geom.shapes.Tubs('CRMWire%s_L%d' % (plane, k),
+                                             rmin = Q('0cm'),
+                                             rmax = 0.5*globals.get("padWidth"),
+                                             dz = 0.5*Length(plen).q,
+                                             sphi = Q("0deg"),
+                                             dphi = Q("360deg"))
+                    vol = geom.structure.Volume('volTPCWire%s_L%d' % (plane, k),
                                                 material = "Copper_Beryllium_alloy25",
                                                 shape = shape)
                     self.add_volume(vol)
+                    names.append(vol.name)
+                self.wirevols[plane] = [(names[k], pooled[k]) for k in labels.tolist()]
+
+        if globals.get("wireCrossingFile"):
+            from duneggd.wirecrossings import crossing_table_from_wires, write_crossing_tables
+            write_crossing_tables(globals.get("wireCrossingFile"),
+                                  {'CRM': crossing_table_from_wires(self.winfos)})
         return
@@ -51,4 +51,13 @@ class WorldBuilder(gegede.builder.Builder):
 
         # place it inside the world volume
         worldLV.placements.append(detenc_place.name)
+
+        if globals.get("maxDaughters"):
+            from duneggd.bucketing import bucket_daughters
+            bucket_daughters(geom, globals.get("maxDaughters"), world=worldLV.name)
+
+        # export the wire positions alongside the GDML
+        if globals.get("wireTableFile"):
+            from duneggd.wiretable import write_wire_table
+            write_wire_table(geom, globals.get("wireTableFile"), world=worldLV.name)
         return
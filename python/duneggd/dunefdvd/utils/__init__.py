@@ -2,4 +2,4 @@ from .globals import *
 from .definitions import *
 from .materials import *
 
-globals = Params()
+globals = CurrentParams()
@@ -1,8 +1,24 @@
 import sys
+import copy
+import contextlib
+import contextvars
 from gegede import Quantity as Q
+from duneggd import complexity
+
+# the methods of Params computing the derived parameters, by parameter
+_nodes = {}
+
+def _derived(method):
+    # declare a derived parameter, named after the method computing it
+    _nodes[method.__name__] = method
+    return method
 
 class Params:
-    _params = {}
+    '''
+    The parameters of a build. The class holds the defaults, each Params
+    starts from a copy of them, and the builders use the Params bound to
+    the context of the build (see current()).
+    '''
     _world = {}
     _tpc = {}
     _cryostat = {}
@@ -10,9 +26,6 @@ class Params:
     _fieldcage = {}
     _cathode = {}
     _arapuca = {}
-    # have the derived parameters been calculated yet
-    _hasDerived = False
-
     # set the long list of defaults
     _world['FieldCage_switch'] = True
     _world['Cathode_switch'] = True
@@ -21,6 +34,11 @@ class Params:
     _world['wires'] = True
     _world['tpc'] = True
     _world['simple'] = True
+    # write the binary wire table (see duneggd.wiretable) to this file
+    _world['wireTableFile'] = None
+    # move the daughters of the volumes holding more than this many of them
+    # into intermediate boxes (see duneggd.bucketing), None leaves them
+    _world['maxDaughters'] = None
 
     _tpc['nChans'] = {'Ind1': 286, 'Ind1Bot': 96, 'Ind2': 286, 'Col': 292}
     _tpc['wirePitchU'] = Q('0.765cm')
@@ -44,6 +62,17 @@ class Params:
 
     _tpc['driftTPCActive'] = Q('650.0cm')
     _tpc['padWidth'] = Q('0.02cm')
+    # merge induction wires whose lengths agree within this tolerance into
+    # one shared shape/volume (None keeps one volume per wire)
+    _tpc['wireLengthTol'] = None
+    # optional text file mapping the wire channels to their placements
+    _tpc['wireMapFile'] = None
+    # optional .npz file with the U x V x Z wire crossing table of a CRM
+    _tpc['wireCrossingFile'] = None
+    # optional directory memoizing the generated wire layouts, keeping the
+    # wireCacheEntries most recently used ones
+    _tpc['wireCacheDir'] = None
+    _tpc['wireCacheEntries'] = 64
 
     _cryostat['Argon_x'] = Q('1510cm')
     _cryostat['Argon_y'] = Q('1510cm')
@@ -114,6 +143,9 @@ class Params:
     _cathode['CathodeBorder'] = Q('4.0cm')
     _cathode['widthCathodeVoid'] = Q('76.35cm')
     _cathode['lengthCathodeVoid'] = Q('67.0cm')
+    # build the cathode frame from G10 bars (an assembly, no booleans)
+    # instead of subtracting the voids from a block
+    _cathode['cathodeFrameBars'] = False
 
     _arapuca['ArapucaOut_x'] = Q('65.0cm')
     _arapuca['ArapucaOut_y'] = Q('2.5cm')
@@ -130,313 +162,610 @@ class Params:
     _arapuca['VerticalPDdist'] = Q('75.0cm')
     _arapuca['FirstFrameVertDist'] = Q('40.0cm')
 
-    _params.update(_world)
-    _params.update(_tpc)
-    _params.update(_cryostat)
-    _params.update(_detenc)
-    _params.update(_fieldcage)
-    _params.update(_cathode)
-    _params.update(_arapuca)
+    def __init__(self):
+        cls = type(self)
+        self._world = copy.deepcopy(cls._world)
+        self._tpc = copy.deepcopy(cls._tpc)
+        self._cryostat = copy.deepcopy(cls._cryostat)
+        self._detenc = copy.deepcopy(cls._detenc)
+        self._fieldcage = copy.deepcopy(cls._fieldcage)
+        self._cathode = copy.deepcopy(cls._cathode)
+        self._arapuca = copy.deepcopy(cls._arapuca)
+
+        self._params = {}
+        self._params.update(self._world)
+        self._params.update(self._tpc)
+        self._params.update(self._cryostat)
+        self._params.update(self._detenc)
+        self._params.update(self._fieldcage)
+        self._params.update(self._cathode)
+        self._params.update(self._arapuca)
+
+        # memoized values of the derived parameters, the derived parameters
+        # computed from each parameter and those being computed, innermost last
+        self._cache = {}
+        self._dependents = {}
+        self._evaluating = []
 
     @property
     def World(self):
-        return type(self)._world
+        return self._world
 
     @World.setter
     def World(self, inputdict):
         if inputdict:
-            type(self)._world.update(inputdict)
-        type(self)._params.update(type(self)._world)
+            self._world.update(inputdict)
+            self._invalidate(inputdict)
+        self._params.update(self._world)
 
     @property
     def TPC(self):
-        return type(self)._tpc
+        return self._tpc
 
     @TPC.setter
     def TPC(self, inputdict):
         if inputdict:
-            type(self)._tpc.update(inputdict)
-        type(self)._params.update(type(self)._tpc)
+            self._tpc.update(inputdict)
+            self._invalidate(inputdict)
+        self._params.update(self._tpc)
 
     @property
     def Cryostat(self):
-        return type(self)._cryostat
+        return self._cryostat
 
     @Cryostat.setter
     def Cryostat(self, inputdict):
         if inputdict:
-            type(self)._cryostat.update(inputdict)
-        type(self)._params.update(type(self)._cryostat)
+            self._cryostat.update(inputdict)
+            self._invalidate(inputdict)
+        self._params.update(self._cryostat)
 
     @property
     def Enclosure(self):
-        return type(self)._detenc
+        return self._detenc
 
     @Enclosure.setter
     def Enclosure(self, inputdict):
         if inputdict:
-            type(self)._detenc.update(inputdict)
-        type(self)._params.update(type(self)._detenc)
+            self._detenc.update(inputdict)
+            self._invalidate(inputdict)
+        self._params.update(self._detenc)
 
     @property
     def FieldCage(self):
-        return type(self)._fieldcage
+        return self._fieldcage
 
     @FieldCage.setter
     def FieldCage(self, inputdict):
         if inputdict:
-            type(self)._fieldcage.update(inputdict)
-        type(self)._params.update(type(self)._fieldcage)
+            self._fieldcage.update(inputdict)
+            self._invalidate(inputdict)
+        self._params.update(self._fieldcage)
 
     @property
     def Cathode(self):
-        return type(self)._cathode
+        return self._cathode
 
     @Cathode.setter
     def Cathode(self, inputdict):
         if inputdict:
-            type(self)._cathode.update(inputdict)
-        type(self)._params.update(type(self)._cathode)
+            self._cathode.update(inputdict)
+            self._invalidate(inputdict)
+        self._params.update(self._cathode)
 
     @property
     def Arapuca(self):
-        return type(self)._arapuca
+        return self._arapuca
 
     @Arapuca.setter
     def Arapuca(self, inputdict):
         if inputdict:
-            type(self)._arapuca.update(inputdict)
-        type(self)._params.update(type(self)._arapuca)
+            self._arapuca.update(inputdict)
+            self._invalidate(inputdict)
+        self._params.update(self._arapuca)
+
+
+    def Set(self, key, value):
+        '''
+        Change the input parameter key, dropping the derived parameters
+        computed from it, which are computed again when next asked for.
+        '''
+        for section in (self._world, self._tpc, self._cryostat, self._detenc,
+                        self._fieldcage, self._cathode, self._arapuca):
+            if key in section:
+                section[key] = value
+                self._params[key] = value
+                self._invalidate([key])
+                return
+        print("Unknown input parameter : %s. Exiting" % key)
+        sys.exit(1)
 
     def SetDerived(self):
-        cls = type(self)
-        # calculate all the other parameters
-        # accessible only once construction begins
-        if cls._hasDerived:
-            return
-
-        # TPC parameters
-        cls._tpc['nViews'] = len(cls._tpc['nChans'])
-        cls._tpc['lengthPCBActive'] = cls._tpc['wirePitchZ'] * cls._tpc['nChans']['Col']
-        cls._tpc['widthCRM_active'] = cls._tpc['widthPCBActive']
-        cls._tpc['lengthCRM_active'] = cls._tpc['lengthPCBActive']
-        cls._tpc['widthCRM'] = cls._tpc['widthPCBActive']
-        cls._tpc['lengthCRM'] = cls._tpc['lengthPCBActive']
-
-        cls._tpc['gapSST1_z'] = Q('3cm') - cls._tpc['gapCRP']
-        cls._tpc['gapSST2_z'] = Q('2.4cm') - cls._tpc['gapCRP']
-        cls._tpc['gapSST_y'] = Q('2.4cm') - cls._tpc['gapCRP']
-        cls._tpc['gapSST_ybottom'] = Q('2.4cm') - cls._tpc['gapCRP']
+        # the derived parameters are computed when first asked for (see
+        # get()), nothing to do before the construction begins
+        pass
 
+    def get(self, key):
+        self._depend(key)
+        if key in _nodes:
+            if key not in self._cache:
+                self._cache[key] = self._evaluate(key)
+            return self._cache[key]
+        if key not in self._params:
+            print("Unable to access requested parameter : %s. Exiting" % key)
+            sys.exit(1)
+        return self._params[key]
+
+    def input(self, key):
+        # the value of key as configured, for the derived parameters
+        # overriding it
+        self._depend(key)
+        return self._params[key]
+
+    def _depend(self, key):
+        # record that the derived parameter being computed uses key
+        if self._evaluating:
+            self._dependents.setdefault(key, set()).add(self._evaluating[-1])
+
+    def _evaluate(self, key):
+        if key in self._evaluating:
+            raise RuntimeError('Derived parameter %s depends on itself through %s'
+                               % (key, ' -> '.join(self._evaluating)))
+        self._evaluating.append(key)
+        try:
+            return _nodes[key](self)
+        finally:
+            self._evaluating.pop()
+
+    def _invalidate(self, keys):
+        # drop the derived parameters computed from keys, and those computed
+        # from them
+        todo = list(keys)
+        while todo:
+            for dep in self._dependents.pop(todo.pop(), ()):
+                self._cache.pop(dep, None)
+                todo.append(dep)
+
+    def _cavern(self):
+        # the actual dimensions and the cavern, in the full geometries
+        return not self.get('simple') and (self.get('workspace') == 0 or self.get('workspace') == 4)
+
+    # TPC parameters
+    @_derived
+    def nViews(self):
+        return len(self.get('nChans'))
+
+    @_derived
+    def lengthPCBActive(self):
+        return self.get('wirePitchZ') * self.get('nChans')['Col']
+
+    @_derived
+    def widthCRM_active(self):
+        return self.get('widthPCBActive')
+
+    @_derived
+    def lengthCRM_active(self):
+        return self.get('lengthPCBActive')
+
+    @_derived
+    def widthCRM(self):
+        return self.get('widthPCBActive')
+
+    @_derived
+    def lengthCRM(self):
+        return self.get('lengthPCBActive')
+
+    @_derived
+    def gapSST1_z(self):
+        return Q('3cm') - self.get('gapCRP')
+
+    @_derived
+    def gapSST2_z(self):
+        return Q('2.4cm') - self.get('gapCRP')
+
+    @_derived
+    def gapSST_y(self):
+        return Q('2.4cm') - self.get('gapCRP')
+
+    @_derived
+    def gapSST_ybottom(self):
+        return Q('2.4cm') - self.get('gapCRP')
+
+    # the CRM layouts of the workspaces, overriding the configured one
+    _workspaces = {
         # create a smaller geometry :  with SST2 and SST1 it is 1x8x14
-        if cls._world['workspace'] == 1:
-            cls._tpc['nCRM_x'] = 1
-            cls._tpc['nSST_y'] = 2
-            cls._tpc['nSST1_z'] = 2
-            cls._tpc['nSST2_z'] = 1
+        1: dict(nCRM_x=1, nSST_y=2, nSST1_z=2, nSST2_z=1),
         # create full geometry with only one drift volume 1x8x40
-        if cls._world['workspace'] == 2:
-            cls._tpc['nCRM_x'] = 1
-            cls._tpc['nSST_y'] = 2
-            cls._tpc['nSST1_z'] = 6
-            cls._tpc['nSST2_z'] = 2
+        2: dict(nCRM_x=1, nSST_y=2, nSST1_z=6, nSST2_z=2),
         #test with a final SST2 and bottom
-        if cls._world['workspace'] == 3:
-            cls._tpc['nCRM_x'] = 2
-            cls._tpc['nSST_y'] = 2
-            cls._tpc['nSST1_z'] = 2
-            cls._tpc['nSST2_z'] = 2
+        3: dict(nCRM_x=2, nSST_y=2, nSST1_z=2, nSST2_z=2),
         # create full geometry with top and bottom drift volume 2x8x40
-        if cls._world['workspace'] == 4:
-            cls._tpc['nCRM_x'] = 2
-            cls._tpc['nSST_y'] = 2
-            cls._tpc['nSST1_z'] = 6
-            cls._tpc['nSST2_z'] = 2
-
-        cls._tpc['nCRM_z'] = cls._tpc['nSST1_z'] * 3 * 2 + \
-                                    cls._tpc['nSST2_z'] * 2
-        cls._tpc['nCRM_y'] = cls._tpc['nSST_y'] * 2 * 2
-
-
-        cls._tpc['widthTPCActive'] = cls._tpc['nCRM_y'] * (cls._tpc['widthCRM'] + cls._tpc['borderCRP']) + (cls._tpc['nSST_y'] - 1) * cls._tpc['gapSST_y']
-        cls._tpc['lengthTPCActive'] = cls._tpc['nCRM_z'] * (cls._tpc['lengthCRM'] + cls._tpc['borderCRP']) + (cls._tpc['nSST1_z'] - 1) * cls._tpc['gapSST1_z'] + cls._tpc['nSST2_z'] * cls._tpc['gapSST2_z']
-        cls._tpc['lengthTPCActivebottom'] = cls._tpc['nCRM_z'] * (cls._tpc['lengthCRM'] + cls._tpc['borderCRUBottom_z']) + cls._tpc['gapSST1_z']
-
-
-        cls._tpc['ReadoutPlane'] = cls._tpc['nViews'] * cls._tpc['padWidth']
-        cls._tpc['anodePlateWidth'] = cls._tpc['padWidth']/2.
-        cls._tpc['lengthAnodeBottom'] = cls._tpc['lengthCRM']
-        cls._tpc['TPCActive_x'] = cls._tpc['driftTPCActive']
-        cls._tpc['TPCActive_y'] = cls._tpc['widthCRM_active']
-        cls._tpc['TPCActive_z'] = cls._tpc['lengthCRM_active']
-        cls._tpc['TPC_x'] = cls._tpc['TPCActive_x'] + cls._tpc['ReadoutPlane']
-        cls._tpc['TPC_y'] = cls._tpc['widthCRM']
-        cls._tpc['TPC_z'] = cls._tpc['lengthCRM']
-
-        if not cls._world['simple'] and (cls._world['workspace'] == 0 or cls._world['workspace'] == 4):
-            # actual dimensions
-            cls._cryostat['Argon_x'] = Q('1400cm')
-            cls._cryostat['HeightGaseousAr'] = Q('5cm')
-
-        # Cryostat parameters
-        if cls._world['workspace'] != 0:
-            if cls._tpc['nCRM_x']== 1:
-                cls._cryostat['Argon_x'] = cls._tpc['driftTPCActive'] + cls._cryostat['HeightGaseousAr'] +                 \
-                                                  cls._tpc['ReadoutPlane'] + Q('100cm')
-            cls._cryostat['Argon_y'] = cls._tpc['widthTPCActive'] + Q('162cm')
-            cls._cryostat['Argon_z'] = cls._tpc['lengthTPCActive'] + Q('214.0cm')
-
-        if cls._tpc['nCRM_x'] == 1:
-            cls._cryostat['xLArBuffer'] = cls._cryostat['Argon_x'] - cls._tpc['driftTPCActive'] -                          \
-                                                 cls._cryostat['HeightGaseousAr'] - cls._tpc['ReadoutPlane'] -             \
-                                                 cls._cathode['heightCathode']
-        else:
-            cls._cryostat['xLArBuffer'] = cls._cryostat['Argon_x'] - 2*cls._tpc['driftTPCActive'] -                        \
-                                                 cls._cryostat['HeightGaseousAr'] - 2*cls._tpc['ReadoutPlane'] -           \
-                                                 cls._cathode['heightCathode']
-        cls._cryostat['yLArBuffer'] = 0.5 * (cls._cryostat['Argon_y'] - cls._tpc['widthTPCActive'])
-        cls._cryostat['zLArBuffer'] = 0.5 * (cls._cryostat['Argon_z'] - cls._tpc['lengthTPCActive'])
-        cls._cryostat['Cryostat_x'] = cls._cryostat['Argon_x'] + 2*cls._cryostat['SteelThickness']
-        cls._cryostat['Cryostat_y'] = cls._cryostat['Argon_y'] + 2*cls._cryostat['SteelThickness']
-        cls._cryostat['Cryostat_z'] = cls._cryostat['Argon_z'] + 2*cls._cryostat['SteelThickness']
-        cls._cryostat['TPCEnclosure_x'] = cls._cryostat['Argon_x'] -                                                       \
-                                                 cls._cryostat['HeightGaseousAr'] +                                        \
-                                                 cls._tpc['nCRM_x']*cls._tpc['anodePlateWidth'] -                          \
-                                                 cls._cryostat['xLArBuffer']
-
-        cls._cryostat['TPCEnclosure_y'] = cls._tpc['nCRM_y']*(cls._tpc['widthCRM'] + cls._tpc['borderCRP']) +              \
-                                          (cls._tpc['nSST_y'] - 1) * cls._tpc['gapSST_y']
-        cls._cryostat['TPCEnclosure_ybottom'] = cls._tpc['nCRM_y']*(cls._tpc['widthCRM'] + cls._tpc['borderCRUBottom_y'])+ \
-                                                cls._tpc['gapSST_ybottom']
-        cls._cryostat['TPCEnclosure_z'] = cls._tpc['nCRM_z']*(cls._tpc['lengthCRM'] + cls._tpc['borderCRP']) +             \
-                                          (cls._tpc['nSST1_z'] - 1) * cls._tpc['gapSST1_z'] +                              \
-                                          cls._tpc['nSST2_z'] * cls._tpc['gapSST2_z']
-
-
-
-        # Enclosure parameters
-        cls._detenc['FracMassOfAir'] = 1 - cls._detenc['FracMassOfSteel']
-        cls._detenc['DetEncX']  =    cls._cryostat['Cryostat_x'] +                                                         \
-                                            2*(cls._detenc['SteelSupport_x'] +                                             \
-                                            cls._detenc['FoamPadding']) +                                                  \
-                                            cls._detenc['SpaceSteelSupportToCeiling']
-        cls._detenc['DetEncY']  =    cls._cryostat['Cryostat_y'] +                                                         \
-                                            2*(cls._detenc['SteelSupport_y'] +                                             \
-                                            cls._detenc['FoamPadding']) +                                                  \
-                                            2*cls._detenc['SpaceSteelSupportToWall']
-        cls._detenc['DetEncZ']  =    cls._cryostat['Cryostat_z'] +                                                         \
-                                            2*(cls._detenc['SteelSupport_z'] +                                             \
-                                            cls._detenc['FoamPadding']) +                                                  \
-                                            2*cls._detenc['SpaceSteelSupportToWall']
-
-        cls._detenc['posCryoInDetEnc_x'] = - cls._detenc['DetEncX']/2 +                                                    \
-                                                    cls._detenc['SteelSupport_x'] +                                        \
-                                                    cls._detenc['FoamPadding'] +                                           \
-                                                    cls._cryostat['Cryostat_x']/2
-        cls._detenc['posCryoInDetEnc_y'] = Q('0m')
-        cls._detenc['posCryoInDetEnc_z'] = Q('0m')
-
-        cls._detenc['OriginXSet'] =  cls._detenc['DetEncX']/2.0 - cls._detenc['SteelSupport_x'] -                          \
-                                            cls._detenc['FoamPadding'] - cls._cryostat['SteelThickness'] -                 \
-                                            cls._cryostat['xLArBuffer'] - cls._tpc['driftTPCActive']/2.0 -                 \
-                                            cls._cathode['heightCathode']
-        if cls._tpc['nCRM_x'] == 2:
-            cls._detenc['OriginXSet'] =  cls._detenc['DetEncX']/2.0 - cls._detenc['SteelSupport_x'] -                      \
-                                                cls._detenc['FoamPadding'] - cls._cryostat['SteelThickness'] -             \
-                                                cls._cryostat['xLArBuffer'] - cls._tpc['driftTPCActive']/2.0 -             \
-                                                cls._cathode['heightCathode']/2.
-
-        cls._detenc['OriginYSet'] =  cls._detenc['DetEncY']/2.0 - cls._detenc['SpaceSteelSupportToWall'] -                 \
-                                            cls._detenc['SteelSupport_y'] - cls._detenc['FoamPadding'] -                   \
-                                            cls._cryostat['SteelThickness'] - cls._cryostat['yLArBuffer'] -                \
-                                            cls._tpc['widthTPCActive']/2.0
-        cls._detenc['OriginZSet'] =  cls._detenc['DetEncZ']/2.0 - cls._detenc['SpaceSteelSupportToWall'] -                 \
-                                            cls._detenc['SteelSupport_z'] - cls._detenc['FoamPadding'] -                   \
-                                            cls._cryostat['SteelThickness'] - cls._cryostat['zLArBuffer']
-
-        if not cls._world['simple'] and (cls._world['workspace'] == 0 or cls._world['workspace'] == 4):
-            cls._detenc['DetEncX'] = cls._detenc['Cavern_x']
-            cls._detenc['DetEncY'] = cls._detenc['Cavern_y']
-            cls._detenc['DetEncZ'] = cls._detenc['Cavern_z']
-
-            cls._detenc['posCryoInDetEnc_x'] = -0.5*cls._detenc['DetEncX'] +                                               \
-                                                      cls._detenc['ConcreteBeamGap_x'] +                                   \
-                                                      cls._detenc['ConcreteThickness'] +                                   \
-                                                      cls._detenc['GroutThickness'] +                                      \
-                                                      0.5*cls._detenc['FullCryostat_x'] +                                  \
-                                                      0.5*cls._detenc['RadioRockThickness']
-            cls._detenc['posCryoInDetEnc_y'] = Q('0m')
-            cls._detenc['posCryoInDetEnc_z'] = -0.5*cls._detenc['DetEncZ'] +                                               \
-                                                      cls._detenc['ConcreteBeamGap_z'] +                                   \
-                                                      0.5*cls._detenc['FullCryostat_z']
-
-            cls._detenc['OriginXSet'] =  cls._detenc['DetEncX']/2.0  -                                                     \
-                                                cls._detenc['ConcreteBeamGap_x'] -                                         \
-                                                cls._detenc['ConcreteThickness'] -                                         \
-                                                cls._detenc['GroutThickness'] -                                            \
-                                                0.5*cls._detenc['RadioRockThickness'] -                                    \
-                                                cls._cryostat['SteelThickness'] -                                          \
-                                                cls._cryostat['xLArBuffer'] -                                              \
-                                                cls._tpc['driftTPCActive']/2.0 -                                           \
-                                                cls._cathode['heightCathode']/2.
-            cls._detenc['OriginYSet'] =  cls._detenc['DetEncY']/2.0 -                                                      \
-                                                cls._cryostat['SteelThickness'] -                                          \
-                                                cls._cryostat['yLArBuffer'] -                                              \
-                                                cls._tpc['widthTPCActive']/2.0
-            cls._detenc['OriginZSet'] =  cls._detenc['DetEncZ']/2.0 -                                                      \
-                                                cls._cryostat['SteelThickness'] -                                          \
-                                                cls._detenc['ConcreteBeamGap_z'] -                                         \
-                                                cls._cryostat['zLArBuffer']
-
-
-        # FieldCage parameters
-        cls._fieldcage['FieldShaperLongTubeLength']  =  cls._tpc['lengthTPCActive']
-        cls._fieldcage['FieldShaperShortTubeLength'] =  cls._tpc['widthTPCActive']
-        cls._fieldcage['FieldShaperLength'] = cls._fieldcage['FieldShaperLongTubeLength'] +                                \
-                                                     2*cls._fieldcage['FieldShaperOuterRadius'] +                          \
-                                                     2*cls._fieldcage['FieldShaperTorRad']
-        cls._fieldcage['FieldShaperWidth'] =  cls._fieldcage['FieldShaperShortTubeLength'] +                               \
-                                                     2*cls._fieldcage['FieldShaperOuterRadius'] +                          \
-                                                     2*cls._fieldcage['FieldShaperTorRad']
-        cls._fieldcage['NFieldShapers']  = (cls._tpc['driftTPCActive']/cls._fieldcage['FieldShaperSeparation']) - 1
-        cls._fieldcage['FieldCageSizeX'] = cls._fieldcage['FieldShaperSeparation']*cls._fieldcage['NFieldShapers'] +       \
-                                                  Q('2cm')
-        cls._fieldcage['FieldCageSizeY'] = cls._fieldcage['FieldShaperWidth'] + Q('2cm')
-        cls._fieldcage['FieldCageSizeZ'] = cls._fieldcage['FieldShaperLength'] + Q('2cm')
-
-
-        # Cathode parameters
-        cls._cathode['widthCathode'] =2*(cls._tpc['widthCRM'] + cls._tpc['borderCRP'])
-        cls._cathode['widthCathodeBottom'] =2*(cls._tpc['widthCRM'] + cls._tpc['borderCRUBottom_y'])
-        cls._cathode['lengthCathode']=2*(cls._tpc['lengthCRM'] + cls._tpc['borderCRP'])
-        cls._cathode['lengthCathodeBottom'] =2*(cls._tpc['lengthCRM'] + cls._tpc['borderCRUBottom_z'])
-
-        # Arapuca parameters
-        cls._arapuca['list_posy_bot'] = [0]*4
-        cls._arapuca['list_posz_bot'] = [0]*4
-        cls._arapuca['list_posy_bot'][0]= -2.0*cls._cathode['widthCathodeVoid'] -                                          \
-                                                 2.0*cls._cathode['CathodeBorder'] +                                       \
-                                                 cls._arapuca['GapPD'] + 0.5*cls._arapuca['ArapucaOut_x']
-        cls._arapuca['list_posz_bot'][0]= -(0.5*cls._cathode['lengthCathodeVoid'] + cls._cathode['CathodeBorder'])
-        cls._arapuca['list_posy_bot'][1]= cls._cathode['CathodeBorder'] + cls._arapuca['GapPD'] +                          \
-                                                 0.5*cls._arapuca['ArapucaOut_x']
-        cls._arapuca['list_posz_bot'][1]=-1.5*cls._cathode['lengthCathodeVoid'] - 2.0*cls._cathode['CathodeBorder']
-        cls._arapuca['list_posy_bot'][2]=-cls._arapuca['list_posy_bot'][1]
-        cls._arapuca['list_posz_bot'][2]=-cls._arapuca['list_posz_bot'][1]
-        cls._arapuca['list_posy_bot'][3]=-cls._arapuca['list_posy_bot'][0]
-        cls._arapuca['list_posz_bot'][3]=-cls._arapuca['list_posz_bot'][0]
-
-        # add it to global list
-        cls._params.update(cls._tpc)
-        cls._params.update(cls._cryostat)
-        cls._params.update(cls._detenc)
-        cls._params.update(cls._fieldcage)
-        cls._params.update(cls._cathode)
-        cls._params.update(cls._arapuca)
-        cls._hasDerived = True
-
-    def get(self, key):
-        if key not in type(self)._params:
-            print("Unable to access requested parameter : %s, maybe you need to call SetDerived(). Exiting" % key)
-            sys.exit(1)
-        return type(self)._params[key]
+        4: dict(nCRM_x=2, nSST_y=2, nSST1_z=6, nSST2_z=2),
+    }
+
+    def _layout(self, key):
+        layout = self._workspaces.get(self.get('workspace'), {})
+        return layout[key] if key in layout else self.input(key)
+
+    @_derived
+    def nCRM_x(self):
+        return self._layout('nCRM_x')
+
+    @_derived
+    def nSST_y(self):
+        return self._layout('nSST_y')
+
+    @_derived
+    def nSST1_z(self):
+        return self._layout('nSST1_z')
+
+    @_derived
+    def nSST2_z(self):
+        return self._layout('nSST2_z')
+
+    @_derived
+    def nCRM_z(self):
+        return self.get('nSST1_z') * 3 * 2 + \
+               self.get('nSST2_z') * 2
+
+    @_derived
+    def nCRM_y(self):
+        return self.get('nSST_y') * 2 * 2
+
+    @_derived
+    def widthTPCActive(self):
+        return self.get('nCRM_y') * (self.get('widthCRM') + self.get('borderCRP')) + (self.get('nSST_y') - 1) * self.get('gapSST_y')
+
+    @_derived
+    def lengthTPCActive(self):
+        return self.get('nCRM_z') * (self.get('lengthCRM') + self.get('borderCRP')) + (self.get('nSST1_z') - 1) * self.get('gapSST1_z') + self.get('nSST2_z') * self.get('gapSST2_z')
+
+    @_derived
+    def lengthTPCActivebottom(self):
+        return self.get('nCRM_z') * (self.get('lengthCRM') + self.get('borderCRUBottom_z')) + self.get('gapSST1_z')
+
+    @_derived
+    def ReadoutPlane(self):
+        return self.get('nViews') * self.get('padWidth')
+
+    @_derived
+    def anodePlateWidth(self):
+        return self.get('padWidth')/2.
+
+    @_derived
+    def lengthAnodeBottom(self):
+        return self.get('lengthCRM')
+
+    @_derived
+    def TPCActive_x(self):
+        return self.get('driftTPCActive')
+
+    @_derived
+    def TPCActive_y(self):
+        return self.get('widthCRM_active')
+
+    @_derived
+    def TPCActive_z(self):
+        return self.get('lengthCRM_active')
+
+    @_derived
+    def TPC_x(self):
+        return self.get('TPCActive_x') + self.get('ReadoutPlane')
+
+    @_derived
+    def TPC_y(self):
+        return self.get('widthCRM')
+
+    @_derived
+    def TPC_z(self):
+        return self.get('lengthCRM')
+
+    # Cryostat parameters
+    @_derived
+    def HeightGaseousAr(self):
+        if self._cavern():
+            return Q('5cm')
+        return self.input('HeightGaseousAr')
+
+    @_derived
+    def Argon_x(self):
+        if self.get('workspace') != 0 and self.get('nCRM_x') == 1:
+            return self.get('driftTPCActive') + self.get('HeightGaseousAr') +                                           \
+                   self.get('ReadoutPlane') + Q('100cm')
+        if self._cavern():
+            return Q('1400cm')
+        return self.input('Argon_x')
+
+    @_derived
+    def Argon_y(self):
+        if self.get('workspace') != 0:
+            return self.get('widthTPCActive') + Q('162cm')
+        return self.input('Argon_y')
+
+    @_derived
+    def Argon_z(self):
+        if self.get('workspace') != 0:
+            return self.get('lengthTPCActive') + Q('214.0cm')
+        return self.input('Argon_z')
+
+    @_derived
+    def xLArBuffer(self):
+        if self.get('nCRM_x') == 1:
+            return self.get('Argon_x') - self.get('driftTPCActive') -                                                   \
+                   self.get('HeightGaseousAr') - self.get('ReadoutPlane') -                                             \
+                   self.get('heightCathode')
+        return self.get('Argon_x') - 2*self.get('driftTPCActive') -                                                     \
+               self.get('HeightGaseousAr') - 2*self.get('ReadoutPlane') -                                               \
+               self.get('heightCathode')
+
+    @_derived
+    def yLArBuffer(self):
+        return 0.5 * (self.get('Argon_y') - self.get('widthTPCActive'))
+
+    @_derived
+    def zLArBuffer(self):
+        return 0.5 * (self.get('Argon_z') - self.get('lengthTPCActive'))
+
+    @_derived
+    def Cryostat_x(self):
+        return self.get('Argon_x') + 2*self.get('SteelThickness')
+
+    @_derived
+    def Cryostat_y(self):
+        return self.get('Argon_y') + 2*self.get('SteelThickness')
+
+    @_derived
+    def Cryostat_z(self):
+        return self.get('Argon_z') + 2*self.get('SteelThickness')
+
+    @_derived
+    def TPCEnclosure_x(self):
+        return self.get('Argon_x') -                                                                                    \
+               self.get('HeightGaseousAr') +                                                                            \
+               self.get('nCRM_x')*self.get('anodePlateWidth') -                                                         \
+               self.get('xLArBuffer')
+
+    @_derived
+    def TPCEnclosure_y(self):
+        return self.get('nCRM_y')*(self.get('widthCRM') + self.get('borderCRP')) +                                      \
+               (self.get('nSST_y') - 1) * self.get('gapSST_y')
+
+    @_derived
+    def TPCEnclosure_ybottom(self):
+        return self.get('nCRM_y')*(self.get('widthCRM') + self.get('borderCRUBottom_y'))+                               \
+               self.get('gapSST_ybottom')
+
+    @_derived
+    def TPCEnclosure_z(self):
+        return self.get('nCRM_z')*(self.get('lengthCRM') + self.get('borderCRP')) +                                     \
+               (self.get('nSST1_z') - 1) * self.get('gapSST1_z') +                                                      \
+               self.get('nSST2_z') * self.get('gapSST2_z')
+
+    # Enclosure parameters
+    @_derived
+    def FracMassOfAir(self):
+        return 1 - self.get('FracMassOfSteel')
+
+    @_derived
+    def DetEncX(self):
+        if self._cavern():
+            return self.get('Cavern_x')
+        return self.get('Cryostat_x') +                                                                                 \
+               2*(self.get('SteelSupport_x') +                                                                          \
+               self.get('FoamPadding')) +                                                                               \
+               self.get('SpaceSteelSupportToCeiling')
+
+    @_derived
+    def DetEncY(self):
+        if self._cavern():
+            return self.get('Cavern_y')
+        return self.get('Cryostat_y') +                                                                                 \
+               2*(self.get('SteelSupport_y') +                                                                          \
+               self.get('FoamPadding')) +                                                                               \
+               2*self.get('SpaceSteelSupportToWall')
+
+    @_derived
+    def DetEncZ(self):
+        if self._cavern():
+            return self.get('Cavern_z')
+        return self.get('Cryostat_z') +                                                                                 \
+               2*(self.get('SteelSupport_z') +                                                                          \
+               self.get('FoamPadding')) +                                                                               \
+               2*self.get('SpaceSteelSupportToWall')
+
+    @_derived
+    def posCryoInDetEnc_x(self):
+        if self._cavern():
+            return -0.5*self.get('DetEncX') +                                                                           \
+                   self.get('ConcreteBeamGap_x') +                                                                      \
+                   self.get('ConcreteThickness') +                                                                      \
+                   self.get('GroutThickness') +                                                                         \
+                   0.5*self.get('FullCryostat_x') +                                                                     \
+                   0.5*self.get('RadioRockThickness')
+        return - self.get('DetEncX')/2 +                                                                                \
+               self.get('SteelSupport_x') +                                                                             \
+               self.get('FoamPadding') +                                                                                \
+               self.get('Cryostat_x')/2
+
+    @_derived
+    def posCryoInDetEnc_y(self):
+        return Q('0m')
+
+    @_derived
+    def posCryoInDetEnc_z(self):
+        if self._cavern():
+            return -0.5*self.get('DetEncZ') +                                                                           \
+                   self.get('ConcreteBeamGap_z') +                                                                      \
+                   0.5*self.get('FullCryostat_z')
+        return Q('0m')
+
+    @_derived
+    def OriginXSet(self):
+        if self._cavern():
+            return self.get('DetEncX')/2.0  -                                                                           \
+                   self.get('ConcreteBeamGap_x') -                                                                      \
+                   self.get('ConcreteThickness') -                                                                      \
+                   self.get('GroutThickness') -                                                                         \
+                   0.5*self.get('RadioRockThickness') -                                                                 \
+                   self.get('SteelThickness') -                                                                         \
+                   self.get('xLArBuffer') -                                                                             \
+                   self.get('driftTPCActive')/2.0 -                                                                     \
+                   self.get('heightCathode')/2.
+        if self.get('nCRM_x') == 2:
+            return self.get('DetEncX')/2.0 - self.get('SteelSupport_x') -                                               \
+                   self.get('FoamPadding') - self.get('SteelThickness') -                                               \
+                   self.get('xLArBuffer') - self.get('driftTPCActive')/2.0 -                                            \
+                   self.get('heightCathode')/2.
+        return self.get('DetEncX')/2.0 - self.get('SteelSupport_x') -                                                   \
+               self.get('FoamPadding') - self.get('SteelThickness') -                                                   \
+               self.get('xLArBuffer') - self.get('driftTPCActive')/2.0 -                                                \
+               self.get('heightCathode')
+
+    @_derived
+    def OriginYSet(self):
+        if self._cavern():
+            return self.get('DetEncY')/2.0 -                                                                            \
+                   self.get('SteelThickness') -                                                                         \
+                   self.get('yLArBuffer') -                                                                             \
+                   self.get('widthTPCActive')/2.0
+        return self.get('DetEncY')/2.0 - self.get('SpaceSteelSupportToWall') -                                          \
+               self.get('SteelSupport_y') - self.get('FoamPadding') -                                                   \
+               self.get('SteelThickness') - self.get('yLArBuffer') -                                                    \
+               self.get('widthTPCActive')/2.0
+
+    @_derived
+    def OriginZSet(self):
+        if self._cavern():
+            return self.get('DetEncZ')/2.0 -                                                                            \
+                   self.get('SteelThickness') -                                                                         \
+                   self.get('ConcreteBeamGap_z') -                                                                      \
+                   self.get('zLArBuffer')
+        return self.get('DetEncZ')/2.0 - self.get('SpaceSteelSupportToWall') -                                          \
+               self.get('SteelSupport_z') - self.get('FoamPadding') -                                                   \
+               self.get('SteelThickness') - self.get('zLArBuffer')
+
+    # FieldCage parameters
+    @_derived
+    def FieldShaperLongTubeLength(self):
+        return self.get('lengthTPCActive')
+
+    @_derived
+    def FieldShaperShortTubeLength(self):
+        return self.get('widthTPCActive')
+
+    @_derived
+    def FieldShaperLength(self):
+        return self.get('FieldShaperLongTubeLength') +                                                                  \
+               2*self.get('FieldShaperOuterRadius') +                                                                   \
+               2*self.get('FieldShaperTorRad')
+
+    @_derived
+    def FieldShaperWidth(self):
+        return self.get('FieldShaperShortTubeLength') +                                                                 \
+               2*self.get('FieldShaperOuterRadius') +                                                                   \
+               2*self.get('FieldShaperTorRad')
+
+    @_derived
+    def NFieldShapers(self):
+        return (self.get('driftTPCActive')/self.get('FieldShaperSeparation')) - 1
+
+    @_derived
+    def FieldCageSizeX(self):
+        return self.get('FieldShaperSeparation')*self.get('NFieldShapers') +                                            \
+               Q('2cm')
+
+    @_derived
+    def FieldCageSizeY(self):
+        return self.get('FieldShaperWidth') + Q('2cm')
+
+    @_derived
+    def FieldCageSizeZ(self):
+        return self.get('FieldShaperLength') + Q('2cm')
+
+    # Cathode parameters
+    @_derived
+    def widthCathode(self):
+        return 2*(self.get('widthCRM') + self.get('borderCRP'))
+
+    @_derived
+    def widthCathodeBottom(self):
+        return 2*(self.get('widthCRM') + self.get('borderCRUBottom_y'))
+
+    @_derived
+    def lengthCathode(self):
+        return 2*(self.get('lengthCRM') + self.get('borderCRP'))
+
+    @_derived
+    def lengthCathodeBottom(self):
+        return 2*(self.get('lengthCRM') + self.get('borderCRUBottom_z'))
+
+    # Arapuca parameters
+    @_derived
+    def list_posy_bot(self):
+        posy0 = -2.0*self.get('widthCathodeVoid') -                                                                     \
+                2.0*self.get('CathodeBorder') +                                                                         \
+                self.get('GapPD') + 0.5*self.get('ArapucaOut_x')
+        posy1 = self.get('CathodeBorder') + self.get('GapPD') +                                                         \
+                0.5*self.get('ArapucaOut_x')
+        return [posy0, posy1, -posy1, -posy0]
+
+    @_derived
+    def list_posz_bot(self):
+        posz0 = -(0.5*self.get('lengthCathodeVoid') + self.get('CathodeBorder'))
+        posz1 = -1.5*self.get('lengthCathodeVoid') - 2.0*self.get('CathodeBorder')
+        return [posz0, posz1, -posz1, -posz0]
+
+
+# the Params of the build running in a context: each thread and each
+# asyncio task has its own, builds in parallel do not share parameters
+_context = contextvars.ContextVar('dunefdvd_params')
+
+def current():
+    '''
+    Return the Params bound to the current context, binding new default
+    ones if there are none yet.
+    '''
+    params = _context.get(None)
+    if params is None:
+        params = Params()
+        _context.set(params)
+    return params
+
+@contextlib.contextmanager
+def parameters(params=None):
+    '''
+    Bind params, new default ones if None, to the builders configured
+    and constructed in the with block, and restore the previous ones on
+    leaving it.
+    '''
+    if params is None:
+        params = Params()
+    token = _context.set(params)
+    try:
+        yield params
+    finally:
+        _context.reset(token)
+
+class CurrentParams:
+    '''
+    Stand-in for the Params of the current context, the "globals" of the
+    builders.
+    '''
+    def __getattr__(self, name):
+        return getattr(current(), name)
+
+    def __setattr__(self, name, value):
+        setattr(current(), name, value)
+
+def build(configs, world=None, params=None):
+    '''
+    Generate the geometry of the configuration files like gegede-cli, with
+    its own params (new default ones if None), so that several variants
+    can be built in one process, one after the other or in parallel
+    threads:
+
+        >>> geom1 = build(['dunevd_v7_ws1.cfg'])
+        >>> geom4 = build(['dunevd_v7_ws4.cfg'])
+    '''
+    with parameters(params):
+        return complexity.build(configs, world)
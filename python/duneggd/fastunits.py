@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+'''
+Light-weight lengths for the builder loops.
+
+pint Quantities are expensive to create (in particular from strings such
+as Q(str(x)+'cm')) and to combine. Length holds a plain number in a fixed
+unit and implements the arithmetic used to lay out volumes at the cost of
+a float operation. The unit is that of the GDML <position> elements, cm,
+so that turning a value back into a Quantity for the export is exact.
+
+gegede coerces every parameter through the pint Quantity constructor, which
+has no hook for foreign types: hand values to gegede as .q (or through
+quantity(), which passes anything else through).
+
+    >>> x = Length(Q('1m'))
+    >>> (x + 2*Length(5)).q
+    <Quantity(110.0, 'centimeter')>
+'''
+
+from numbers import Number
+
+from gegede import Quantity
+
+
+class UnitValue(object):
+    '''
+    A number in the fixed unit of the subclass.
+    '''
+    __slots__ = ('value',)
+    unit = None
+    _units = None               # parsed unit, shared by the Quantities
+
+    def __init__(self, value=0):
+        if isinstance(value, UnitValue):
+            value = self._coerce(value)
+        elif isinstance(value, (Quantity, str)):
+            value = Quantity(value).to(self.unit).magnitude
+        self.value = value
+
+    @classmethod
+    def _make(cls, value):
+        obj = object.__new__(cls)
+        obj.value = value
+        return obj
+
+    def _coerce(self, other):
+        if type(other) is type(self):
+            return other.value
+        if isinstance(other, Quantity):
+            return other.to(self.unit).magnitude
+        if isinstance(other, Number) and other == 0:
+            return other                # sum() and comparisons with 0
+        raise TypeError('Incompatible operand for %s: %r' % (type(self).__name__, other))
+
+    @property
+    def q(self):
+        '''
+        The value as a gegede Quantity.
+        '''
+        cls = type(self)
+        if cls._units is None:
+            cls._units = Quantity(1, cls.unit).units
+        return Quantity(self.value, cls._units)
+
+    def to(self, unit):
+        return self.q.to(unit)
+
+    def __add__(self, other):
+        return self._make(self.value + self._coerce(other))
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self._make(self.value - self._coerce(other))
+
+    def __rsub__(self, other):
+        return self._make(self._coerce(other) - self.value)
+
+    def __mul__(self, other):
+        if not isinstance(other, Number):
+            return NotImplemented
+        return self._make(self.value * other)
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, Number):
+            return self._make(self.value / other)
+        return self.value / self._coerce(other)
+
+    def __neg__(self):
+        return self._make(-self.value)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return self._make(abs(self.value))
+
+    def __eq__(self, other):
+        try:
+            return self.value == self._coerce(other)
+        except TypeError:
+            return NotImplemented
+
+    def __lt__(self, other):
+        return self.value < self._coerce(other)
+
+    def __le__(self, other):
+        return self.value <= self._coerce(other)
+
+    def __gt__(self, other):
+        return self.value > self._coerce(other)
+
+    def __ge__(self, other):
+        return self.value >= self._coerce(other)
+
+    def __hash__(self):
+        return hash((self.unit, self.value))
+
+    def __float__(self):
+        return float(self.value)
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self.value)
+
+    def __str__(self):
+        return '%s%s' % (self.value, self.unit)
+
+
+class Length(UnitValue):
+    '''
+    A length in cm.
+    '''
+    __slots__ = ()
+    unit = 'cm'
+
+
+def quantity(value):
+    '''
+    Quantity of a Length, other values are returned unchanged.
+    '''
+    if isinstance(value, UnitValue):
+        return value.q
+    return value
@@ -18,7 +18,8 @@ class ECALModBuilder(gegede.builder.Builder):
                   ecalThickness = None, 
                   leadThickness = None, 
                   nSBPlanes = None,
-		  altPlaneOrient = True,
+                  altPlaneOrient = True,
+                  useReplicas = False,
                   **kwds):
         if ecalThickness is None:
             raise ValueError("No value given for ecalThickness")
@@ -32,6 +33,11 @@ class ECALModBuilder(gegede.builder.Builder):
         self.leadThickness  = leadThickness
         self.nSBPlanes      = nSBPlanes  
         self.altPlaneOrient = altPlaneOrient
+        # place the SB planes as a replica (see duneggd.replica) of layers
+        # of lead and SB plane, two per layer when alternating orientations
+        self.useReplicas    = useReplicas
+        if useReplicas and altPlaneOrient and nSBPlanes%2:
+            raise ValueError("Replicated SB planes with altPlaneOrient need an even nSBPlanes")
         self.SBPlaneBldr = self.get_builder('SBPlane')
 
 
@@ -46,7 +52,7 @@ class ECALModBuilder(gegede.builder.Builder):
         # Calculate ECAL dimensions 
         self.ecalModDim    = list(SBPlaneDim) # get the right x and y dimension
         self.ecalModDim[2] = self.nSBPlanes*(self.leadThickness + SBPlaneDim[2])
-        print 'ECALModBuilder: set ECAL z dimension to '+str(self.ecalModDim[2])+' (configured as '+str(self.ecalThickness)+')'
+        print('ECALModBuilder: set ECAL z dimension to '+str(self.ecalModDim[2])+' (configured as '+str(self.ecalThickness)+')')
       
         # Make main shape/volume for this builder
         ecalModBox = geom.shapes.Box( self.name,
@@ -57,6 +63,10 @@ class ECALModBuilder(gegede.builder.Builder):
         self.add_volume(ecalMod_lv)
   
 
+        if self.useReplicas:
+            self.construct_layers(geom, ecalMod_lv, SBPlane_lv, SBPlaneDim)
+            return
+
         #Place the SB Planes in the ECAL
 
         n1 = 0 
@@ -64,8 +74,8 @@ class ECALModBuilder(gegede.builder.Builder):
         for i in range(self.nSBPlanes):
             zpos = -0.5*self.ecalModDim[2]+ (i+0.5)*SBPlaneDim[2]+(i+1)*self.leadThickness
 
-	    rotPlane = 'identity'
-	    if(self.altPlaneOrient): rotPlane = 'r90aboutZ'
+            rotPlane = 'identity'
+            if(self.altPlaneOrient): rotPlane = 'r90aboutZ'
 
             if i%2==0:
                rsbp_in_ecalend  = geom.structure.Position('SBPlane-'+str(i)+'_in_'+self.name, 
@@ -89,6 +99,36 @@ class ECALModBuilder(gegede.builder.Builder):
         return
 
 
+    #^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^
+    def construct_layers(self, geom, ecalMod_lv, SBPlane_lv, SBPlaneDim):
+        '''
+        Fill the ECAL with a replica of a layer, lead then SB plane, or two
+        of them with the second plane rotated if altPlaneOrient
+        '''
+        from duneggd.replica import place_replicas
+
+        nPlanes  = 2 if self.altPlaneOrient else 1
+        layer_z  = nPlanes*(self.leadThickness + SBPlaneDim[2])
+        layerBox = geom.shapes.Box( self.name+'Layer',
+                                    dx=0.5*self.ecalModDim[0],
+                                    dy=0.5*self.ecalModDim[1],
+                                    dz=0.5*layer_z)
+        layer_lv = geom.structure.Volume('vol'+self.name+'Layer', material=self.ecalMat, shape=layerBox)
+
+        for i in range(nPlanes):
+            zpos = -0.5*layer_z + (i+0.5)*SBPlaneDim[2] + (i+1)*self.leadThickness
+            rsbp_in_layer  = geom.structure.Position('SBPlane-'+str(i)+'_in_'+layer_lv.name,
+                                                     '0cm', '0cm', zpos)
+            prsbp_in_layer = geom.structure.Placement('placeSBPlane-'+str(i)+'_in_'+layer_lv.name,
+                                                      volume = SBPlane_lv,
+                                                      pos = rsbp_in_layer,
+                                                      rot = 'r90aboutZ' if i%2 else None)
+            layer_lv.placements.append( prsbp_in_layer.name )
+
+        place_replicas(geom, ecalMod_lv, layer_lv, self.nSBPlanes//nPlanes, layer_z, axis='z')
+        return
+
+
 
 
 
@@ -20,7 +20,8 @@ class RPCModBuilder(gegede.builder.Builder):
                   stripyDim    = [ Q('196cm'), Q('0.75cm'), Q('0.35cm') ],
                   gas_gap      = Q('0.2cm'),
                   rpcModMat='Air', resiplateMat='bakelite', 
-                  gasMat='rpcGas', rpcReadoutMat='honeycomb', **kwds):
+                  gasMat='rpcGas', rpcReadoutMat='honeycomb',
+                  useReplicas=False, **kwds):
          self.rpcModMat     = rpcModMat
          self.rpcReadoutMat = rpcReadoutMat
          self.resiplateMat  = resiplateMat
@@ -30,6 +31,8 @@ class RPCModBuilder(gegede.builder.Builder):
          self.stripxDim      = stripxDim
          self.stripyDim      = stripyDim
          self.gas_gap       = gas_gap
+         # place the strips as two replicas (see duneggd.replica) instead of one by one
+         self.useReplicas   = useReplicas
 
 
     #^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^
@@ -80,33 +83,58 @@ class RPCModBuilder(gegede.builder.Builder):
         #print 'RPCModBuilder: '+ str(nXStrips) +' X-Strips per RPC '
         #print 'RPCModBuilder: '+ str(nYStrips) +' Y-Strips per RPC '
 
-        # for loop to position and place X strips in RPCMod
-        for i in range(nXStrips):
-
-            xpos  = -0.5*self.resiplateDim[0]+(i+0.5)*self.stripxDim[0]
-            ypos  = '0cm'
-            zpos  = 0.5*self.rpcModDim[2]-0.5*self.stripxDim[2]
-            
-            xS_in_m  = geom.structure.Position( 'XStrip-'+str(i)+'_in_'+self.name,
-                                                xpos,  ypos,  zpos)
-            pxS_in_m = geom.structure.Placement( 'placeXStrip-'+str(i)+'_in_'+self.name,
-                                                 volume = rpcStripx_lv,pos = xS_in_m)#,rot = "r90aboutX" )
+        if self.useReplicas:
+            # a box of X strips and one of Y strips, each filled with a replica
+            from duneggd.replica import replicate
+            xStrips_lv = replicate(geom, self.name+'XStrips', rpcStripx_lv,
+                                   nXStrips, self.stripxDim[0], axis='x')
+            yStrips_lv = replicate(geom, self.name+'YStrips', rpcStripy_lv,
+                                   nYStrips, self.stripyDim[1], axis='y')
+
+            xS_in_m  = geom.structure.Position( 'XStrips_in_'+self.name,
+                                                -0.5*self.resiplateDim[0]+0.5*nXStrips*self.stripxDim[0],
+                                                '0cm',
+                                                0.5*self.rpcModDim[2]-0.5*self.stripxDim[2])
+            pxS_in_m = geom.structure.Placement( 'placeXStrips_in_'+self.name,
+                                                 volume = xStrips_lv, pos = xS_in_m)
             rpcMod_lv.placements.append( pxS_in_m.name )
-            #print str(i)+' x-strip pos: '+str(xpos)+str(ypos)+str(zpos)
 
+            yS_in_m  = geom.structure.Position( 'YStrips_in_'+self.name,
+                                                '0cm',
+                                                -0.5*self.resiplateDim[1]+0.5*nYStrips*self.stripyDim[1],
+                                                -0.5*self.rpcModDim[2]+0.5*self.stripyDim[2])
+            pyS_in_m = geom.structure.Placement( 'placeYStrips_in_'+self.name,
+                                                 volume = yStrips_lv, pos = yS_in_m)
+            rpcMod_lv.placements.append( pyS_in_m.name )
 
-        # for loop to position and place Y strips in RPCMod
-        for j in range(nYStrips):
+        else:
+            # for loop to position and place X strips in RPCMod
+            for i in range(nXStrips):
 
-            xpos  = '0cm'
-            ypos  = -0.5*self.resiplateDim[1]+(j+0.5)*self.stripyDim[1]
-            zpos  = -0.5*self.rpcModDim[2]+0.5*self.stripyDim[2]
-            yS_in_m  = geom.structure.Position( 'YStrip-'+str(j)+'_in_'+self.name,
-                                                xpos,  ypos,  zpos)
-            pyS_in_m = geom.structure.Placement( 'placeYStrip-'+str(j)+'_in_'+self.name,
-                                                 volume = rpcStripy_lv,pos = yS_in_m)#,rot = "r90aboutX")
-            rpcMod_lv.placements.append( pyS_in_m.name )
-            #print str(j)+' y-strip pos: '+str(xpos)+str(ypos)+str(zpos)
+                xpos  = -0.5*self.resiplateDim[0]+(i+0.5)*self.stripxDim[0]
+                ypos  = '0cm'
+                zpos  = 0.5*self.rpcModDim[2]-0.5*self.stripxDim[2]
+            
+                xS_in_m  = geom.structure.Position( 'XStrip-'+str(i)+'_in_'+self.name,
+                                                    xpos,  ypos,  zpos)
+                pxS_in_m = geom.structure.Placement( 'placeXStrip-'+str(i)+'_in_'+self.name,
+                                                     volume = rpcStripx_lv,pos = xS_in_m)#,rot = "r90aboutX" )
+                rpcMod_lv.placements.append( pxS_in_m.name )
+                #print str(i)+' x-strip pos: '+str(xpos)+str(ypos)+str(zpos)
+
+
+            # for loop to position and place Y strips in RPCMod
+            for j in range(nYStrips):
+
+                xpos  = '0cm'
+                ypos  = -0.5*self.resiplateDim[1]+(j+0.5)*self.stripyDim[1]
+                zpos  = -0.5*self.rpcModDim[2]+0.5*self.stripyDim[2]
+                yS_in_m  = geom.structure.Position( 'YStrip-'+str(j)+'_in_'+self.name,
+                                                    xpos,  ypos,  zpos)
+                pyS_in_m = geom.structure.Placement( 'placeYStrip-'+str(j)+'_in_'+self.name,
+                                                     volume = rpcStripy_lv,pos = yS_in_m)#,rot = "r90aboutX")
+                rpcMod_lv.placements.append( pyS_in_m.name )
+                #print str(j)+' y-strip pos: '+str(xpos)+str(ypos)+str(zpos)
 
 
         for k in range(2):
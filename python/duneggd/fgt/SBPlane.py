@@ -13,7 +13,7 @@ class SBPlaneBuilder(gegede.builder.Builder):
     #^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^
     def configure(self, ScintBarDim = [Q('2.5cm'), Q('3.2m'), Q('1cm')],
                         SBPlaneMat  = "epoxy_resin",
-			nScintBars  = 128,
+                        nScintBars  = 128,
                         ScintBarMat = "Scintillator", **kwds):
         self.SBPlaneMat  = SBPlaneMat
         self.ScintBarMat = ScintBarMat
@@ -38,13 +38,13 @@ class SBPlaneBuilder(gegede.builder.Builder):
         SBPlane_lv = geom.structure.Volume('volSBPlane', material=self.SBPlaneMat, shape=SBPlaneBox)
         self.add_volume(SBPlane_lv)
         # make default material glue -- search 'epoxy' in gdmlMaterials.py
-	# This volume will be retrieved by ECAL*Builder
+        # This volume will be retrieved by ECAL*Builder
 
 
         # Place the bars in the plane
         nScintBarsPerPlane = int(math.floor((self.SBPlaneDim[0]/self.ScintBarDim[0])))
         if self.nScintBars != nScintBarsPerPlane:
-           print 'SBPlaneBuilder: making'+str(nScintBarsPerPlane)+' scintillator bars per plane, should be '+str(self.nScintBars)
+           print('SBPlaneBuilder: making'+str(nScintBarsPerPlane)+' scintillator bars per plane, should be '+str(self.nScintBars))
   
         for i in range(nScintBarsPerPlane):
             xpos = -0.5*self.SBPlaneDim[0] + (i+0.5)*self.ScintBarDim[0]
@@ -14,7 +14,7 @@ class STTBuilder(gegede.builder.Builder):
                    FeTar_z = ('1mm'), CaTar_z = ('7mm'), 
                    CTar_z = ('4mm'), # this default bogus
                    radiatorMod_z=Q('76mm'), stt_z=Q('6.4m'), xxyyMod_z=Q('62mm'),
-                   sttMat='Air', **kwds):
+                   sttMat='Air', useReplicas=False, **kwds):
         self.config          = config
         self.sttMat          = sttMat
         self.stPlaneTarBldr  = self.get_builder('STPlaneTarget')
@@ -33,6 +33,9 @@ class STTBuilder(gegede.builder.Builder):
         self.CTar_z            = CTar_z
 
 
+        # place the radiator modules as a replica (see duneggd.replica)
+        self.useReplicas       = useReplicas
+
         self.printZpos = False
 
 
@@ -79,7 +82,7 @@ class STTBuilder(gegede.builder.Builder):
                          + 2*self.targetCMod_z
                          + self.nRadiatorModules*self.radiatorMod_z ]
 
-        print 'STTBuilder: set STT z dimension to '+str(self.sttDim[2])+' (configured as '+str(self.stt_z)+')'
+        print('STTBuilder: set STT z dimension to '+str(self.sttDim[2])+' (configured as '+str(self.stt_z)+')')
         sttBox = geom.shapes.Box( self.name, 
                                   dx=0.5*self.sttDim[0], 
                                   dy=0.5*self.sttDim[1], 
@@ -147,6 +150,10 @@ class STTBuilder(gegede.builder.Builder):
         else:
             print('No configuration for string: '+self.config)
 
+        if self.useReplicas:
+            self.place_RadiatorModules(geom, zpos)
+            return
+
         # Place all of the subsequent radiator modules
         for i in range(self.nRadiatorModules):
             zpos += 0.5*self.radiatorMod_z
@@ -157,6 +164,32 @@ class STTBuilder(gegede.builder.Builder):
         return
 
 
+    #^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^
+    def place_RadiatorModules(self, g, z):
+
+        # one radiator module in its own volume, replicated along z in a box
+        # that starts at z, after the target modules
+        from duneggd.replica import replicate
+
+        radModBox = g.shapes.Box( 'RadiatorModule',
+                                  dx=0.5*self.sttDim[0],
+                                  dy=0.5*self.sttDim[1],
+                                  dz=0.5*self.radiatorMod_z)
+        radMod_lv = g.structure.Volume('volRadiatorModule', material=self.sttMat, shape=radModBox)
+        self.place_RadiatorModule(g, 0, Q('0cm'), radMod_lv)
+
+        radMods_lv = replicate(g, 'RadiatorModules', radMod_lv,
+                               self.nRadiatorModules, self.radiatorMod_z, axis='z')
+        RM_in_STT  = g.structure.Position('RadiatorModules_in_STT',
+                                          '0cm', '0cm',
+                                          z + 0.5*self.nRadiatorModules*self.radiatorMod_z)
+        pRM_in_STT = g.structure.Placement( 'placeRadiatorModules_in_STT',
+                                            volume = radMods_lv, pos = RM_in_STT)
+        self.stt_lv.placements.append( pRM_in_STT.name )
+
+        return
+
+
 
     #^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^
     def place_TargetModule(self, g, i, z, tarType):
@@ -210,22 +243,25 @@ class STTBuilder(gegede.builder.Builder):
 
 
     #^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^
-    def place_RadiatorModule(self, g, i, z):
+    def place_RadiatorModule(self, g, i, z, mother=None):
         
+        mother = mother or self.stt_lv
+        where  = 'STT' if mother is self.stt_lv else mother.name
+
         upstream_z   = z - 0.5*self.radiatorMod_z
         downstream_z = z + 0.5*self.radiatorMod_z
 
         # Position the 4 radiators around radiator module z center
-        R0_in_STT  = g.structure.Position('Radiator-'+str(2*i)+'-0_in_STT', 
+        R0_in_STT  = g.structure.Position('Radiator-'+str(2*i)+'-0_in_'+where, 
                                           '0cm', '0cm', 
                                           upstream_z + 0.5*self.radiatorDim[2] )
-        R1_in_STT  = g.structure.Position('Radiator-'+str(2*i)+'-1_in_STT', 
+        R1_in_STT  = g.structure.Position('Radiator-'+str(2*i)+'-1_in_'+where, 
                                           '0cm', '0cm', 
                                           upstream_z + 1.5*self.radiatorDim[2] + self.stPlaneDim[2] )
-        R2_in_STT  = g.structure.Position('Radiator-'+str(2*i+1)+'-2_in_STT', 
+        R2_in_STT  = g.structure.Position('Radiator-'+str(2*i+1)+'-2_in_'+where, 
                                           '0cm', '0cm', 
                                           downstream_z - 0.5*self.radiatorDim[2])
-        R3_in_STT  = g.structure.Position('Radiator-'+str(2*i+1)+'-3_in_STT', 
+        R3_in_STT  = g.structure.Position('Radiator-'+str(2*i+1)+'-3_in_'+where, 
                                           '0cm', '0cm', 
                                           downstream_z - 1.5*self.radiatorDim[2] - self.stPlaneDim[2] )
 
@@ -233,55 +269,58 @@ class STTBuilder(gegede.builder.Builder):
         # Position the X (up) and Y (down) st planes
         z_up   = upstream_z   + self.radiatorDim[2] + 0.5*self.stPlaneDim[2]
         z_down = downstream_z - self.radiatorDim[2] - 0.5*self.stPlaneDim[2]
-        self.place_STPlanes_XXYY(g, 2*i, z_up, z_down, self.stPlaneRad_lv)
+        self.place_STPlanes_XXYY(g, 2*i, z_up, z_down, self.stPlaneRad_lv, mother)
 
 
         # Place everything in the STT 
-        pR0_in_STT = g.structure.Placement( 'placeRadiator-'+str(2*i)+'-0_in_STT',
+        pR0_in_STT = g.structure.Placement( 'placeRadiator-'+str(2*i)+'-0_in_'+where,
                                             volume = self.radiator_lv, pos = R0_in_STT)
 
-        pR1_in_STT = g.structure.Placement( 'placeRadiator-'+str(2*i)+'-1_in_STT',
+        pR1_in_STT = g.structure.Placement( 'placeRadiator-'+str(2*i)+'-1_in_'+where,
                                             volume = self.radiator_lv, pos = R1_in_STT)
         
-        pR2_in_STT = g.structure.Placement( 'placeRadiator-'+str(2*i+1)+'-2_in_STT',
+        pR2_in_STT = g.structure.Placement( 'placeRadiator-'+str(2*i+1)+'-2_in_'+where,
                                             volume = self.radiator_lv, pos = R2_in_STT)
 
-        pR3_in_STT = g.structure.Placement( 'placeRadiator-'+str(2*i+1)+'-3_in_STT',
+        pR3_in_STT = g.structure.Placement( 'placeRadiator-'+str(2*i+1)+'-3_in_'+where,
                                             volume = self.radiator_lv, pos = R3_in_STT)
-        self.stt_lv.placements.append( pR0_in_STT.name )
-        self.stt_lv.placements.append( pR1_in_STT.name )
-        self.stt_lv.placements.append( pR2_in_STT.name )
-        self.stt_lv.placements.append( pR3_in_STT.name )
+        mother.placements.append( pR0_in_STT.name )
+        mother.placements.append( pR1_in_STT.name )
+        mother.placements.append( pR2_in_STT.name )
+        mother.placements.append( pR3_in_STT.name )
 
         return
 
 
     #^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^
-    def place_STPlanes_XXYY(self, g, j, z_up, z_down, stPlane_lv):
+    def place_STPlanes_XXYY(self, g, j, z_up, z_down, stPlane_lv, mother=None):
+
+        mother = mother or self.stt_lv
+        where  = 'STT' if mother is self.stt_lv else mother.name
 
         # Position the 2 stPlanes, 
         #   assume the downstream one is vertical (Y) and upstream horizontal (X)
-        stPX_in_STT   = g.structure.Position('stPlane-'+str(j)+'-X_in_STT', 
+        stPX_in_STT   = g.structure.Position('stPlane-'+str(j)+'-X_in_'+where, 
                                              '0cm', '0cm', 
                                              z_up)
-        stPY_in_STT   = g.structure.Position('stPlane-'+str(j+1)+'-Y_in_STT', 
+        stPY_in_STT   = g.structure.Position('stPlane-'+str(j+1)+'-Y_in_'+where, 
                                              '0cm', '0cm', 
                                              z_down)
 
         if(self.printZpos):
-            print "plane "+str(j)+": "+str(z_up)
-            print "plane "+str(j+1)+": "+str(z_down)
+            print("plane "+str(j)+": "+str(z_up))
+            print("plane "+str(j+1)+": "+str(z_down))
 
         # stPlane defined with tubes vertical by default. 
         # Rotate X plany around z to get horizontal tubes
-        p_stPX_in_STT = g.structure.Placement( 'place_stP-'+str(j)+'-X_in_STT',
+        p_stPX_in_STT = g.structure.Placement( 'place_stP-'+str(j)+'-X_in_'+where,
                                                volume = stPlane_lv,
                                                pos = stPX_in_STT, 
                                                rot = "r90aboutZ")
-        p_stPY_in_STT = g.structure.Placement( 'place_stP-'+str(j+1)+'-Y_in_STT',
+        p_stPY_in_STT = g.structure.Placement( 'place_stP-'+str(j+1)+'-Y_in_'+where,
                                                volume = stPlane_lv,
                                                pos = stPY_in_STT)
-        self.stt_lv.placements.append( p_stPX_in_STT.name )
-        self.stt_lv.placements.append( p_stPY_in_STT.name )
+        mother.placements.append( p_stPX_in_STT.name )
+        mother.placements.append( p_stPY_in_STT.name )
         
         return
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+'''
+Bulk placement of volumes on regular grids.
+
+Builders lay out arrays of volumes (CRMs, shielding blocks, steel support
+units) with nested loops that make a Position and a Placement per cell
+through the gegede makers, which validate every argument and make a new
+namedtuple class for each object. Here the coordinates of all the cells
+are computed at once with NumPy, and the Positions and Placements are
+registered in bulk, with their names generated from patterns only as
+they are stored.
+
+    >>> z = offsets(nz, pitch_z, start_z, gaps=[(lambda i: i % 2 == 0, gap)])
+    >>> labels, (zz, yy) = mesh(z, y)
+    >>> place_grid(geom, mother, labels,
+    ...            [Member(vol, 'place%s-{n}' % name, 'pos%s-{n}' % name, x=x0, y=yy, z=zz)])
+
+The cells are ordered like nested loops over the axes, the last one
+varying fastest, and the objects of each cell are stored in the order of
+the members, position first, so that the store (and the GDML) is the same
+as that of the loops.
+'''
+
+from collections import namedtuple
+
+import numpy as np
+from gegede import Quantity
+
+
+def offsets(n, pitch, start=0, gaps=()):
+    '''
+    Centers of n cells along an axis: the first at start plus its gaps,
+    each next one pitch after the previous plus its gaps. The gaps are
+    (rule, gap) pairs: rule maps the array of the cell indices to a mask
+    of the cells preceded by gap, a number or one per cell. The sums are
+    done in the order of a loop adding the gaps, placing the cell and
+    adding the pitch, so the values are identical to those of the loop.
+    The dtype follows that of the arguments: integers stay integers.
+    '''
+    i = np.arange(n)
+    ngaps = len(gaps)
+    dtype = np.result_type(start, pitch, *[gap for _, gap in gaps])
+    steps = np.zeros((n, ngaps + 1), dtype=dtype)
+    for k, (rule, gap) in enumerate(gaps):
+        steps[:, k] = np.where(rule(i), gap, 0)
+    steps[:, ngaps] = pitch
+    run = np.cumsum(np.concatenate([np.array([start], dtype=dtype), steps.ravel()]))
+    return run[i*(ngaps + 1) + ngaps]
+
+
+def mesh(*axes):
+    '''
+    Indices (N, number of axes) and coordinates (one array of N per axis)
+    of the cells of the grid of the axes, the last one varying fastest.
+    '''
+    index = np.indices([len(a) for a in axes]).reshape(len(axes), -1).T
+    coords = [np.asarray(a)[index[:, k]] for k, a in enumerate(axes)]
+    return index, coords
+
+
+def in_ranges(n, ranges):
+    '''
+    Mask of the n cells in the [start, stop) ranges, a stop of None
+    meaning the end.
+    '''
+    mask = np.zeros(n, dtype=bool)
+    for start, stop in ranges:
+        mask[start:stop] = True
+    return mask
+
+
+class Member(object):
+    '''
+    A volume placed in the cells of a grid.
+
+    name and pos are the patterns of the names of its placements and
+    positions, formatted with the labels of the cell, i, j and k, and
+    with its number n. x, y and z are Quantities (the same for every
+    cell), numbers or arrays with one number per cell, in the unit of the
+    grid. rot is the rotation of all the placements. cells is a mask of
+    the cells it is placed in, all of them by default; members with
+    complementary masks are the variants of a cell.
+    '''
+    def __init__(self, volume, name, pos, x=0, y=0, z=0, rot=None, cells=None):
+        self.volume = getattr(volume, 'name', volume)
+        self.name = name
+        self.pos = pos
+        self.coords = (x, y, z)
+        self.rot = getattr(rot, 'name', rot)
+        self.cells = cells
+
+
+_classes = {}
+
+def _class(geom, typename):
+    # gegede makes the same namedtuple for every object of a type
+    fields = ['name'] + [p[0] for p in geom.schema['structure'][typename]]
+    key = (typename, tuple(fields))
+    if key not in _classes:
+        _classes[key] = namedtuple(typename, fields)
+    return _classes[key]
+
+
+def _column(value, ncells, units):
+    if isinstance(value, Quantity):
+        return [value]*ncells
+    values = np.broadcast_to(np.asarray(value), (ncells,)).tolist()
+    return [Quantity(v, units) for v in values]
+
+
+def place_grid(geom, mother, labels, members, unit='cm', first=0):
+    '''
+    Place every member in the mother volume at every cell of a grid.
+    labels are the (N, number of axes) cell indices, as given by mesh(),
+    first the labels of the first cell (added to them). Returns the names
+    of the placements.
+    '''
+    store = geom.store.structure
+    Position = _class(geom, 'Position')
+    Placement = _class(geom, 'Placement')
+    units = Quantity(1, unit).units
+
+    labels = np.asarray(labels) + first
+    ncells = len(labels)
+    columns = []
+    for member in members:
+        xyz = list(zip(*[_column(c, ncells, units) for c in member.coords]))
+        cells = [True]*ncells if member.cells is None else np.asarray(member.cells, dtype=bool).tolist()
+        columns.append((member, xyz, cells))
+
+    placed = []
+    for n, row in enumerate(labels.tolist()):
+        fields = dict(zip('ijk', row), n=n)
+        for member, xyz, cells in columns:
+            if not cells[n]:
+                continue
+            # the names are only made here
+            posname = member.pos.format(**fields)
+            pname = member.name.format(**fields)
+            for name in (posname, pname):
+                if name in store:
+                    raise ValueError('Instance "%s" already in the structure store' % name)
+            store[posname] = Position(posname, *xyz[n])
+            store[pname] = Placement(pname, member.volume, posname, member.rot, None)
+            mother.placements.append(pname)
+            placed.append(pname)
+    return placed
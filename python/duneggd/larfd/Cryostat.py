@@ -5,11 +5,14 @@ Subbuilder of DetEncBuilder
 
 import gegede.builder
 import math
+import numpy as np
 from gegede import Quantity as Q
 from pint import UnitRegistry
 import pandas as pd
 ureg = UnitRegistry()
 
+from World import Rotations
+
 class CryostatBuilder(gegede.builder.Builder):
     '''
     Build the Cryostat.
@@ -62,8 +65,10 @@ class CryostatBuilder(gegede.builder.Builder):
                   FieldCageBarWidth   = None,
                   FieldCageBarHeight  = None,
                   FieldCageMaterial   = None,
+                  FieldCageMode       = 'subtraction',
                   doWaterShielding    = False,
                   waterThickness      = Q("10cm"),
+                  waterShieldingMode  = 'boolean',
                   **kwds):
 
         if nAPAs is None:
@@ -119,9 +124,20 @@ class CryostatBuilder(gegede.builder.Builder):
         self.FieldCageBarWidth    = FieldCageBarWidth
         self.FieldCageBarHeight   = FieldCageBarHeight
         self.FieldCageMaterial    = FieldCageMaterial
+        # 'subtraction': bars next to the LAr, each one subtracted from it
+        # 'daughters'  : bars placed inside an LAr box without subtractions
+        # 'grouped'    : bars placed inside four LAr envelopes, one per side
+        if FieldCageMode not in ('subtraction', 'daughters', 'grouped'):
+            raise ValueError("Unknown FieldCageMode: " + str(FieldCageMode))
+        self.FieldCageMode        = FieldCageMode
 
         self.doWaterShielding  = doWaterShielding
         self.waterThickness    = waterThickness
+        # 'boolean'  : one shell with every beam subtracted from it
+        # 'segmented': one slab per face, see PlaceWaterSlabs
+        if waterShieldingMode not in ('boolean', 'segmented'):
+            raise ValueError("Unknown waterShieldingMode: " + str(waterShieldingMode))
+        self.waterShieldingMode = waterShieldingMode
         
 
 
@@ -356,7 +372,7 @@ class CryostatBuilder(gegede.builder.Builder):
                +" high by "+str(self.nAPAs[2])
                +" long modules.")
  
-        self.beamInfo = {'shape':[], 'pos':[], 'rot':[]}
+        self.beamInfo = {'shape':[], 'pos':[], 'rot':[], 'place':[]}
 
         # Adding in the field  cage
         lenHorizontalBar = self.nAPAs[2]*self.tpcDim[2] + (self.nAPAs[2]-1)*self.APAGap_z
@@ -392,25 +408,52 @@ class CryostatBuilder(gegede.builder.Builder):
         posLong  = [Q("3cm"), yCenter, zCenter]
         posShort = [Q("3cm"), yCenter, zCenter]
 
+        nFCBars   = 123
+        fcMode    = self.FieldCageMode
+        fcInLAr   = []   # placements of the field cage in the LAr
+        fcInGroup = {}   # placements of the bars in the envelopes of each side
+        if fcMode == 'grouped':
+            # LAr envelopes just covering the bars of each side of the cage
+            halfSpan = posLong[0] + (nFCBars-1)*Q("6cm") + 0.5*self.FieldCageBarWidth
+            groups = [("Top", 0.5*self.FieldCageBarHeight, 0.5*lenHorizontalBar, posLong[1]+yOffset, posLong[2]),
+                      ("Bot", 0.5*self.FieldCageBarHeight, 0.5*lenHorizontalBar, posLong[1]-yOffset, posLong[2]),
+                      ("Fro", 0.5*lenVerticalBar, 0.5*self.FieldCageBarHeight, posShort[1], posShort[2]+zOffset),
+                      ("Bac", 0.5*lenVerticalBar, 0.5*self.FieldCageBarHeight, posShort[1], posShort[2]-zOffset)]
+            for side, dy, dz, y, z in groups:
+                groupBox = geom.shapes.Box("FieldCage"+side, dx=halfSpan, dy=dy, dz=dz)
+                group_lv = geom.structure.Volume("volFieldCage"+side, material='LAr', shape=groupBox)
+                groupPos = geom.structure.Position("posFieldCage"+side+"_in_LAr", Q("0cm"), y, z)
+                fcInLAr.append(geom.structure.Placement("placeFieldCage"+side+"_in_LAr",
+                                                        volume=group_lv, pos=groupPos).name)
+                fcInGroup[side] = group_lv
+
+        for bar in range(nFCBars):
+            if fcMode == 'grouped':
+                # centred in the envelopes, only x changes from bar to bar
+                barY = barZ = Q("0cm")
+                yTop = yBot = zFro = zBac = barZ
+            else:
+                barY, barZ = posLong[1], posLong[2]
+                yTop, yBot = posLong[1]+yOffset, posLong[1]-yOffset
+                zFro, zBac = posShort[2]+zOffset, posShort[2]-zOffset
 
-        for bar in range(123):
             horizontalBarTopRPos = geom.structure.Position("TopFCRBeam_"+str(bar),
-                                                            posLong[0], posLong[1]+yOffset, posLong[2])
+                                                            posLong[0], yTop, barZ)
             horizontalBarTopLPos = geom.structure.Position("TopFCLBeam_"+str(bar),
-                                                           -posLong[0], posLong[1]+yOffset, posLong[2])
+                                                           -posLong[0], yTop, barZ)
             horizontalBarBotRPos = geom.structure.Position("BotFCRBeam_"+str(bar),
-                                                            posLong[0], posLong[1]-yOffset, posLong[2])
+                                                            posLong[0], yBot, barZ)
             horizontalBarBotLPos = geom.structure.Position("BotFCLBeam_"+str(bar),
-                                                           -posLong[0], posLong[1]-yOffset, posLong[2])
+                                                           -posLong[0], yBot, barZ)
 
             verticalBarFroRPos = geom.structure.Position("FroFCRBeam_"+str(bar),
-                                                         posShort[0], posShort[1], posShort[2]+zOffset)
+                                                         posShort[0], barY, zFro)
             verticalBarFroLPos = geom.structure.Position("FroFCLBeam_"+str(bar),
-                                                         -posShort[0], posShort[1], posShort[2]+zOffset)
+                                                         -posShort[0], barY, zFro)
             verticalBarBacRPos = geom.structure.Position("BacFCRBeam_"+str(bar),
-                                                         posShort[0], posShort[1], posShort[2]-zOffset)
+                                                         posShort[0], barY, zBac)
             verticalBarBacLPos = geom.structure.Position("BacFCLBeam_"+str(bar),
-                                                         -posShort[0], posShort[1], posShort[2]-zOffset)
+                                                         -posShort[0], barY, zBac)
             
             Placement_TopFCRBar = geom.structure.Placement("placeTopFCRBar_"+str(bar),
                                                            volume=horizontalBar_lv, pos=horizontalBarTopRPos)
@@ -430,58 +473,60 @@ class CryostatBuilder(gegede.builder.Builder):
             Placement_BacFCLBar = geom.structure.Placement("placeBacFCLBar_"+str(bar),
                                                            volume=verticalBar_lv, pos=verticalBarBacLPos)
 
-            
-            LArBox = geom.shapes.Boolean("subHorizFCBarTopR_"+str(bar),
-                                         type   = 'subtraction',
-                                         first  = LArBox,
-                                         second = horizontalBarBox,
-                                         pos    = horizontalBarTopRPos)
-            LArBox = geom.shapes.Boolean("subHorizFCBarTopL_"+str(bar),
-                                         type   = 'subtraction',
-                                         first  = LArBox,
-                                         second = horizontalBarBox,
-                                         pos    = horizontalBarTopLPos)
-            LArBox = geom.shapes.Boolean("subHorizFCBarBotR_"+str(bar),
-                                         type   = 'subtraction',
-                                         first  = LArBox,
-                                         second = horizontalBarBox,
-                                         pos    = horizontalBarBotRPos)
-            LArBox = geom.shapes.Boolean("subHorizFCBarBotL_"+str(bar),
-                                         type   = 'subtraction',
-                                         first  = LArBox,
-                                         second = horizontalBarBox,
-                                         pos    = horizontalBarBotLPos)
-
-            LArBox = geom.shapes.Boolean("subVertiFCBarFroR_"+str(bar),
-                                         type   = 'subtraction',
-                                         first  = LArBox,
-                                         second = verticalBarBox,
-                                         pos    = verticalBarFroRPos)
-            LArBox = geom.shapes.Boolean("subVertiFCBarFroL_"+str(bar),
-                                         type   = 'subtraction',
-                                         first  = LArBox,
-                                         second = verticalBarBox,
-                                         pos    = verticalBarFroLPos)
-            LArBox = geom.shapes.Boolean("subVertiFCBarBacR_"+str(bar),
-                                         type   = 'subtraction',
-                                         first  = LArBox,
-                                         second = verticalBarBox,
-                                         pos    = verticalBarBacRPos)
-            LArBox = geom.shapes.Boolean("subVertiFCBarBacL_"+str(bar),
-                                         type   = 'subtraction',
-                                         first  = LArBox,
-                                         second = verticalBarBox,
-                                         pos    = verticalBarBacLPos)
-
-            cryo_lv.placements.append(Placement_TopFCRBar.name)
-            cryo_lv.placements.append(Placement_TopFCLBar.name)
-            cryo_lv.placements.append(Placement_BotFCRBar.name)
-            cryo_lv.placements.append(Placement_BotFCLBar.name)
-
-            cryo_lv.placements.append(Placement_FroFCRBar.name)
-            cryo_lv.placements.append(Placement_FroFCLBar.name)
-            cryo_lv.placements.append(Placement_BacFCRBar.name)
-            cryo_lv.placements.append(Placement_BacFCLBar.name)
+            if fcMode == 'subtraction':
+                LArBox = geom.shapes.Boolean("subHorizFCBarTopR_"+str(bar),
+                                             type   = 'subtraction',
+                                             first  = LArBox,
+                                             second = horizontalBarBox,
+                                             pos    = horizontalBarTopRPos)
+                LArBox = geom.shapes.Boolean("subHorizFCBarTopL_"+str(bar),
+                                             type   = 'subtraction',
+                                             first  = LArBox,
+                                             second = horizontalBarBox,
+                                             pos    = horizontalBarTopLPos)
+                LArBox = geom.shapes.Boolean("subHorizFCBarBotR_"+str(bar),
+                                             type   = 'subtraction',
+                                             first  = LArBox,
+                                             second = horizontalBarBox,
+                                             pos    = horizontalBarBotRPos)
+                LArBox = geom.shapes.Boolean("subHorizFCBarBotL_"+str(bar),
+                                             type   = 'subtraction',
+                                             first  = LArBox,
+                                             second = horizontalBarBox,
+                                             pos    = horizontalBarBotLPos)
+
+                LArBox = geom.shapes.Boolean("subVertiFCBarFroR_"+str(bar),
+                                             type   = 'subtraction',
+                                             first  = LArBox,
+                                             second = verticalBarBox,
+                                             pos    = verticalBarFroRPos)
+                LArBox = geom.shapes.Boolean("subVertiFCBarFroL_"+str(bar),
+                                             type   = 'subtraction',
+                                             first  = LArBox,
+                                             second = verticalBarBox,
+                                             pos    = verticalBarFroLPos)
+                LArBox = geom.shapes.Boolean("subVertiFCBarBacR_"+str(bar),
+                                             type   = 'subtraction',
+                                             first  = LArBox,
+                                             second = verticalBarBox,
+                                             pos    = verticalBarBacRPos)
+                LArBox = geom.shapes.Boolean("subVertiFCBarBacL_"+str(bar),
+                                             type   = 'subtraction',
+                                             first  = LArBox,
+                                             second = verticalBarBox,
+                                             pos    = verticalBarBacLPos)
+
+            barPlacements = [Placement_TopFCRBar, Placement_TopFCLBar,
+                             Placement_BotFCRBar, Placement_BotFCLBar,
+                             Placement_FroFCRBar, Placement_FroFCLBar,
+                             Placement_BacFCRBar, Placement_BacFCLBar]
+            if fcMode == 'subtraction':
+                cryo_lv.placements.extend(p.name for p in barPlacements)
+            elif fcMode == 'daughters':
+                fcInLAr.extend(p.name for p in barPlacements)
+            else:
+                for p, side in zip(barPlacements, ["Top"]*2 + ["Bot"]*2 + ["Fro"]*2 + ["Bac"]*2):
+                    fcInGroup[side].placements.append(p.name)
             
             posLong [0]  += Q("6cm")
             posShort[0]  += Q("6cm")
@@ -510,6 +555,8 @@ class CryostatBuilder(gegede.builder.Builder):
                                                        volume = LAr_lv,
                                                        pos = pLAr_in_cryo)
         cryo_lv.placements.append(placement_LAr_in_C.name)
+        # the LAr is centred in the cryostat: same positions in both
+        LAr_lv.placements.extend(fcInLAr)
 
 
         
@@ -714,6 +761,7 @@ class CryostatBuilder(gegede.builder.Builder):
                                                   pos    = Position_Beam,
                                                   rot    = rot)
         box_lv.placements.append(Placement_Beam.name)
+        self.beamInfo['place'].append(Placement_Beam.name)
         self.num = self.num+1
 
     def ConstructBeamFloor(self, geom, length, pos, rot, box_lv, plane):
@@ -744,6 +792,7 @@ class CryostatBuilder(gegede.builder.Builder):
         self.beamInfo["pos"]  .append(Position_Beam)
         self.beamInfo["rot"]  .append(rot)
         box_lv.placements.append(Placement_Beam.name)
+        self.beamInfo['place'].append(Placement_Beam.name)
         self.num = self.num+1
 
     def ConstructSmallBeam(self, geom, length, pos, rot, box_lv, plane):
@@ -759,6 +808,7 @@ class CryostatBuilder(gegede.builder.Builder):
         self.beamInfo["pos"]  .append(Position_Beam)
         self.beamInfo["rot"]  .append(rot)
         box_lv.placements.append(Placement_Beam.name)
+        self.beamInfo['place'].append(Placement_Beam.name)
         self.num = self.num+1
 
 
@@ -918,6 +968,9 @@ class CryostatBuilder(gegede.builder.Builder):
         self.BeamInnerDim = [self.CryostatInnerDim[0] + 2 * (self.ColdInsulationThickness + self.SteelThickness),
                              self.CryostatInnerDim[1] + 2 * (self.ColdInsulationThickness + self.SteelThickness),
                              self.CryostatInnerDim[2] + 2 * (self.ColdInsulationThickness + self.SteelThickness)]
+        if self.waterShieldingMode == 'segmented':
+            self.PlaceWaterSlabs(geom, cryo_lv, waterThickness, beamInfo)
+            return
         
         WaterBox_outer = geom.shapes.Box('WaterBox_outer',
                                          dx=0.5*(self.BeamInnerDim[0]+waterThickness),
@@ -963,3 +1016,109 @@ class CryostatBuilder(gegede.builder.Builder):
         self.add_volume(water_lv)
         place_water = geom.structure.Placement('placeWaterShielding', volume=water_lv, pos=subtractionPos)
         cryo_lv.placements.append(place_water.name)
+
+    def PlaceWaterSlabs(self, geom, cryo_lv, waterThickness, beamInfo):
+        '''
+        Same water as PlaceWaterLayer (the shell between BeamInnerDim and
+        BeamInnerDim + waterThickness, open at the top) made of boxes: one
+        slab per face (the X slabs run along the whole shell, the Z slabs fit
+        between them and the bottom slab between all four), cut into
+        segments between the beams. A beam lying inside a segment is moved
+        into it, a beam crossing the surface of a segment is subtracted from
+        that segment only.
+        '''
+        from duneggd.transforms import rotation_matrix
+
+        def cm(q):
+            return q.to('cm').magnitude
+
+        B = [cm(d) for d in self.BeamInnerDim]
+        w = cm(waterThickness)
+        yLo, yHi = -0.5*(B[1] + w), 0.5*B[1]
+        xIn, zIn = 0.5*B[0], 0.5*B[2]
+        xOut, zOut = 0.5*(B[0] + w), 0.5*(B[2] + w)
+        # name and low / high corners in cm
+        slabs = [('PosX', ( xIn, yLo, -zOut), ( xOut, yHi,  zOut)),
+                 ('NegX', (-xOut, yLo, -zOut), (-xIn, yHi,  zOut)),
+                 ('PosZ', (-xIn, yLo,  zIn), ( xIn, yHi,  zOut)),
+                 ('NegZ', (-xIn, yLo, -zOut), ( xIn, yHi, -zIn)),
+                 ('NegY', (-xIn, yLo, -zIn), ( xIn, -0.5*B[1], zIn))]
+
+        # bounding boxes of the beams
+        nbeams = len(beamInfo['shape'])
+        bLo, bHi = np.zeros((nbeams, 3)), np.zeros((nbeams, 3))
+        for i, (shape, pos, rot) in enumerate(zip(beamInfo['shape'], beamInfo['pos'], beamInfo['rot'])):
+            box = shape
+            while type(box).__name__ == 'Boolean':
+                box = geom.store.shapes[box.first]
+            # 'identity' is the GDML name of no rotation, the others are made by World
+            rmat = rotation_matrix(Rotations[rot] if rot not in (None, 'identity') else None)
+            half = np.abs(rmat) @ np.array([cm(box.dx), cm(box.dy), cm(box.dz)])
+            center = np.array([cm(pos.x), cm(pos.y), cm(pos.z)])
+            bLo[i], bHi[i] = center - half, center + half
+
+        tol = 1e-6
+        def segments(lo, hi, axis, sel):
+            # cut [lo, hi] along axis where no beam crosses the cut plane
+            cuts = np.unique(np.concatenate([bLo[sel, axis], bHi[sel, axis]]))
+            cuts = cuts[(cuts > lo + tol) & (cuts < hi - tol)]
+            crossed = np.array([np.any((bLo[sel, axis] < c - tol) & (bHi[sel, axis] > c + tol))
+                                for c in cuts], dtype=bool)
+            edges = np.concatenate([[lo], cuts[~crossed], [hi]])
+            return list(zip(edges[:-1], edges[1:]))
+
+        moved = set()
+        for side, lo, hi in slabs:
+            lo, hi = np.array(lo), np.array(hi)
+            sel = np.flatnonzero(np.all((bLo < hi - tol) & (bHi > lo + tol), axis=1))
+            # cut along the in-plane axis giving the fewest beams per segment
+            best = None
+            for axis in np.argsort(hi - lo)[1:]:
+                segs = segments(lo[axis], hi[axis], axis, sel)
+                worst = max(np.sum((bLo[sel, axis] < s1 - tol) & (bHi[sel, axis] > s0 + tol))
+                            for s0, s1 in segs)
+                if best is None or worst < best[0]:
+                    best = (worst, axis, segs)
+            worst, axis, segs = best
+
+            for k, (s0, s1) in enumerate(segs):
+                name = side + '_' + str(k)
+                sLo, sHi = lo.copy(), hi.copy()
+                sLo[axis], sHi[axis] = s0, s1
+                center, half = 0.5*(sLo + sHi), 0.5*(sHi - sLo)
+                slab = geom.shapes.Box('WaterSlab'+name,
+                                       dx=Q(half[0], 'cm'), dy=Q(half[1], 'cm'), dz=Q(half[2], 'cm'))
+                inside = []
+                for i in sel:
+                    if np.any((bLo[i] >= sHi - tol) | (bHi[i] <= sLo + tol)):
+                        continue                                # disjoint
+                    bname = beamInfo['place'][i][len('place'):]
+                    local = geom.structure.Position('pos'+bname+'_in_'+name,
+                                                    *[Q(x, 'cm') for x in 0.5*(bLo[i] + bHi[i]) - center])
+                    if np.all((bLo[i] >= sLo - tol) & (bHi[i] <= sHi + tol)):
+                        inside.append((i, local))
+                    else:
+                        slab = geom.shapes.Boolean('water'+name+'_BoolSub_'+str(i),
+                                                   type   = 'subtraction',
+                                                   first  = slab,
+                                                   second = beamInfo['shape'][i],
+                                                   pos    = local,
+                                                   rot    = beamInfo['rot'][i])
+                slab_lv = geom.structure.Volume('volWaterShielding'+name, material='Water', shape=slab)
+                self.add_volume(slab_lv)
+                for i, local in inside:
+                    beam = geom.store.structure[beamInfo['place'][i]]
+                    place = geom.structure.Placement(beam.name+'_in_'+name,
+                                                     volume = beam.volume,
+                                                     pos    = local,
+                                                     rot    = beam.rot)
+                    slab_lv.placements.append(place.name)
+                    moved.add(beam.name)
+                slabPos = geom.structure.Position('posWaterShielding'+name,
+                                                  *[Q(x, 'cm') for x in center])
+                place_slab = geom.structure.Placement('placeWaterShielding'+name,
+                                                      volume=slab_lv, pos=slabPos)
+                cryo_lv.placements.append(place_slab.name)
+
+        # the beams moved into the slabs are no longer placed in the cryostat
+        cryo_lv.placements[:] = [p for p in cryo_lv.placements if p not in moved]
@@ -4,6 +4,9 @@ Subbuilder of TPCBuilder
 '''
 
 import math
+import os
+import json
+import hashlib
 import gegede.builder
 from gegede import Quantity as Q
 from gegede import units
@@ -11,6 +14,8 @@ import pandas as pd
 from pandas import ExcelWriter
 from pandas import ExcelFile
 import numpy as np
+import WirePoints
+from duneggd.fastunits import Length, quantity
 
 class TPCPlaneBuilder(gegede.builder.Builder):
     '''
@@ -36,6 +41,8 @@ class TPCPlaneBuilder(gegede.builder.Builder):
                   view                    = None,
                   planeDim                = None,
                   wireSpreadSheet         = None,
+                  wireCacheDir            = None,
+                  wireSource              = 'spreadsheet',
                   **kwds):
 
         if APAFrameDim is None:
@@ -48,6 +55,8 @@ class TPCPlaneBuilder(gegede.builder.Builder):
             raise ValueError("No value given for wireAngle")
         if nChannels is None:
             raise ValueError("No value given for nChannels")
+        if wireSource not in ('spreadsheet', 'analytic'):
+            raise ValueError("wireSource should be 'spreadsheet' or 'analytic', got: " + str(wireSource))
 
         self.wireDiam                = wireDiam
         self.wirePitch               = wirePitch
@@ -65,13 +74,89 @@ class TPCPlaneBuilder(gegede.builder.Builder):
         self.wrapCover               = wrapCover
         self.view                    = view
         self.planeDim                = planeDim
-
+        self.wireCacheDir            = wireCacheDir
+        self.wireSource              = wireSource
+
+
+    # bump when the cleaning done in ParseExcel changes, to invalidate the caches
+    CacheVersion = 1
+
+    def CachePath(self, filename, sheet_name, header, usecols):
+        '''
+        Cache directory of one parsed sheet, keyed by the content of the
+        spreadsheet, the sheet, the header row and the column range.
+        '''
+        key = hashlib.sha256()
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                key.update(chunk)
+        key.update(repr((self.CacheVersion, sheet_name, header, usecols)).encode())
+        return os.path.join(self.wireCacheDir, key.hexdigest()[:32])
+
+    def SaveCache(self, path):
+        '''
+        Store the cleaned wire positions as one .npy file per column.
+        '''
+        tmp = path + '.tmp%d' % os.getpid()
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, 'index.npy'), self.WirePosition.index.to_numpy())
+        for col in self.WirePosition.columns:
+            np.save(os.path.join(tmp, col + '.npy'), self.WirePosition[col].to_numpy())
+        with open(os.path.join(tmp, 'columns.json'), 'w') as f:
+            json.dump(self.WirePosition.columns.tolist(), f)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # another build stored the same sheet in the meantime
+            for fname in os.listdir(tmp):
+                os.remove(os.path.join(tmp, fname))
+            os.rmdir(tmp)
+
+    def LoadCache(self, path):
+        '''
+        Read the cached .npy columns of the wire positions back into a
+        DataFrame and restore the column indices.
+        '''
+        with open(os.path.join(path, 'columns.json')) as f:
+            columns = json.load(f)
+        index = np.load(os.path.join(path, 'index.npy'))
+        self.WirePosition = pd.DataFrame({col: np.load(os.path.join(path, col + '.npy'))
+                                          for col in columns},
+                                         index=index, columns=columns)
+        # pandas add a column of index at 0 so have to add 1 to the indices here
+        self.XStartIndex = columns.index('XStart') + 1
+        self.YStartIndex = columns.index('YStart') + 1
+        self.XEndIndex   = columns.index('XEnd') + 1
+        self.YEndIndex   = columns.index('YEnd') + 1
+        self.FrontOrBack = columns.index('Front') + 1
+
+    def LoadWirePoints(self):
+        '''
+        Fill WirePosition with the analytic wire end points of WirePoints
+        instead of parsing the spreadsheet. All the wires are front wires.
+        '''
+        endpoints = WirePoints.WirePlaneEndpoints(self.view, self.planeDim)
+        self.WirePosition = pd.DataFrame(endpoints, columns=['XStart', 'YStart', 'XEnd', 'YEnd'])
+        self.WirePosition['Front'] = True
+        # pandas add a column of index at 0 so have to add 1 to the indices here
+        self.XStartIndex = 1
+        self.YStartIndex = 2
+        self.XEndIndex   = 3
+        self.YEndIndex   = 4
+        self.FrontOrBack = 5
 
     def ParseExcel(self,
                    sheet_name, header, usecols,
                    # filename='Electronics channel to wire segment mapping.xlsx'):
                    filename='Aran-Sheet.xlsx'):
 
+        cache = None
+        if self.wireCacheDir:
+            cache = self.CachePath(filename, sheet_name, header, usecols)
+            if os.path.isdir(cache):
+                self.LoadCache(cache)
+                return
+
         self.WirePosition = pd.read_excel(filename,
                                           sheet_name=sheet_name,
                                           header=header,
@@ -132,6 +217,10 @@ class TPCPlaneBuilder(gegede.builder.Builder):
         self.WirePosition['XEnd'  ] = self.WirePosition['XEnd'  ].astype(float) 
         self.WirePosition['YEnd'  ] = self.WirePosition['YEnd'  ].astype(float)
         self.WirePosition['Front' ] = self.WirePosition['Front' ].apply(lambda st: st.upper() == 'FRONT')
+
+        if cache:
+            os.makedirs(self.wireCacheDir, exist_ok=True)
+            self.SaveCache(cache)
         
     #^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^~^
     def construct(self, geom):
@@ -146,19 +235,21 @@ class TPCPlaneBuilder(gegede.builder.Builder):
         # self.planeDim = list(self.APAFrameDim)
         # self.planeDim[0] = self.wireDiam;
         self.PositionDumper = open("WirePos"+self.view+".txt", "w")
-        if self.view == 'Z':
+        if self.wireSource == 'analytic':
+            self.LoadWirePoints()
+        elif self.view == 'Z':
             self.ParseExcel(sheet_name='X Wires',header=1, usecols='E:J')
             # self.planeDim[1] += - self.HeadBoardScrewCentre[1] - self.HeadAPAFrameScrewCentre[1]
             # self.planeDim[2] += 2 * (-self.HeadAPAFrameScrewCentre[2] + self.HeadBoardScrewCentre[2])
             print("X Plane Dimenstions: ", self.planeDim)
             
-        if self.view == 'V':
+        elif self.view == 'V':
             self.ParseExcel(sheet_name='V Wires', header=3, usecols='R:Z')
             # self.planeDim[1] += 1 * self.G10ThicknessFoot - self.HeadBoardScrewCentre[1] - self.HeadAPAFrameScrewCentre[1]
             # self.planeDim[2] -= 0
             print("V Plane Dimenstions: ", self.planeDim)            
 
-        if self.view == 'U':
+        elif self.view == 'U':
             self.ParseExcel(sheet_name='U Wires', header=3, usecols='S:AA')
             # self.planeDim[1] += 2 * self.G10ThicknessFoot - self.HeadBoardScrewCentre[1] - self.HeadAPAFrameScrewCentre[1]
             # self.planeDim[2] += Q("6.7mm")
@@ -193,8 +284,6 @@ class TPCPlaneBuilder(gegede.builder.Builder):
                                     dz   = 0.5*self.planeDim[1] )
         zwire_lv = geom.structure.Volume('volTPCWireVertInner', material='CuBe', shape=zwire)
 
-        index = 0
-
         maxX = Q(max(max(self.WirePosition['XStart'].values), max(self.WirePosition['XEnd'].values)), "mm")
         minX = Q(min(min(self.WirePosition['XStart'].values), min(self.WirePosition['XEnd'].values)), "mm")
         maxY = Q(max(max(self.WirePosition['YStart'].values), max(self.WirePosition['YEnd'].values)), "mm")
@@ -208,17 +297,20 @@ class TPCPlaneBuilder(gegede.builder.Builder):
 
         # if abs((self.planeDim[2] - dX).to('mm').magnitude) > 0.1:
         #     raise Exception("Inconsistent Z dim. dz: ", dX, " and z dim of the plane: ", self.planeDim[2])
-        
-        for row in self.WirePosition.itertuples():
-            if row[self.FrontOrBack]:
-                d = 0.5 * (Q(row[self.XStartIndex],"mm") + Q(row[self.XEndIndex],"mm"))
-                wirePos = [Q('0m'),
-                           Q('0m'),
-                           d]
-                self.PlaceWire( geom, index, readPlane_lv, wirePos, 'r90aboutX', zwire_lv )
-                index += 1
 
-        print('DONE - Creating ' + str(index)+' collection wires.')        
+        # z position of all the front wires at once
+        front = self.WirePosition[self.WirePosition['Front'].to_numpy(dtype=bool)]
+        d = 0.5 * (Q(front['XStart'].to_numpy(), "mm") + Q(front['XEnd'].to_numpy(), "mm"))
+        d = d.to('cm').magnitude.tolist()
+
+        zero = Q('0m')
+        for index in range(len(front)):
+            wirePos = [zero,
+                       zero,
+                       Length(d[index]).q]
+            self.PlaceWire( geom, index, readPlane_lv, wirePos, 'r90aboutX', zwire_lv )
+
+        print('DONE - Creating ' + str(len(front))+' collection wires.')        
 
 
         
@@ -243,54 +335,47 @@ class TPCPlaneBuilder(gegede.builder.Builder):
         # if abs((self.planeDim[2] - dX).to('mm').magnitude) > 1:
         #     raise Exception("Inconsistent Z dim. dz: ", dX, " and z dim of the plane: ", self.planeDim[2])
 
-        WirePositions = []
-        
-        wire_num = 0
-        for row in self.WirePosition.itertuples():
-            zstart = row[self.XStartIndex]
-            ystart = row[self.YStartIndex]
-            zend   = row[self.XEndIndex]  
-            yend   = row[self.YEndIndex]  
-            if (row[self.FrontOrBack]):
-            # if (True):
-                wireStartPos = [Q("0mm"),
-                                Q(ystart,"mm") - self.planeDim[1]*0.5,
-                                Q(zstart,"mm")]
-
-                wireEndPos   = [Q("0mm"),
-                                Q(yend,"mm") - self.planeDim[1]*0.5,
-                                Q(zend,"mm")]
-
-                if (self.view == 'V'):
-                    wirePos = [(wireStartPos[0] + wireEndPos[0]) * 0.5,
-                               (wireStartPos[1] + wireEndPos[1] + 2*self.wireDiam) * 0.5,
-                               (wireStartPos[2] + wireEndPos[2] - 2*self.wireDiam) * 0.5]
-                if (self.view == 'U'):
-                    wirePos = [(wireStartPos[0] + wireEndPos[0]) * 0.5,
-                               (wireStartPos[1] + wireEndPos[1] + 2*self.wireDiam) * 0.5,
-                               (wireStartPos[2] + wireEndPos[2] + 2*self.wireDiam) * 0.5]
-
-                wire_length = (((wireStartPos[0]-wireEndPos[0])**2 +
-                               (wireStartPos[1]-wireEndPos[1])**2 +
-                               (wireStartPos[2]-wireEndPos[2])**2)**0.5 -
-                               (0.5*self.wireDiam * np.sin(self.wireAngle.to('rad').magnitude)) -
-                               (0.5*self.wireDiam * np.tan(self.wireAngle.to('rad').magnitude)))
-
-                    
-
-            
-                self.PositionDumper.write(str(wire_num) + " " +
-                                          str(wireStartPos[0].to('cm').magnitude) + " " +
-                                          str(wireStartPos[1].to('cm').magnitude) + " " +
-                                          str(wireStartPos[2].to('cm').magnitude) + " " +
-                                          str(wireEndPos[0].to('cm').magnitude) + " " +
-                                          str(wireEndPos[1].to('cm').magnitude) + " " + 
-                                          str(wireEndPos[2].to('cm').magnitude) + "\n")
-                
-                self.MakeAndPlaceWire(geom, wire_num, plane_lv, wirePos, wireRot, wire_length)
-                wire_num += 1
-
-        print('DONE - Creating ' + str(wire_num)+' '+self.view+' wires.')
+        # compute the geometry of all the front wires column-wise
+        front = self.WirePosition[self.WirePosition['Front'].to_numpy(dtype=bool)]
+        nwires = len(front)
+
+        wireStartPos = [Q(np.zeros(nwires), "mm"),
+                        Q(front['YStart'].to_numpy(), "mm") - self.planeDim[1]*0.5,
+                        Q(front['XStart'].to_numpy(), "mm")]
+
+        wireEndPos   = [Q(np.zeros(nwires), "mm"),
+                        Q(front['YEnd'].to_numpy(), "mm") - self.planeDim[1]*0.5,
+                        Q(front['XEnd'].to_numpy(), "mm")]
+
+        if (self.view == 'V'):
+            wirePos = [(wireStartPos[0] + wireEndPos[0]) * 0.5,
+                       (wireStartPos[1] + wireEndPos[1] + 2*self.wireDiam) * 0.5,
+                       (wireStartPos[2] + wireEndPos[2] - 2*self.wireDiam) * 0.5]
+        if (self.view == 'U'):
+            wirePos = [(wireStartPos[0] + wireEndPos[0]) * 0.5,
+                       (wireStartPos[1] + wireEndPos[1] + 2*self.wireDiam) * 0.5,
+                       (wireStartPos[2] + wireEndPos[2] + 2*self.wireDiam) * 0.5]
+
+        wire_length = (((wireStartPos[0]-wireEndPos[0])**2 +
+                       (wireStartPos[1]-wireEndPos[1])**2 +
+                       (wireStartPos[2]-wireEndPos[2])**2)**0.5 -
+                       (0.5*self.wireDiam * np.sin(self.wireAngle.to('rad').magnitude)) -
+                       (0.5*self.wireDiam * np.tan(self.wireAngle.to('rad').magnitude)))
+
+        # dump the wire end points in one go
+        dump = np.column_stack([pos.to('cm').magnitude for pos in wireStartPos + wireEndPos]).tolist()
+        self.PositionDumper.write(''.join(str(wire_num) + " " + " ".join(str(x) for x in row) + "\n"
+                                          for wire_num, row in enumerate(dump)))
+
+        # plain cm columns, turned into Quantities wire by wire
+        wirePos = [pos.to('cm').magnitude.tolist() for pos in wirePos]
+        wire_length = wire_length.to('cm').magnitude.tolist()
+        for wire_num in range(nwires):
+            self.MakeAndPlaceWire(geom, wire_num, plane_lv,
+                                  [Length(pos[wire_num]).q for pos in wirePos], wireRot,
+                                  Length(wire_length[wire_num]))
+
+        print('DONE - Creating ' + str(nwires)+' '+self.view+' wires.')
         self.PositionDumper.close() 
     
 
@@ -301,7 +386,7 @@ class TPCPlaneBuilder(gegede.builder.Builder):
         wire    = geom.shapes.Tubs('TPCWire' + self.view + '_' + str(num), 
                                     rmin = '0cm',
                                     rmax = 0.5*self.wireDiam, 
-                                    dz   = 0.5*wireLen )
+                                    dz   = quantity(0.5*wireLen) )
         # if ((num < 430 or num>700) and self.view is 'U'):
         #     print (num, wirePos, wireLen, self.wireDiam)
         wire_lv = geom.structure.Volume('volTPCWire' + self.view + str(num)+'Inner', 
@@ -1,3 +1,15 @@
+'''
+Analytic wire end points of the APA wire planes.
+
+Each function returns an (N, 4) array of (zstart, ystart, zend, yend) in mm,
+in the frame of the spreadsheet: z is centred on the plane and y runs from
+the bottom of the plane (0) to its height, except for the collection plane
+whose wires are centred in y as well. ExportWirePlane writes them out in the
+WirePlane<view>.txt format.
+
+Run as a script to write the text files.
+'''
+
 import numpy as np
 
 from gegede import Quantity as Q
@@ -28,149 +40,149 @@ VWire_zint   = VWirePitch / np.cos(WireAngle.to("rad").magnitude)
 UWireOffset  = Q("0.764195192922017cm")
 VWireOffset  = Q("0.5cm")
 
-#  __   __  _____  _                  
-#  \ \ / / |  __ \| |                 
-#   \ V /  | |__) | | __ _ _ __   ___ 
+# Number of wires in the corners and the center of the U plane
+NCornerWires = 400
+NCenterWires = 348
+
+
+def mm(q):
+    return q.to("mm").magnitude
+
+def CountSteps(start, step, limit):
+    '''
+    Number of i >= 0 with start + i*step < limit, for step > 0.
+    '''
+    return max(int(np.ceil((limit - start) / step)), 0)
+
+#  __   __  _____  _
+#  \ \ / / |  __ \| |
+#   \ V /  | |__) | | __ _ _ __   ___
 #    > <   |  ___/| |/ _` | '_ \ / _ \
 #   / . \  | |    | | (_| | | | |  __/
 #  /_/ \_\ |_|    |_|\__,_|_| |_|\___|
 #
 
-def MakeCollectionPlane(planeDim):
-
-    WirePlaneZ = open("WirePlaneZ.txt", "w")
+def CollectionPlaneEndpoints(planeDim=planeDimZ, pitch=XWirePitch):
 
-    wirePos = (-0.5*XWirePitch) - (239*XWirePitch)
+    p     = mm(pitch)
+    width = mm(planeDim[2])
+    half  = 0.5*mm(planeDim[1])
 
-    index = 0
-    while (wirePos < 0.5*planeDim[2]):
+    start = (-0.5*p) - (239*p)
+    z     = start + np.arange(CountSteps(start, p, 0.5*width)) * p
 
-        WirePlaneZ.write(str(wirePos.to("mm").magnitude)            + "\t" +
-                         str((-0.5*planeDim[1]).to("mm").magnitude) + "\t" +
-                         str(wirePos.to("mm").magnitude)            + "\t" +
-                         str((0.5*planeDim[1]).to("mm").magnitude)  + "\n")
+    return np.column_stack([z, np.full_like(z, -half), z, np.full_like(z, half)])
 
-        index += 1
-        wirePos += XWirePitch
-    print("DONE CREATING - " + str(index) + " - Collection wires")
-        
-#  __      __  _____  _                  
-#  \ \    / / |  __ \| |                 
-#   \ \  / /  | |__) | | __ _ _ __   ___ 
+#  __      __  _____  _
+#  \ \    / / |  __ \| |
+#   \ \  / /  | |__) | | __ _ _ __   ___
 #    \ \/ /   |  ___/| |/ _` | '_ \ / _ \
 #     \  /    | |    | | (_| | | | |  __/
 #      \/     |_|    |_|\__,_|_| |_|\___|
-#   
-
-def MakeInductionPlaneV(planeDim):
-
-    WirePlaneV = open("WirePlaneV.txt", "w")
-
-    index = 0
-    zpos  = (0.5*planeDim[2]) - VWireOffset
-    ypos  = VWireOffset / np.tan(WireAngle.to('rad').magnitude)
-
-    # Placing the bottom corner wires
-    while (zpos > -0.5*planeDim[2]):
-        WirePlaneV.write(str(zpos.to("mm").magnitude)             + "\t" +
-                         str(0)                                   + "\t" +
-                         # str(-0.5*planeDim[1].to("mm").magnitude) + "\t" +
-                         str(0.5*planeDim[2].to("mm").magnitude)  + "\t" +
-                         str(ypos.to("mm").magnitude)             + "\n")
-
-        index += 1
-        zpos  -= VWire_zint
-        ypos  += VWire_yint
-
-
-    # Placing the center wires
-    while (ypos < planeDim[1]):
-
-        ylow = ypos - (planeDim[2] / np.tan(WireAngle.to("rad").magnitude))
-        WirePlaneV.write(str((-0.5*planeDim[2]).to("mm").magnitude) + "\t" +
-                         str(ylow.to("mm").magnitude)               + "\t" +
-                         str((0.5*planeDim[2]).to("mm").magnitude)  + "\t" +
-                         str(ypos.to("mm").magnitude)               + "\n")
-        index      += 1
-        ypos       += VWire_yint
-
-    # Placing the top corner wires
-    ypos  = ypos - (planeDim[2] / np.tan(WireAngle.to("rad").magnitude))
-    zpos  = (-0.5*planeDim[2]) + ((planeDim[1] - ypos) * np.tan(WireAngle.to("rad").magnitude))
-    for i in range(400):
-        WirePlaneV.write(str((-0.5*planeDim[2]).to("mm").magnitude) + "\t" +
-                         str(ypos.to("mm").magnitude)               + "\t" +
-                         str(zpos.to("mm").magnitude)               + "\t" +
-                         str((planeDim[1]).to("mm").magnitude)      + "\n")
-
-        index += 1
-        ypos  += VWire_yint
-        zpos  -= VWire_zint
-
-    WirePlaneV.close()
-    print("DONE CREATING - " + str(index) + " - V Plane wires")
-
-#  _    _   _____  _                  
-# | |  | | |  __ \| |                 
-# | |  | | | |__) | | __ _ _ __   ___ 
+#
+
+def InductionPlaneVEndpoints(planeDim=planeDimV, offset=VWireOffset,
+                             yint=VWire_yint, zint=VWire_zint, angle=WireAngle):
+
+    tana   = np.tan(angle.to("rad").magnitude)
+    width  = mm(planeDim[2])
+    height = mm(planeDim[1])
+    yint   = mm(yint)
+    zint   = mm(zint)
+
+    # Bottom corner wires, from the bottom edge to the right edge
+    z0 = 0.5*width - mm(offset)
+    y0 = mm(offset) / tana
+    nb = CountSteps(-z0, zint, 0.5*width)
+    i  = np.arange(nb)
+    bottom = np.column_stack([z0 - i*zint, np.zeros(nb),
+                              np.full(nb, 0.5*width), y0 + i*yint])
+
+    # Center wires, from the left edge to the right edge
+    y1 = y0 + nb*yint
+    nc = CountSteps(y1, yint, height)
+    yc = y1 + np.arange(nc)*yint
+    center = np.column_stack([np.full(nc, -0.5*width), yc - width/tana,
+                              np.full(nc, 0.5*width), yc])
+
+    # Top corner wires, from the left edge to the top edge
+    y2 = y1 + nc*yint - width/tana
+    z2 = -0.5*width + (height - y2)*tana
+    i  = np.arange(NCornerWires)
+    top = np.column_stack([np.full(NCornerWires, -0.5*width), y2 + i*yint,
+                           z2 - i*zint, np.full(NCornerWires, height)])
+
+    return np.concatenate([bottom, center, top])
+
+#  _    _   _____  _
+# | |  | | |  __ \| |
+# | |  | | | |__) | | __ _ _ __   ___
 # | |  | | |  ___/| |/ _` | '_ \ / _ \
 # | |__| | | |    | | (_| | | | |  __/
 #  \____/  |_|    |_|\__,_|_| |_|\___|
 #
-        
-def MakeInductionPlaneU(planeDim):
-
-    WirePlaneU = open("WirePlaneU.txt", "w")
-    
-    index = 0
-    zpos  = (-0.5*planeDim[2]) + UWireOffset
-    ypos  = UWireOffset / np.tan(WireAngle.to('rad').magnitude)
-
-    # Placing the bottom corner wires
-    for i in range(400):
-        WirePlaneU.write(str((-0.5*planeDim[2]).to('mm').magnitude) + "\t" +
-                         str(ypos.to('mm').magnitude)               + "\t" +
-                         str(zpos.to('mm').magnitude)               + "\t" +
-                         str(0)                                     + "\n")
-        ypos  += UWire_yint
-        zpos  += UWire_zint
-        index += 1
-
-    # Placing the center wires
-    yspan = planeDim[2] / np.tan(WireAngle.to('rad').magnitude)
-    for i in range(348):
-        WirePlaneU.write(str((-0.5*planeDim[2]).to('mm').magnitude) + "\t" +
-                         str((ypos).to('mm').magnitude)             + "\t" +
-                         str((0.5*planeDim[2]).to('mm').magnitude)  + "\t" +
-                         str((ypos-yspan).to('mm').magnitude)       + "\n")
-        ypos  += UWire_yint
-        index += 1
-        
-    # Placing the top corner wires
-    ypos = ypos - yspan
-    zoff = planeDim[2] - ((planeDim[1]-ypos) * np.tan(WireAngle.to('rad').magnitude))
-    zpos = (-0.5*planeDim[2]) + zoff
-
-    for i in range(400):
-        WirePlaneU.write(str(zpos.to('mm').magnitude)              + "\t" +
-                         str(planeDim[1].to('mm').magnitude)       + "\t" +
-                         str((0.5*planeDim[2]).to('mm').magnitude) + "\t" +
-                         str(ypos.to('mm').magnitude)              + "\n")
-
-        ypos  += UWire_yint
-        zpos  += UWire_zint
-        index += 1
-        
-    WirePlaneU.close()
-    print("DONE CREATING - " + str(index) + " - U Plane wires")
-
-
-        
+
+def InductionPlaneUEndpoints(planeDim=planeDimU, offset=UWireOffset,
+                             yint=UWire_yint, zint=UWire_zint, angle=WireAngle):
+
+    tana   = np.tan(angle.to("rad").magnitude)
+    width  = mm(planeDim[2])
+    height = mm(planeDim[1])
+    yint   = mm(yint)
+    zint   = mm(zint)
+
+    # Bottom corner wires, from the left edge to the bottom edge
+    z0 = -0.5*width + mm(offset)
+    y0 = mm(offset) / tana
+    i  = np.arange(NCornerWires)
+    bottom = np.column_stack([np.full(NCornerWires, -0.5*width), y0 + i*yint,
+                              z0 + i*zint, np.zeros(NCornerWires)])
+
+    # Center wires, from the left edge to the right edge
+    yspan = width / tana
+    yc = y0 + (NCornerWires + np.arange(NCenterWires))*yint
+    center = np.column_stack([np.full(NCenterWires, -0.5*width), yc,
+                              np.full(NCenterWires, 0.5*width), yc - yspan])
+
+    # Top corner wires, from the top edge to the right edge
+    y2 = y0 + (NCornerWires + NCenterWires)*yint - yspan
+    z2 = -0.5*width + width - (height - y2)*tana
+    i  = np.arange(NCornerWires)
+    top = np.column_stack([z2 + i*zint, np.full(NCornerWires, height),
+                           np.full(NCornerWires, 0.5*width), y2 + i*yint])
+
+    return np.concatenate([bottom, center, top])
+
+
+def WirePlaneEndpoints(view, planeDim=None):
+    '''
+    End points of the wires of the plane <view> ('Z', 'U' or 'V').
+    '''
+    if view == 'Z':
+        return CollectionPlaneEndpoints(planeDim or planeDimZ)
+    if view == 'U':
+        return InductionPlaneUEndpoints(planeDim or planeDimU)
+    if view == 'V':
+        return InductionPlaneVEndpoints(planeDim or planeDimV)
+    raise ValueError("Unknown wire plane view: " + str(view))
+
+def ExportWirePlane(view, endpoints, filename=None):
+    '''
+    Write the end points as WirePlane<view>.txt, one tab separated line per wire.
+    '''
+    if filename is None:
+        filename = "WirePlane" + view + ".txt"
+    with open(filename, "w") as f:
+        f.write("".join("\t".join(str(x) for x in row) + "\n" for row in endpoints.tolist()))
+    print("DONE CREATING - " + str(len(endpoints)) + " - " + view + " Plane wires")
+
+
 def main(x, u, v):
-    
-    if (x) : MakeCollectionPlane(planeDimZ)
-    if (u) : MakeInductionPlaneU(planeDimU)
-    if (v) : MakeInductionPlaneV(planeDimV)
-    
 
-main(0, 1, 0)    
+    if (x) : ExportWirePlane('Z', WirePlaneEndpoints('Z'))
+    if (u) : ExportWirePlane('U', WirePlaneEndpoints('U'))
+    if (v) : ExportWirePlane('V', WirePlaneEndpoints('V'))
+
+
+if __name__ == '__main__':
+    main(0, 1, 0)
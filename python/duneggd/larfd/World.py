@@ -8,6 +8,18 @@ import math
 import pandas as pd
 from gegede import Quantity as Q
 
+# rotations shared by all the builders, made by the World builder, which is
+# constructed last: the builders needing their angles read them here
+Rotations = {'r90aboutX'                   : ('90deg',  '0deg',   '0deg'  ),
+             'r90aboutY'                   : ('0deg',   '90deg',  '0deg'  ),
+             'r90aboutZ'                   : ('0deg',   '0deg',   '90deg' ),
+             'r90aboutX_90aboutZ'          : ('90deg',  '0deg',   '90deg' ),
+             'r90aboutX_90aboutY'          : ('90deg',  '90deg',  '0deg'  ),
+             'r90aboutX_90aboutY_90aboutZ' : ('90deg',  '90deg',  '90deg' ),
+             'r180aboutX'                  : ('180deg', '0deg',   '0deg'  ),
+             'r180aboutY'                  : ('0deg',   '180deg', '0deg'  ),
+             'r180aboutX_180aboutY'        : ('180deg', '180deg', '0deg'  )}
+
 
 class WorldBuilder(gegede.builder.Builder):
     '''
@@ -19,9 +31,11 @@ class WorldBuilder(gegede.builder.Builder):
     def configure(self,
                   worldDim = [Q('100m'),Q('100m'),Q('100m')], 
                   worldMat = 'Rock',
+                  wireTableFile = None,
                   **kwds):
         self.worldDim   = worldDim
         self.material   = worldMat
+        self.wireTableFile = wireTableFile
         self.detEncBldr = self.get_builder("DetEnclosure")
         self.cryoBldr   = self.detEncBldr.get_builder("Cryostat")
 
@@ -72,15 +86,8 @@ class WorldBuilder(gegede.builder.Builder):
 
         ########################### Above is math, below is GGD ###########################
         self.define_materials(geom)
-        r90aboutX   = geom.structure.Rotation('r90aboutX',                   x='90deg',  y='0deg',   z='0deg'  )
-        r90aboutY   = geom.structure.Rotation('r90aboutY',                   x='0deg',   y='90deg',  z='0deg'  )
-        r90aboutZ   = geom.structure.Rotation('r90aboutZ',                   x='0deg',   y='0deg',   z='90deg' )
-        r90aboutXZ  = geom.structure.Rotation('r90aboutX_90aboutZ',          x='90deg',  y='0deg',   z='90deg' )
-        r90aboutXY  = geom.structure.Rotation('r90aboutX_90aboutY',          x='90deg',  y='90deg',  z='0deg'  )
-        r90aboutXYZ = geom.structure.Rotation('r90aboutX_90aboutY_90aboutZ', x='90deg',  y='90deg',  z='90deg' )
-        r180aboutX  = geom.structure.Rotation('r180aboutX',                  x='180deg', y='0deg',   z='0deg'  )
-        r180aboutY  = geom.structure.Rotation('r180aboutY',                  x='0deg',   y='180deg', z='0deg'  )
-        r180aboutXY = geom.structure.Rotation('r180aboutX_180aboutY',        x='180deg', y='180deg', z='0deg'  )
+        for name, (x, y, z) in Rotations.items():
+            geom.structure.Rotation(name, x=x, y=y, z=z)
 
 
         worldBox = geom.shapes.Box( self.name,
@@ -98,6 +105,11 @@ class WorldBuilder(gegede.builder.Builder):
                                                    volume = detEnc_lv,
                                                    pos    = detEnc_in_world)
         world_lv.placements.append(pD_in_W.name)
+
+        # Export the wire positions alongside the GDML
+        if self.wireTableFile:
+            from duneggd.wiretable import write_wire_table
+            write_wire_table(geom, self.wireTableFile, world=world_lv.name)
         return
 
 
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+'''
+Disk-backed memoization of generated layouts (e.g. wire tables).
+
+Entries are numpy arrays saved as .npy files in a cache directory, named
+after a hash of the generating parameters and of the version of the code
+that generates them. The directory holds at most max_entries entries; the
+least recently used ones are evicted (loading an entry refreshes its
+modification time). Only the files named like entries are counted and
+evicted, the others in the directory are left alone.
+'''
+
+import os
+import re
+import hashlib
+import inspect
+import numpy as np
+
+
+def source_version(*funcs):
+    '''
+    Version string of the code of the given functions: a hash of their source.
+    '''
+    digest = hashlib.sha256()
+    for func in funcs:
+        digest.update(inspect.getsource(func).encode())
+    return digest.hexdigest()
+
+# file names of the entries, see LayoutCache.key and LayoutCache.path
+ENTRY_NAME = re.compile(r'^[0-9a-f]{32}\.npy$')
+
+
+class LayoutCache(object):
+    '''
+    LRU store of numpy arrays keyed by parameters.
+    '''
+
+    def __init__(self, directory, max_entries=64):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, *params, version=''):
+        '''
+        Cache key of the parameters (anything with a stable repr, such as
+        numbers, strings, Quantities and containers of them) and code version.
+        '''
+        return hashlib.sha256(repr((params, version)).encode()).hexdigest()[:32]
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.npy')
+
+    def load(self, key):
+        '''
+        Return the cached array or None.
+        '''
+        path = self.path(key)
+        try:
+            array = np.load(path)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        return array
+
+    def store(self, key, array):
+        '''
+        Save an array and evict the least recently used entries.
+        '''
+        tmp = self.path(key) + '.tmp%d' % os.getpid()
+        with open(tmp, 'wb') as f:
+            np.save(f, np.asarray(array))
+        os.replace(tmp, self.path(key))
+        self.evict()
+
+    def evict(self):
+        entries = [os.path.join(self.directory, f) for f in os.listdir(self.directory)
+                   if ENTRY_NAME.match(f)]
+        if self.max_entries is None or len(entries) <= self.max_entries:
+            return
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
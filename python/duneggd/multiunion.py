@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+'''
+Multi-union solids and a GDML exporter for them.
+
+A MultiUnion is a single solid made of N component solids, each with its
+own position and rotation. It is written as a GDML <multiUnion> and read
+by Geant4 as a G4MultiUnion, which voxelizes its components, whereas a
+chain of N boolean unions is navigated one level at a time.
+
+Builders can make them with multi_union(). Existing left-deep chains of
+unions, union(union(union(a, b), c), d), are rewritten into multi-unions
+by collapse_unions().
+
+This module is also a gegede export module that collapses the union
+chains and writes GDML:
+
+    $ gegede-cli dunevd_v7.cfg -f duneggd.multiunion -o dunevd.gdml
+
+The plain gegede GDML exporter does not know about multi-unions. This one
+also writes the replicas and divisions of duneggd.replica.
+'''
+
+from collections import namedtuple
+
+from lxml import etree
+from gegede.schema.types import Named
+import gegede.export.gdml as gdml
+
+from duneggd import replica
+
+MultiUnion = namedtuple('MultiUnion', ['name', 'solids', 'positions', 'rotations'])
+
+# chains shorter than this are left as booleans
+MIN_COMPONENTS = 3
+
+
+def multi_union(geom, name, solids, positions=None, rotations=None):
+    '''
+    Make a MultiUnion of the solids and add it to the shapes of geom. The
+    positions and rotations of the components default to none (the
+    center and the identity), like those of a Boolean.
+    '''
+    if name in geom.store.shapes:
+        raise ValueError('Shape "%s" already defined' % name)
+    solids = [Named(s) for s in solids]
+    positions = [Named(p) for p in positions or [None]*len(solids)]
+    rotations = [Named(r) for r in rotations or [None]*len(solids)]
+    if not len(solids) == len(positions) == len(rotations):
+        raise ValueError('MultiUnion "%s" needs one position and rotation per solid' % name)
+    shape = MultiUnion(name, solids, positions, rotations)
+    geom.store.shapes[name] = shape
+    return shape
+
+
+def is_union(shape):
+    typename = type(shape).__name__
+    return typename == 'Union' or (typename == 'Boolean' and shape.type == 'union')
+
+
+def shape_references(geom):
+    '''
+    Number of references to each shape, from the other shapes and from
+    the volumes.
+    '''
+    refs = dict.fromkeys(geom.store.shapes, 0)
+    def ref(name):
+        if name in refs:
+            refs[name] += 1
+    for shape in geom.store.shapes.values():
+        if isinstance(shape, MultiUnion):
+            for name in shape.solids:
+                ref(name)
+        elif hasattr(shape, 'first'):
+            ref(shape.first)
+            ref(shape.second)
+    for obj in geom.store.structure.values():
+        if type(obj).__name__ == 'Volume':
+            ref(obj.shape)
+    return refs
+
+
+def collapse_unions(geom, min_components=MIN_COMPONENTS):
+    '''
+    Replace the left-deep union chains of at least min_components solids
+    by MultiUnions of the same name. The inner unions of a chain are
+    removed; a union that is also used elsewhere ends the chain and stays
+    a component. Returns the number of chains collapsed.
+    '''
+    shapes = geom.store.shapes
+    refs = shape_references(geom)
+    inner = set()
+    for shape in shapes.values():
+        if is_union(shape):
+            first = shapes.get(shape.first)
+            if first is not None and is_union(first) and refs[first.name] == 1:
+                inner.add(first.name)
+
+    ncollapsed = 0
+    for name in [n for n, s in shapes.items() if is_union(s) and n not in inner]:
+        # walk down the chain, the components are in the frame of its first solid
+        chain = []
+        components = []
+        shape = shapes[name]
+        while True:
+            components.append((shape.second, shape.pos, shape.rot))
+            if shape.first not in inner:
+                components.append((shape.first, None, None))
+                break
+            shape = shapes[shape.first]
+            chain.append(shape.name)
+        if len(components) < min_components:
+            continue
+        components.reverse()
+        solids, positions, rotations = [list(c) for c in zip(*components)]
+        shapes[name] = MultiUnion(name, solids, positions, rotations)
+        for inner_name in chain:
+            del shapes[inner_name]
+        ncollapsed += 1
+    return ncollapsed
+
+
+def make_multiunion_node(shape):
+    '''
+    Return the <multiUnion> lxml.etree.Element of a MultiUnion.
+    '''
+    ele = etree.Element('multiUnion', name=shape.name)
+    for i, (solid, pos, rot) in enumerate(zip(shape.solids, shape.positions, shape.rotations)):
+        node = etree.Element('multiUnionNode', name='%s_node%d' % (shape.name, i))
+        node.append(etree.Element('solid', ref=solid))
+        node.append(etree.Element('positionref', ref=pos or 'center'))
+        node.append(etree.Element('rotationref', ref=rot or 'identity'))
+        ele.append(node)
+    return ele
+
+
+# gegede export module interface
+
+def convert(geom):
+    '''
+    Collapse the union chains of geom and return its GDML lxml.etree.
+    '''
+    ncollapsed = collapse_unions(geom)
+    if ncollapsed:
+        print("Collapsed %d union chains into multiUnion solids" % ncollapsed)
+
+    # gegede writes the other shapes, the multi-unions are put back in order
+    shapes = list(geom.store.shapes.values())
+    multi = [(i, shape) for i, shape in enumerate(shapes) if isinstance(shape, MultiUnion)]
+    for i, shape in multi:
+        del geom.store.shapes[shape.name]
+    try:
+        gdml_node = replica.convert(geom)
+    finally:
+        geom.store.shapes.clear()
+        geom.store.shapes.update((shape.name, shape) for shape in shapes)
+    solids_node = gdml_node.find('solids')
+    for i, shape in multi:
+        solids_node.insert(i, make_multiunion_node(shape))
+    return gdml_node
+
+def dumps(obj):
+    return gdml.dumps(obj)
+
+def output(obj, filename):
+    return gdml.output(obj, filename)
@@ -5,7 +5,6 @@ beamelements builder for ProtoDUNE-VD geometry
 
 import gegede.builder
 from gegede import Quantity as Q
-import math
 
 class BeamElementsBuilder(gegede.builder.Builder):
     '''
@@ -19,30 +18,6 @@ class BeamElementsBuilder(gegede.builder.Builder):
         self.steel = None
         self.cryo = None
 
-    def calculate_beam_angles(self):
-        """Calculate derived beam angle parameters"""
-        
-        # Convert angles to radians
-        theta3XZ_rad = float(self.beam['theta3XZ'].to('rad').magnitude)
-        thetaYZ_rad = float(self.beam['thetaYZ'].to('rad').magnitude)
-
-        # Calculate beam angles
-        BeamTheta3 = math.atan(math.sqrt(math.tan(theta3XZ_rad)**2 + 
-                                       math.tan(thetaYZ_rad)**2))
-        BeamPhi3 = math.atan(math.tan(thetaYZ_rad)/math.tan(theta3XZ_rad))
-
-        # Store calculated angles
-        self.beam['BeamTheta3'] = BeamTheta3
-        self.beam['BeamPhi3'] = BeamPhi3
-        self.beam['BeamTheta3Deg'] = math.degrees(BeamTheta3)
-        self.beam['BeamPhi3Deg'] = math.degrees(BeamPhi3)
-
-        # Calculate deltas
-        self.beam['DeltaXZ3'] = math.tan(BeamTheta3)*math.cos(BeamPhi3)
-        self.beam['DeltaYZ3'] = math.tan(BeamTheta3)*math.sin(BeamPhi3)
-
-       
-
     def configure(self, steel_parameters=None, cryostat_parameters=None, 
                  beam_parameters=None, FoamPadding=None, 
                  OriginXSet=None, OriginYSet=None, OriginZSet=None,  # Add these parameters
@@ -66,221 +41,9 @@ class BeamElementsBuilder(gegede.builder.Builder):
         self.OriginYSet = OriginYSet
         self.OriginZSet = OriginZSet
 
-        if self.beam and self.steel and self.cryo and self.FoamPadding:
-            # Calculate derived beam angles
-            self.calculate_beam_angles()
-
-            # Calculate beam vacuum pipe radius
-            self.beam['BeamVaPipeRad'] = self.beam['BeamPipeRad'] - Q('0.2cm')
-            self.beam['BeamVaPipeLe'] = self.beam['BeamPipeLe']
-
-            # Calculate positions and lengths
-            cos_theta3 = math.cos(self.beam['BeamTheta3'])
-            
-            # Calculate beam plug parameters
-            self.beam['BeamPlugUSAr'] = Q('1cm')/cos_theta3
-            self.beam['BeamPlugLe'] = Q('188cm')/cos_theta3 - self.beam['BeamPlugUSAr']
-            self.beam['BeamPlugNiLe'] = self.beam['BeamPlugLe'] - Q('0.59cm')/cos_theta3
-            self.beam['BeamPlugNiPos_z'] = Q('0.59cm')/(2*cos_theta3)
-
-            # Steel plate front face coordinates
-            self.beam['BeamWStPlateFF_x'] = Q('634.2cm') - self.cryo['Cryostat_x']/2
-            self.beam['BeamWStPlateFF_y'] = (self.cryo['Cryostat_y']/2 + 
-                                            self.steel['SteelSupport_y'] + 
-                                            self.FoamPadding)
-            self.beam['BeamWStPlateFF_z'] = -(self.cryo['Cryostat_z']/2 + 
-                                            self.FoamPadding + 
-                                            self.steel['SteelPlate'])
-
-            # Steel plate parameters
-            self.beam['BeamWStPlateLe'] = self.steel['SteelPlate']/cos_theta3 + Q('0.001cm')
-            self.beam['BeamWStPlate_x'] = (self.beam['BeamWStPlateFF_x'] - 
-                                        (self.steel['SteelPlate']/2)*self.beam['DeltaXZ3'])
-            self.beam['BeamWStPlate_y'] = (self.beam['BeamWStPlateFF_y'] - 
-                                        (self.steel['SteelPlate']/2)*self.beam['DeltaYZ3'])
-            self.beam['BeamWStPlate_z'] = (self.beam['BeamWStPlateFF_z'] + 
-                                        self.steel['SteelPlate']/2)
-
-            # Foam removal parameters
-            self.beam['BeamWFoRemLe'] = self.FoamPadding/cos_theta3 + Q('0.001cm')
-            self.beam['BeamWFoRemPosDZ'] = self.steel['SteelPlate'] + self.FoamPadding/2
-            self.beam['BeamWFoRem_x'] = (self.beam['BeamWStPlateFF_x'] - 
-                                        self.beam['BeamWFoRemPosDZ']*self.beam['DeltaXZ3'])
-            self.beam['BeamWFoRem_y'] = (self.beam['BeamWStPlateFF_y'] - 
-                                        self.beam['BeamWFoRemPosDZ']*self.beam['DeltaYZ3'])
-            self.beam['BeamWFoRem_z'] = (self.beam['BeamWStPlateFF_z'] + 
-                                        self.beam['BeamWFoRemPosDZ'])
-
-            # Steel support parameters
-            self.beam['BeamWStSuLe'] = ((self.steel['SteelSupport_z'] - 
-                                        self.steel['SteelPlate'])/cos_theta3 + Q('0.001cm'))
-            self.beam['BeamWStSuPosDZ'] = -(self.steel['SteelSupport_z'] - 
-                                        self.steel['SteelPlate'])/2
-            self.beam['BeamWStSu_x'] = (self.beam['BeamWStPlateFF_x'] - 
-                                    self.beam['BeamWStSuPosDZ']*self.beam['DeltaXZ3'])
-            self.beam['BeamWStSu_y'] = (self.beam['BeamWStPlateFF_y'] - 
-                                    self.beam['BeamWStSuPosDZ']*self.beam['DeltaYZ3'])
-            self.beam['BeamWStSu_z'] = (self.beam['BeamWStPlateFF_z'] + 
-                                    self.beam['BeamWStSuPosDZ'])
-
-            # Foam window parameters
-            self.beam['BeamWFoPosDZ'] = (self.steel['SteelPlate'] + self.FoamPadding - 
-                                        self.beam['BeamWFoLe']*cos_theta3/2)
-            self.beam['BeamWFo_x'] = (self.beam['BeamWStPlateFF_x'] - 
-                                    self.beam['BeamWFoPosDZ']*self.beam['DeltaXZ3'])
-            self.beam['BeamWFo_y'] = (self.beam['BeamWStPlateFF_y'] - 
-                                    self.beam['BeamWFoPosDZ']*self.beam['DeltaYZ3'] + 
-                                    self.steel['posCryoInDetEnc']['y'])
-            self.beam['BeamWFo_z'] = (self.beam['BeamWStPlateFF_z'] + 
-                                    self.beam['BeamWFoPosDZ'])
-
-            # Glass window parameters
-            self.beam['BeamWGlPosDZ'] = (self.steel['SteelPlate'] + self.FoamPadding - 
-                                        (self.beam['BeamWFoLe'] + 
-                                        self.beam['BeamWGlLe']/2)*cos_theta3)
-            self.beam['BeamWGl_x'] = (self.beam['BeamWStPlateFF_x'] - 
-                                    self.beam['BeamWGlPosDZ']*self.beam['DeltaXZ3'])
-            self.beam['BeamWGl_y'] = (self.beam['BeamWStPlateFF_y'] - 
-                                    self.beam['BeamWGlPosDZ']*self.beam['DeltaYZ3'] + 
-                                    self.steel['posCryoInDetEnc']['y'])
-            self.beam['BeamWGl_z'] = (self.beam['BeamWStPlateFF_z'] + 
-                                    self.beam['BeamWGlPosDZ'])
-
-            # Vacuum window parameters
-            self.beam['BeamWVaPosDZ'] = (self.steel['SteelPlate'] + self.FoamPadding - 
-                                        (self.beam['BeamWFoLe'] + self.beam['BeamWGlLe'] + 
-                                        self.beam['BeamPipeLe']/2)*cos_theta3)
-            self.beam['BeamWVa_x'] = (self.beam['BeamWStPlateFF_x'] - 
-                                    self.beam['BeamWVaPosDZ']*self.beam['DeltaXZ3'])
-            self.beam['BeamWVa_y'] = (self.beam['BeamWStPlateFF_y'] - 
-                                    self.beam['BeamWVaPosDZ']*self.beam['DeltaYZ3'] + 
-                                    self.steel['posCryoInDetEnc']['y'])
-            self.beam['BeamWVa_z'] = (self.beam['BeamWStPlateFF_z'] + 
-                                    self.beam['BeamWVaPosDZ'])
-
-            # Calculate beam plug parameters
-            self.beam['BeamPlugPosDZ'] = (self.steel['SteelPlate'] + self.FoamPadding + 
-                                        self.cryo['SteelThickness'] + 
-                                        self.beam['BeamPlugUSAr'] + 
-                                        self.beam['BeamPlugLe']*cos_theta3/2)
-            self.beam['BeamPlug_x'] = (self.beam['BeamWStPlateFF_x'] - 
-                                    self.beam['BeamPlugPosDZ']*self.beam['DeltaXZ3'])
-            self.beam['BeamPlug_y'] = (self.beam['BeamWStPlateFF_y'] - 
-                                    self.beam['BeamPlugPosDZ']*self.beam['DeltaYZ3'])
-            self.beam['BeamPlug_z'] = (self.beam['BeamWStPlateFF_z'] + 
-                                    self.beam['BeamPlugPosDZ'])
-
-            # Beam plug flange parameters
-            self.beam['BePlFlangePosDZ'] = (self.steel['SteelPlate'] + self.FoamPadding + 
-                                        self.cryo['SteelThickness'] + 
-                                        self.beam['BeamPlugUSAr'] + 
-                                        self.beam['BeamPlugLe']*cos_theta3)
-            self.beam['BePlFlange_x'] = (self.beam['BeamWStPlateFF_x'] - 
-                                        self.beam['BePlFlangePosDZ']*self.beam['DeltaXZ3'])
-            self.beam['BePlFlange_y'] = (self.beam['BeamWStPlateFF_y'] - 
-                                        self.beam['BePlFlangePosDZ']*self.beam['DeltaYZ3'])
-            self.beam['BePlFlange_z'] = (self.beam['BeamWStPlateFF_z'] + 
-                                        self.beam['BePlFlangePosDZ'] + Q('1.8cm'))
-
-            # Beam plug membrane parameters
-            self.beam['BeamPlugMembPosDZ'] = (self.steel['SteelPlate'] + self.FoamPadding + 
-                                            self.cryo['SteelThickness'])
-            self.beam['BeamPlugMemb_x'] = (self.beam['BeamWStPlateFF_x'] - 
-                                        self.beam['BeamPlugMembPosDZ']*self.beam['DeltaXZ3'])
-            self.beam['BeamPlugMemb_y'] = (self.beam['BeamWStPlateFF_y'] - 
-                                        self.beam['BeamPlugMembPosDZ']*self.beam['DeltaYZ3'])
-            self.beam['BeamPlugMemb_z'] = (self.beam['BeamWStPlateFF_z'] + 
-                                        self.beam['BeamPlugMembPosDZ'])
-
-            # Add beam window coordinates
-            self.beam['BWFFCoord3X'] = (self.beam['BeamWStPlateFF_x'] - 
-                                       self.beam['BeamWStSuPosDZ'] * self.beam['DeltaXZ3'] * 2 +
-                                       self.OriginXSet)  # Use local variable
-            self.beam['BWFFCoord3Y'] = (self.beam['BeamWStPlateFF_y'] - 
-                                       self.beam['BeamWStSuPosDZ'] * self.beam['DeltaYZ3'] * 2 +
-                                       self.OriginYSet +   # Use local variable
-                                       self.steel['posCryoInDetEnc']['y'])
-            self.beam['BWFFCoord3Z'] = (-(self.cryo['Cryostat_z']/2 + 
-                                         self.steel['SteelSupport_z'] + 
-                                         self.FoamPadding) +
-                                       self.OriginZSet)  # Use local variable
-
-            # Beam window steel plate coordinates
-            self.beam['BW3StPlCoordX'] = (self.beam['BeamWStPlateFF_x'] + 
-                                         self.OriginXSet)  # Use local variable
-            self.beam['BW3StPlCoordY'] = (self.beam['BeamWStPlateFF_y'] + 
-                                         self.OriginYSet +   # Use local variable
-                                         self.steel['posCryoInDetEnc']['y'])
-            self.beam['BW3StPlCoordZ'] = (self.beam['BeamWStPlateFF_z'] + 
-                                         self.OriginZSet)  # Use local variable
-
-            # PD2 Beam Plug calculations
-            self.beam['thetaIIYZ'] = self.beam['thetaYZ']
-            self.beam['thetaII3XZ'] = self.beam['theta3XZ']
-            
-            thetaIIYZ_rad = float(self.beam['thetaIIYZ'].to('rad').magnitude)
-            thetaII3XZ_rad = float(self.beam['thetaII3XZ'].to('rad').magnitude)
-            
-            self.beam['BeamThetaII3'] = math.atan(math.sqrt(
-                math.tan(thetaII3XZ_rad)**2 + math.tan(thetaIIYZ_rad)**2))
-            self.beam['BeamPhiII3'] = math.atan(
-                math.tan(thetaIIYZ_rad)/math.tan(thetaII3XZ_rad))
-
-            # Calculate secondary angles
-            self.beam['thetaIIYZ3prime'] = math.degrees(math.atan(
-                math.sin(self.beam['BeamThetaII3']) * 
-                math.sin(self.beam['BeamPhiII3'] + math.pi) /
-                math.sqrt(math.cos(self.beam['BeamThetaII3'])**2 + 
-                         math.sin(self.beam['BeamThetaII3'])**2 * 
-                         math.cos(self.beam['BeamPhiII3'])**2)))
-
-            # Calculate deltas
-            self.beam['DeltaIIXZ3'] = math.tan(self.beam['BeamThetaII3']) * math.cos(self.beam['BeamPhiII3'])
-            self.beam['DeltaIIYZ3'] = math.tan(self.beam['BeamThetaII3']) * math.sin(self.beam['BeamPhiII3'])
-
-            # Beam plug membrane coordinates
-            self.beam['BeamPlIIMem_x'] = self.beam['BeamPlugMemb_x']
-            self.beam['BeamPlIIMem_y'] = self.beam['BeamPlugMemb_y']
-            self.beam['BeamPlIIMem_z'] = self.beam['BeamPlugMemb_z']
-
-            # Beam plug parameters
-            inch = Q('2.54cm')
-            self.beam['BeamPlIIRad'] = 11 * inch / 2
-            self.beam['BeamPlIINiRad'] = 10 * inch / 2
-            self.beam['BeamPlIIUSAr'] = Q('1cm') / math.cos(self.beam['BeamThetaII3'])
-            self.beam['BeamPlIILe'] = (self.cryo['zLArBuffer'] - Q('5.3cm')) / math.cos(self.beam['BeamThetaII3'])
-            self.beam['BeamPlIINiLe'] = self.beam['BeamPlIILe']
-            self.beam['BeamPlIICapDZ'] = Q('0.5cm') * math.cos(self.beam['BeamThetaII3'])
-
-            # Calculate positions
-            self.beam['BeamPlIIPosDZ'] = (self.beam['BeamPlIICapDZ'] + 
-                                         self.beam['BeamPlIILe'] * math.cos(self.beam['BeamThetaII3']) / 2.0)
-            self.beam['BeamPlII_x'] = (self.beam['BeamPlIIMem_x'] - 
-                                      self.beam['BeamPlIIPosDZ'] * self.beam['DeltaIIXZ3'])
-            self.beam['BeamPlII_y'] = (self.beam['BeamPlIIMem_y'] - 
-                                      self.beam['BeamPlIIPosDZ'] * self.beam['DeltaIIYZ3'])
-            self.beam['BeamPlII_z'] = self.beam['BeamPlIIMem_z'] + self.beam['BeamPlIIPosDZ']
-
-            # Cap positions
-            self.beam['BeamPlIIUSCap_x'] = (self.beam['BeamPlIIMem_x'] - 
-                                           self.beam['BeamPlIICapDZ'] / 2.0 * self.beam['DeltaIIXZ3'])
-            self.beam['BeamPlIIUSCap_y'] = (self.beam['BeamPlIIMem_y'] - 
-                                           self.beam['BeamPlIICapDZ'] / 2.0 * self.beam['DeltaIIYZ3'])
-            self.beam['BeamPlIIUSCap_z'] = (self.beam['BeamPlIIMem_z'] + 
-                                           self.beam['BeamPlIICapDZ'] / 2.0)
-
-            self.beam['BeamPlIIDSPosDZ'] = (self.beam['BeamPlIICapDZ'] + 
-                                           self.beam['BeamPlIILe'] * math.cos(self.beam['BeamThetaII3']) + 
-                                           self.beam['BeamPlIICapDZ'] / 2)
-            self.beam['BeamPlIIDSCap_x'] = (self.beam['BeamPlIIMem_x'] - 
-                                           self.beam['BeamPlIIDSPosDZ'] * self.beam['DeltaIIXZ3'])
-            self.beam['BeamPlIIDSCap_y'] = (self.beam['BeamPlIIMem_y'] - 
-                                           self.beam['BeamPlIIDSPosDZ'] * self.beam['DeltaIIYZ3'])
-            self.beam['BeamPlIIDSCap_z'] = (self.beam['BeamPlIIMem_z'] + 
-                                           self.beam['BeamPlIIDSPosDZ'])
-            
-            self.print_construct = print_construct
-            self._configured = True
+        # The derived beam parameters come with the beam bundle (see bundles.py)
+        self.print_construct = print_construct
+        self._configured = True
 
     def construct_rotations(self, geom):
         """Define standard rotations used throughout the geometry"""
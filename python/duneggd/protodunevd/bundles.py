@@ -0,0 +1,672 @@
+#!/usr/bin/env python
+'''
+Parameter bundles of the ProtoDUNE-VD builders.
+
+The world section of protodune_vd.cfg gives the parameters of each part
+of the detector as the string of a Python dict (tpc_parameters,
+cryostat_parameters, ...). load() evaluates each string once, checks it
+against the SCHEMA of its part, computes the parameters derived from it
+and from the other parts, and returns them as frozen Bundles:
+
+    >>> bundles = load(dict(tpc=tpc_parameters, cryostat=cryostat_parameters, ...),
+    ...                FoamPadding=Q('80cm'), DP_CRT_switch=False)
+    >>> bundles['tpc']['widthCRP'], bundles['enclosure']['OriginXSet']
+
+The world builder hands the same Bundles down to all the sub-builders,
+which read them but can not change them, so no builder depends on the
+parameters another one added before it.
+'''
+
+import math
+import functools
+from collections.abc import Mapping
+
+from gegede import Quantity as Q
+
+
+class Bundle(Mapping):
+    '''
+    Frozen dict of parameters. The dicts and lists in it are frozen too,
+    into Bundles and tuples.
+    '''
+    def __init__(self, items=(), **more):
+        self._items = dict((key, _freeze(value)) for key, value in dict(items, **more).items())
+
+    def __getitem__(self, key):
+        return self._items[key]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __repr__(self):
+        return 'Bundle(%r)' % self._items
+
+    def replace(self, **more):
+        '''
+        Return a copy of the bundle with more parameters, or new values.
+        '''
+        return Bundle(self._items, **more)
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return Bundle(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+# checks of the kinds of parameters
+KINDS = {
+    'length': lambda v: isinstance(v, Q) and v.check('[length]'),
+    'angle': lambda v: isinstance(v, Q) and v.dimensionless,
+    'int': lambda v: isinstance(v, int) and not isinstance(v, bool),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'bool': lambda v: isinstance(v, (bool, int)),
+    'str': lambda v: isinstance(v, str),
+    # [start, stop) index range, a stop of None meaning the end
+    'range': lambda v: (isinstance(v, (list, tuple)) and len(v) == 2 and
+                        all(i is None or isinstance(i, int) for i in v)),
+}
+
+# The parameters of each part and their kinds: a list of them ends with
+# [], a dict of them with {}, and an optional parameter with ?
+SCHEMA = {
+    'tpc': {
+        'inch': 'number', 'nChans': 'int{}', 'nViews': 'int', 'wirePitch': 'length{}',
+        'wireAngle': 'angle{}', 'offsetUVwire': 'length[]', 'lengthPCBActive': 'length',
+        'widthPCBActive': 'length', 'gapCRU': 'length', 'borderCRP': 'length', 'nCRM_x': 'int',
+        'nCRM_z': 'int', 'padWidth': 'length', 'driftTPCActive': 'length', 'wires_on': 'bool?',
+        'wireLengthTol': 'length or str?', 'reuseFlippedQuads': 'bool?', 'wireMapFile': 'str?',
+        'wireCrossingFile': 'str?', 'wireCacheDir': 'str?', 'wireCacheEntries': 'int?',
+    },
+    'cryostat': {
+        'Argon_x': 'length', 'Argon_y': 'length', 'Argon_z': 'length', 'HeightGaseousAr': 'length',
+        'SteelThickness': 'length', 'Upper_xLArBuffer_base': 'length',
+        'Lower_xLArBuffer_base': 'length',
+    },
+    'steel': {
+        'SteelSupport_x': 'length', 'SteelSupport_y': 'length', 'SteelSupport_z': 'length',
+        'SteelPlate': 'length', 'FracMassOfSteel': 'number', 'FracMassOfAir': 'number',
+        'SpaceSteelSupportToWall': 'length', 'SpaceSteelSupportToCeiling': 'length',
+    },
+    'beam': {
+        'thetaYZ': 'angle', 'theta3XZ': 'angle', 'BeamPipeRad': 'length', 'BeamPipeLe': 'length',
+        'BeamWFoLe': 'length', 'BeamWGlLe': 'length', 'BeamPlugRad': 'length',
+        'BeamPlugNiRad': 'length', 'inch': 'number', 'BeamPlIIRad': 'length',
+        'BeamPlIINiRad': 'length',
+    },
+    'crt': {
+        'CRTPaddleWidth': 'length', 'CRTPaddleHeight': 'length', 'CRTPaddleLength': 'length',
+        'CRTModWidth': 'length', 'CRTModHeight': 'length', 'CRTModLength': 'length',
+        'TopCRTDPPaddleWidth': 'length', 'TopCRTDPPaddleHeight': 'length',
+        'TopCRTDPPaddleLength': 'length', 'BottomCRTDPPaddleWidth': 'length',
+        'BottomCRTDPPaddleHeight': 'length', 'BottomCRTDPPaddleLength': 'length',
+        'CRTDPPaddleSpacing': 'length', 'TopCRTDPModWidth': 'length',
+        'TopCRTDPModHeight': 'length', 'TopCRTDPModLength': 'length',
+        'BottomCRTDPModWidth': 'length', 'BottomCRTDPModHeight': 'length',
+        'BottomCRTDPModLength': 'length', 'CRT_DSTopLeft_x': 'length', 'CRT_DSTopLeft_y': 'length',
+        'CRT_DSTopLeftFr_z': 'length', 'CRT_DSTopLeftBa_z': 'length', 'CRT_DSBotLeft_x': 'length',
+        'CRT_DSBotLeft_y': 'length', 'CRT_DSBotLeftFr_z': 'length', 'CRT_DSBotLeftBa_z': 'length',
+        'CRT_DSTopRight_x': 'length', 'CRT_DSTopRight_y': 'length', 'CRT_DSTopRightFr_z': 'length',
+        'CRT_DSTopRightBa_z': 'length', 'CRT_DSBotRight_x': 'length', 'CRT_DSBotRight_y': 'length',
+        'CRT_DSBotRightFr_z': 'length', 'CRT_DSBotRightBa_z': 'length',
+        'CRT_USTopLeft_x': 'length', 'CRT_USTopLeft_y': 'length', 'CRT_USTopLeftFr_z': 'length',
+        'CRT_USTopLeftBa_z': 'length', 'CRT_USBotLeft_x': 'length', 'CRT_USBotLeft_y': 'length',
+        'CRT_USBotLeftFr_z': 'length', 'CRT_USBotLeftBa_z': 'length', 'CRT_USTopRight_x': 'length',
+        'CRT_USTopRight_y': 'length', 'CRT_USTopRightFr_z': 'length',
+        'CRT_USTopRightBa_z': 'length', 'CRT_USBotRight_x': 'length', 'CRT_USBotRight_y': 'length',
+        'CRT_USBotRightFr_z': 'length', 'CRT_USBotRightBa_z': 'length',
+        'CRTSurveyOrigin_x': 'length', 'CRTSurveyOrigin_y': 'length',
+        'CRTSurveyOrigin_z': 'length', 'ModuleSMDist': 'length', 'ModuleOff_z': 'length',
+        'ModuleLongCorr': 'length', 'BeamSpotDSS_x': 'length', 'BeamSpotDSS_y': 'length',
+        'BeamSpotDSS_z': 'length', 'CRTPaddleMode': 'str?', 'CRTPaddleTableFile': 'str?',
+    },
+    'cathode': {
+        'heightCathode': 'length', 'CathodeBorder': 'length', 'widthCathodeVoid': 'length',
+        'lengthCathodeVoid': 'length', 'CathodeMeshInnerStructureWidth': 'length',
+        'CathodeMeshInnerStructureThickness': 'length',
+        'CathodeMeshInnerStructureSeparation': 'length',
+        'CathodeMeshInnerStructureNumberOfStrips_vertical': 'int',
+        'CathodeMeshInnerStructureNumberOfStrips_horizontal': 'int',
+        'CathodeMeshOffset_Y': 'length', 'CathodeMeshMode': 'str?',
+    },
+    'xarapuca': {
+        'ArapucaOut_x': 'length', 'ArapucaOut_y': 'length', 'ArapucaOut_z': 'length',
+        'ArapucaIn_x': 'length', 'ArapucaIn_y': 'length', 'ArapucaIn_z': 'length',
+        'ArapucaAcceptanceWindow_x': 'length', 'ArapucaAcceptanceWindow_y': 'length',
+        'ArapucaAcceptanceWindow_z': 'length', 'GapPD': 'length', 'CathodeFrameToFC': 'length',
+        'FirstFrameVertDist': 'length', 'VerticalPDdist': 'length',
+        'Upper_FirstFrameVertDist': 'length', 'Lower_FirstFrameVertDist': 'length',
+        'MeshTubeLength_vertical': 'length', 'MeshTubeLength_horizontal': 'length',
+        'MeshOuterRadius': 'length', 'MeshTorRad': 'length',
+        'MeshInnerStructureLength_vertical': 'length',
+        'MeshInnerStructureLength_horizontal': 'length', 'MeshRodOuterRadius': 'length',
+        'MeshInnerStructureSeparation_base': 'length',
+        'MeshInnerStructureNumberOfBars_vertical': 'int',
+        'MeshInnerStructureNumberOfBars_horizontal': 'int',
+        'CathodeArapucaMeshRodRadius': 'length', 'CathodeArapucaMeshRodSeparation': 'length',
+        'CathodeArapucaMesh_verticalOffset': 'length',
+        'CathodeArapucaMesh_horizontalOffset': 'length',
+    },
+    'fieldcage': {
+        'FieldShaperInnerRadius': 'length', 'FieldShaperOuterRadius': 'length',
+        'FieldShaperSlimInnerRadius': 'length', 'FieldShaperSlimOuterRadius': 'length',
+        'FieldShaperTorRad': 'length', 'FieldShaperSeparation': 'length', 'NFieldShapers': 'int',
+        'FieldShaperBaseLength': 'length', 'FieldShaperBaseWidth': 'length',
+        'FirstFieldShaper_to_MembraneRoof': 'length', 'SlimFieldShaperRanges': 'range[]?',
+    },
+    'pmt': {
+        'pmt_TPB': 'int[]', 'pmt_left_rotated': 'int[]', 'pmt_right_rotated': 'int[]',
+        'pmt_y_positions': 'length[]', 'pmt_z_positions': 'length[]',
+        'horizontal_pmt_pos_bot': 'length', 'horizontal_pmt_pos_top': 'length',
+        'horizontal_pmt_z': 'length', 'horizontal_pmt_y': 'length', 'pmt_radius': 'length',
+        'pmt_height': 'length', 'pmt_coating_thickness': 'length', 'pmt_pos_x': 'length',
+    },
+}
+
+
+def _valid(kind, value):
+    kind = kind.rstrip('?')
+    if kind.endswith('[]'):
+        return isinstance(value, (list, tuple)) and all(_valid(kind[:-2], v) for v in value)
+    if kind.endswith('{}'):
+        return isinstance(value, dict) and all(_valid(kind[:-2], v) for v in value.values())
+    return any(KINDS[k](value) for k in kind.split(' or '))
+
+def validate(part, values):
+    '''
+    Raise a ValueError listing the unknown, missing and invalid parameters
+    of the part.
+    '''
+    if not isinstance(values, Mapping):
+        raise ValueError('%s_parameters must be a dict, not %s' % (part, type(values).__name__))
+    schema = SCHEMA[part]
+    errors = []
+    unknown = sorted(set(values) - set(schema))
+    if unknown:
+        errors.append('unknown %s' % ', '.join(unknown))
+    missing = [key for key, kind in schema.items() if not kind.endswith('?') and key not in values]
+    if missing:
+        errors.append('missing %s' % ', '.join(missing))
+    for key, value in values.items():
+        kind = schema.get(key)
+        if kind is None or (value is None and kind.endswith('?')):
+            continue
+        if not _valid(kind, value):
+            errors.append('%s should be %s, not %r' % (key, kind.rstrip('?'), value))
+    if errors:
+        raise ValueError('Invalid %s_parameters: %s' % (part, '; '.join(errors)))
+
+@functools.lru_cache(maxsize=None)
+def _parse(part, text):
+    try:
+        values = eval(text, {'Q': Q})
+    except Exception as err:
+        raise ValueError('Can not evaluate %s_parameters: %s' % (part, err))
+    validate(part, values)
+    return Bundle(values)
+
+def parse(part, parameters):
+    '''
+    Return the Bundle of the parameters of a part, given as the string of
+    a dict, which is evaluated only the first time it is seen, or as a
+    dict.
+    '''
+    if isinstance(parameters, str):
+        return _parse(part, parameters)
+    validate(part, parameters)
+    return Bundle(parameters)
+
+
+# derived parameters
+
+def derive_tpc(tpc):
+    widthCRP = tpc['widthPCBActive'] + 2 * tpc['borderCRP']
+    lengthCRP = (2 * tpc['lengthPCBActive'] +
+                 2 * tpc['borderCRP'] +
+                 tpc['gapCRU'])
+    return tpc.replace(
+        widthCRP=widthCRP,
+        lengthCRP=lengthCRP,
+        # Active TPC dimensions based on CRP
+        widthTPCActive=(tpc['nCRM_x']/2) * widthCRP,
+        lengthTPCActive=(tpc['nCRM_z']/2) * lengthCRP,
+        # Total readout plane thickness
+        ReadoutPlane=tpc['nViews'] * tpc['padWidth'])
+
+def derive_cryostat(cryo, tpc):
+    return cryo.replace(
+        xLArBuffer=(cryo['Argon_x'] -
+                    tpc['driftTPCActive'] -
+                    cryo['HeightGaseousAr'] -
+                    tpc['ReadoutPlane']),
+        Upper_xLArBuffer=(cryo['Upper_xLArBuffer_base'] -
+                          tpc['ReadoutPlane']),
+        Lower_xLArBuffer=(cryo['Lower_xLArBuffer_base'] -
+                          tpc['ReadoutPlane']),
+        yLArBuffer=(cryo['Argon_y'] -
+                    tpc['widthTPCActive']) * 0.5,
+        zLArBuffer=(cryo['Argon_z'] -
+                    tpc['lengthTPCActive']) * 0.5,
+        Cryostat_x=cryo['Argon_x'] + 2 * cryo['SteelThickness'],
+        Cryostat_y=cryo['Argon_y'] + 2 * cryo['SteelThickness'],
+        Cryostat_z=cryo['Argon_z'] + 2 * cryo['SteelThickness'])
+
+def derive_steel(steel, cryo, FoamPadding, DP_CRT_switch):
+    derived = dict(
+        posCryoInDetEnc={'x': Q('0cm'),
+                         'y': Q('0cm'),
+                         'z': Q('0cm')},
+        # steel structure positions
+        posTopSteelStruct=(cryo['Argon_y']/2 +
+                           FoamPadding +
+                           steel['SteelSupport_y']),
+        posBotSteelStruct=-(cryo['Argon_y']/2 +
+                            FoamPadding +
+                            steel['SteelSupport_y']),
+        posZBackSteelStruct=(cryo['Argon_z']/2 +
+                             FoamPadding +
+                             steel['SteelSupport_z']),
+        posZFrontSteelStruct=-(cryo['Argon_z']/2 +
+                               FoamPadding +
+                               steel['SteelSupport_z']),
+        posLeftSteelStruct=(cryo['Argon_x']/2 +
+                            FoamPadding +
+                            steel['SteelSupport_x']),
+        posRightSteelStruct=-(cryo['Argon_x']/2 +
+                              FoamPadding +
+                              steel['SteelSupport_x']))
+
+    # Adjust for CRT if needed
+    if DP_CRT_switch == True:
+        derived['posTopSteelStruct'] -= Q('29.7cm')
+        derived['posBotSteelStruct'] += Q('29.7cm')
+    return steel.replace(**derived)
+
+def derive_enclosure(tpc, cryo, steel, FoamPadding):
+    '''
+    Return the Bundle of the dimensions of the detector enclosure and of
+    the origin of the detector in it.
+    '''
+    DetEncX = (cryo['Cryostat_x'] +
+               2*(steel['SteelSupport_x'] + FoamPadding) +
+               2*steel['SpaceSteelSupportToWall'])
+
+    DetEncY = (cryo['Cryostat_y'] +
+               2*(steel['SteelSupport_y'] + FoamPadding) +
+               steel['SpaceSteelSupportToCeiling'])
+
+    DetEncZ = (cryo['Cryostat_z'] +
+               2*(steel['SteelSupport_z'] + FoamPadding) +
+               2*steel['SpaceSteelSupportToWall'])
+
+    OriginZSet = (DetEncZ/2.0 -
+                  steel['SpaceSteelSupportToWall'] -
+                  steel['SteelSupport_z'] -
+                  FoamPadding -
+                  cryo['SteelThickness'] -
+                  cryo['zLArBuffer'])
+
+    OriginYSet = (DetEncY/2.0 -
+                  steel['SpaceSteelSupportToCeiling']/2.0 -
+                  steel['SteelSupport_y'] -
+                  FoamPadding -
+                  cryo['SteelThickness'] -
+                  cryo['yLArBuffer'] -
+                  tpc['widthTPCActive']/2)
+
+    OriginXSet = (DetEncX/2.0 -
+                  steel['SpaceSteelSupportToWall'] -
+                  steel['SteelSupport_x'] -
+                  FoamPadding -
+                  cryo['SteelThickness'] -
+                  cryo['xLArBuffer'] +
+                  Q('6.0cm')/2 +  # heightCathode/2
+                  cryo['Upper_xLArBuffer'])
+
+    return Bundle(DetEncX=DetEncX, DetEncY=DetEncY, DetEncZ=DetEncZ,
+                  OriginXSet=OriginXSet, OriginYSet=OriginYSet, OriginZSet=OriginZSet)
+
+def derive_cathode(cathode, tpc, xarapuca):
+    derived = dict(mesh_length=cathode['lengthCathodeVoid'],
+                   mesh_width=cathode['widthCathodeVoid'])
+
+    # Void positions for 4x4 grid in a single cathode
+    void_positions = []
+    for i in range(4):  # rows
+        for j in range(4):  # columns
+            if i < 2:
+                x = (i - 1.5) * cathode['widthCathodeVoid'] + \
+                    (i - 2) * cathode['CathodeBorder']
+            else:
+                x = (i - 1.5) * cathode['widthCathodeVoid'] + \
+                    (i - 1) * cathode['CathodeBorder']
+
+            if j < 2:
+                z = (j - 1.5) * cathode['lengthCathodeVoid'] + \
+                    (j - 2) * cathode['CathodeBorder']
+            else:
+                z = (j - 1.5) * cathode['lengthCathodeVoid'] + \
+                    (j - 1) * cathode['CathodeBorder']
+
+            void_positions.append([x, z])
+    derived['void_positions'] = void_positions
+
+    if tpc:
+        # width and length of the CRPs, mesh of the size of the voids
+        derived['widthCathode'] = tpc['widthCRP']
+        derived['lengthCathode'] = tpc['lengthCRP']
+        derived['CathodeMeshInnerStructureLength_vertical'] = cathode['lengthCathodeVoid']
+        derived['CathodeMeshInnerStructureLength_horizontal'] = cathode['widthCathodeVoid']
+
+    if xarapuca:
+        derived['CathodeArapucaMeshRodRadius'] = xarapuca['CathodeArapucaMeshRodRadius']
+    return cathode.replace(**derived)
+
+def derive_xarapuca(xarapuca, cathode):
+    derived = dict(
+        FCToArapucaSpaceLat=Q('65cm') + xarapuca['ArapucaOut_y'],
+        MeshInnerStructureSeparation=(xarapuca['MeshInnerStructureSeparation_base'] +
+                                      xarapuca['MeshRodOuterRadius']),
+        # distance between mesh and window
+        Distance_Mesh_Window=Q('1.8cm') + xarapuca['MeshOuterRadius'])
+
+    # number of mesh bars for cathode X-ARAPUCA
+    if cathode:
+        derived['CathodeArapucaMeshNumberOfBars_vertical'] = int(
+            cathode['lengthCathodeVoid'] /
+            xarapuca['CathodeArapucaMeshRodSeparation'])
+        derived['CathodeArapucaMeshNumberOfBars_horizontal'] = int(
+            cathode['widthCathodeVoid'] /
+            xarapuca['CathodeArapucaMeshRodSeparation'])
+    return xarapuca.replace(**derived)
+
+def _beam_angles(beam):
+    # Convert angles to radians
+    theta3XZ_rad = float(beam['theta3XZ'].to('rad').magnitude)
+    thetaYZ_rad = float(beam['thetaYZ'].to('rad').magnitude)
+
+    # Calculate beam angles
+    BeamTheta3 = math.atan(math.sqrt(math.tan(theta3XZ_rad)**2 +
+                                   math.tan(thetaYZ_rad)**2))
+    BeamPhi3 = math.atan(math.tan(thetaYZ_rad)/math.tan(theta3XZ_rad))
+
+    # Store calculated angles
+    beam['BeamTheta3'] = BeamTheta3
+    beam['BeamPhi3'] = BeamPhi3
+    beam['BeamTheta3Deg'] = math.degrees(BeamTheta3)
+    beam['BeamPhi3Deg'] = math.degrees(BeamPhi3)
+
+    # Calculate deltas
+    beam['DeltaXZ3'] = math.tan(BeamTheta3)*math.cos(BeamPhi3)
+    beam['DeltaYZ3'] = math.tan(BeamTheta3)*math.sin(BeamPhi3)
+
+def derive_beam(beam, cryo, steel, FoamPadding, enclosure):
+    OriginXSet = enclosure['OriginXSet']
+    OriginYSet = enclosure['OriginYSet']
+    OriginZSet = enclosure['OriginZSet']
+    beam = dict(beam)
+
+    # Calculate derived beam angles
+    _beam_angles(beam)
+
+    # Calculate beam vacuum pipe radius
+    beam['BeamVaPipeRad'] = beam['BeamPipeRad'] - Q('0.2cm')
+    beam['BeamVaPipeLe'] = beam['BeamPipeLe']
+
+    # Calculate positions and lengths
+    cos_theta3 = math.cos(beam['BeamTheta3'])
+
+    # Calculate beam plug parameters
+    beam['BeamPlugUSAr'] = Q('1cm')/cos_theta3
+    beam['BeamPlugLe'] = Q('188cm')/cos_theta3 - beam['BeamPlugUSAr']
+    beam['BeamPlugNiLe'] = beam['BeamPlugLe'] - Q('0.59cm')/cos_theta3
+    beam['BeamPlugNiPos_z'] = Q('0.59cm')/(2*cos_theta3)
+
+    # Steel plate front face coordinates
+    beam['BeamWStPlateFF_x'] = Q('634.2cm') - cryo['Cryostat_x']/2
+    beam['BeamWStPlateFF_y'] = (cryo['Cryostat_y']/2 +
+                               steel['SteelSupport_y'] +
+                               FoamPadding)
+    beam['BeamWStPlateFF_z'] = -(cryo['Cryostat_z']/2 +
+                               FoamPadding +
+                               steel['SteelPlate'])
+
+    # Steel plate parameters
+    beam['BeamWStPlateLe'] = steel['SteelPlate']/cos_theta3 + Q('0.001cm')
+    beam['BeamWStPlate_x'] = (beam['BeamWStPlateFF_x'] -
+                           (steel['SteelPlate']/2)*beam['DeltaXZ3'])
+    beam['BeamWStPlate_y'] = (beam['BeamWStPlateFF_y'] -
+                           (steel['SteelPlate']/2)*beam['DeltaYZ3'])
+    beam['BeamWStPlate_z'] = (beam['BeamWStPlateFF_z'] +
+                           steel['SteelPlate']/2)
+
+    # Foam removal parameters
+    beam['BeamWFoRemLe'] = FoamPadding/cos_theta3 + Q('0.001cm')
+    beam['BeamWFoRemPosDZ'] = steel['SteelPlate'] + FoamPadding/2
+    beam['BeamWFoRem_x'] = (beam['BeamWStPlateFF_x'] -
+                           beam['BeamWFoRemPosDZ']*beam['DeltaXZ3'])
+    beam['BeamWFoRem_y'] = (beam['BeamWStPlateFF_y'] -
+                           beam['BeamWFoRemPosDZ']*beam['DeltaYZ3'])
+    beam['BeamWFoRem_z'] = (beam['BeamWStPlateFF_z'] +
+                           beam['BeamWFoRemPosDZ'])
+
+    # Steel support parameters
+    beam['BeamWStSuLe'] = ((steel['SteelSupport_z'] -
+                           steel['SteelPlate'])/cos_theta3 + Q('0.001cm'))
+    beam['BeamWStSuPosDZ'] = -(steel['SteelSupport_z'] -
+                           steel['SteelPlate'])/2
+    beam['BeamWStSu_x'] = (beam['BeamWStPlateFF_x'] -
+                       beam['BeamWStSuPosDZ']*beam['DeltaXZ3'])
+    beam['BeamWStSu_y'] = (beam['BeamWStPlateFF_y'] -
+                       beam['BeamWStSuPosDZ']*beam['DeltaYZ3'])
+    beam['BeamWStSu_z'] = (beam['BeamWStPlateFF_z'] +
+                       beam['BeamWStSuPosDZ'])
+
+    # Foam window parameters
+    beam['BeamWFoPosDZ'] = (steel['SteelPlate'] + FoamPadding -
+                           beam['BeamWFoLe']*cos_theta3/2)
+    beam['BeamWFo_x'] = (beam['BeamWStPlateFF_x'] -
+                       beam['BeamWFoPosDZ']*beam['DeltaXZ3'])
+    beam['BeamWFo_y'] = (beam['BeamWStPlateFF_y'] -
+                       beam['BeamWFoPosDZ']*beam['DeltaYZ3'] +
+                       steel['posCryoInDetEnc']['y'])
+    beam['BeamWFo_z'] = (beam['BeamWStPlateFF_z'] +
+                       beam['BeamWFoPosDZ'])
+
+    # Glass window parameters
+    beam['BeamWGlPosDZ'] = (steel['SteelPlate'] + FoamPadding -
+                           (beam['BeamWFoLe'] +
+                           beam['BeamWGlLe']/2)*cos_theta3)
+    beam['BeamWGl_x'] = (beam['BeamWStPlateFF_x'] -
+                       beam['BeamWGlPosDZ']*beam['DeltaXZ3'])
+    beam['BeamWGl_y'] = (beam['BeamWStPlateFF_y'] -
+                       beam['BeamWGlPosDZ']*beam['DeltaYZ3'] +
+                       steel['posCryoInDetEnc']['y'])
+    beam['BeamWGl_z'] = (beam['BeamWStPlateFF_z'] +
+                       beam['BeamWGlPosDZ'])
+
+    # Vacuum window parameters
+    beam['BeamWVaPosDZ'] = (steel['SteelPlate'] + FoamPadding -
+                           (beam['BeamWFoLe'] + beam['BeamWGlLe'] +
+                           beam['BeamPipeLe']/2)*cos_theta3)
+    beam['BeamWVa_x'] = (beam['BeamWStPlateFF_x'] -
+                       beam['BeamWVaPosDZ']*beam['DeltaXZ3'])
+    beam['BeamWVa_y'] = (beam['BeamWStPlateFF_y'] -
+                       beam['BeamWVaPosDZ']*beam['DeltaYZ3'] +
+                       steel['posCryoInDetEnc']['y'])
+    beam['BeamWVa_z'] = (beam['BeamWStPlateFF_z'] +
+                       beam['BeamWVaPosDZ'])
+
+    # Calculate beam plug parameters
+    beam['BeamPlugPosDZ'] = (steel['SteelPlate'] + FoamPadding +
+                           cryo['SteelThickness'] +
+                           beam['BeamPlugUSAr'] +
+                           beam['BeamPlugLe']*cos_theta3/2)
+    beam['BeamPlug_x'] = (beam['BeamWStPlateFF_x'] -
+                       beam['BeamPlugPosDZ']*beam['DeltaXZ3'])
+    beam['BeamPlug_y'] = (beam['BeamWStPlateFF_y'] -
+                       beam['BeamPlugPosDZ']*beam['DeltaYZ3'])
+    beam['BeamPlug_z'] = (beam['BeamWStPlateFF_z'] +
+                       beam['BeamPlugPosDZ'])
+
+    # Beam plug flange parameters
+    beam['BePlFlangePosDZ'] = (steel['SteelPlate'] + FoamPadding +
+                           cryo['SteelThickness'] +
+                           beam['BeamPlugUSAr'] +
+                           beam['BeamPlugLe']*cos_theta3)
+    beam['BePlFlange_x'] = (beam['BeamWStPlateFF_x'] -
+                           beam['BePlFlangePosDZ']*beam['DeltaXZ3'])
+    beam['BePlFlange_y'] = (beam['BeamWStPlateFF_y'] -
+                           beam['BePlFlangePosDZ']*beam['DeltaYZ3'])
+    beam['BePlFlange_z'] = (beam['BeamWStPlateFF_z'] +
+                           beam['BePlFlangePosDZ'] + Q('1.8cm'))
+
+    # Beam plug membrane parameters
+    beam['BeamPlugMembPosDZ'] = (steel['SteelPlate'] + FoamPadding +
+                               cryo['SteelThickness'])
+    beam['BeamPlugMemb_x'] = (beam['BeamWStPlateFF_x'] -
+                           beam['BeamPlugMembPosDZ']*beam['DeltaXZ3'])
+    beam['BeamPlugMemb_y'] = (beam['BeamWStPlateFF_y'] -
+                           beam['BeamPlugMembPosDZ']*beam['DeltaYZ3'])
+    beam['BeamPlugMemb_z'] = (beam['BeamWStPlateFF_z'] +
+                           beam['BeamPlugMembPosDZ'])
+
+    # Add beam window coordinates
+    beam['BWFFCoord3X'] = (beam['BeamWStPlateFF_x'] -
+                          beam['BeamWStSuPosDZ'] * beam['DeltaXZ3'] * 2 +
+                          OriginXSet)
+    beam['BWFFCoord3Y'] = (beam['BeamWStPlateFF_y'] -
+                          beam['BeamWStSuPosDZ'] * beam['DeltaYZ3'] * 2 +
+                          OriginYSet + 
+                          steel['posCryoInDetEnc']['y'])
+    beam['BWFFCoord3Z'] = (-(cryo['Cryostat_z']/2 +
+                            steel['SteelSupport_z'] +
+                            FoamPadding) +
+                          OriginZSet)
+
+    # Beam window steel plate coordinates
+    beam['BW3StPlCoordX'] = (beam['BeamWStPlateFF_x'] +
+                            OriginXSet)
+    beam['BW3StPlCoordY'] = (beam['BeamWStPlateFF_y'] +
+                            OriginYSet + 
+                            steel['posCryoInDetEnc']['y'])
+    beam['BW3StPlCoordZ'] = (beam['BeamWStPlateFF_z'] +
+                            OriginZSet)
+
+    # PD2 Beam Plug calculations
+    beam['thetaIIYZ'] = beam['thetaYZ']
+    beam['thetaII3XZ'] = beam['theta3XZ']
+
+    thetaIIYZ_rad = float(beam['thetaIIYZ'].to('rad').magnitude)
+    thetaII3XZ_rad = float(beam['thetaII3XZ'].to('rad').magnitude)
+
+    beam['BeamThetaII3'] = math.atan(math.sqrt(
+        math.tan(thetaII3XZ_rad)**2 + math.tan(thetaIIYZ_rad)**2))
+    beam['BeamPhiII3'] = math.atan(
+        math.tan(thetaIIYZ_rad)/math.tan(thetaII3XZ_rad))
+
+    # Calculate secondary angles
+    beam['thetaIIYZ3prime'] = math.degrees(math.atan(
+        math.sin(beam['BeamThetaII3']) *
+        math.sin(beam['BeamPhiII3'] + math.pi) /
+        math.sqrt(math.cos(beam['BeamThetaII3'])**2 +
+                 math.sin(beam['BeamThetaII3'])**2 *
+                 math.cos(beam['BeamPhiII3'])**2)))
+
+    # Calculate deltas
+    beam['DeltaIIXZ3'] = math.tan(beam['BeamThetaII3']) * math.cos(beam['BeamPhiII3'])
+    beam['DeltaIIYZ3'] = math.tan(beam['BeamThetaII3']) * math.sin(beam['BeamPhiII3'])
+
+    # Beam plug membrane coordinates
+    beam['BeamPlIIMem_x'] = beam['BeamPlugMemb_x']
+    beam['BeamPlIIMem_y'] = beam['BeamPlugMemb_y']
+    beam['BeamPlIIMem_z'] = beam['BeamPlugMemb_z']
+
+    # Beam plug parameters
+    inch = Q('2.54cm')
+    beam['BeamPlIIRad'] = 11 * inch / 2
+    beam['BeamPlIINiRad'] = 10 * inch / 2
+    beam['BeamPlIIUSAr'] = Q('1cm') / math.cos(beam['BeamThetaII3'])
+    beam['BeamPlIILe'] = (cryo['zLArBuffer'] - Q('5.3cm')) / math.cos(beam['BeamThetaII3'])
+    beam['BeamPlIINiLe'] = beam['BeamPlIILe']
+    beam['BeamPlIICapDZ'] = Q('0.5cm') * math.cos(beam['BeamThetaII3'])
+
+    # Calculate positions
+    beam['BeamPlIIPosDZ'] = (beam['BeamPlIICapDZ'] +
+                            beam['BeamPlIILe'] * math.cos(beam['BeamThetaII3']) / 2.0)
+    beam['BeamPlII_x'] = (beam['BeamPlIIMem_x'] -
+                         beam['BeamPlIIPosDZ'] * beam['DeltaIIXZ3'])
+    beam['BeamPlII_y'] = (beam['BeamPlIIMem_y'] -
+                         beam['BeamPlIIPosDZ'] * beam['DeltaIIYZ3'])
+    beam['BeamPlII_z'] = beam['BeamPlIIMem_z'] + beam['BeamPlIIPosDZ']
+
+    # Cap positions
+    beam['BeamPlIIUSCap_x'] = (beam['BeamPlIIMem_x'] -
+                              beam['BeamPlIICapDZ'] / 2.0 * beam['DeltaIIXZ3'])
+    beam['BeamPlIIUSCap_y'] = (beam['BeamPlIIMem_y'] -
+                              beam['BeamPlIICapDZ'] / 2.0 * beam['DeltaIIYZ3'])
+    beam['BeamPlIIUSCap_z'] = (beam['BeamPlIIMem_z'] +
+                              beam['BeamPlIICapDZ'] / 2.0)
+
+    beam['BeamPlIIDSPosDZ'] = (beam['BeamPlIICapDZ'] +
+                              beam['BeamPlIILe'] * math.cos(beam['BeamThetaII3']) +
+                              beam['BeamPlIICapDZ'] / 2)
+    beam['BeamPlIIDSCap_x'] = (beam['BeamPlIIMem_x'] -
+                              beam['BeamPlIIDSPosDZ'] * beam['DeltaIIXZ3'])
+    beam['BeamPlIIDSCap_y'] = (beam['BeamPlIIMem_y'] -
+                              beam['BeamPlIIDSPosDZ'] * beam['DeltaIIYZ3'])
+    beam['BeamPlIIDSCap_z'] = (beam['BeamPlIIMem_z'] +
+                              beam['BeamPlIIDSPosDZ'])
+
+    return Bundle(beam)
+
+
+PARTS = ('tpc', 'cryostat', 'steel', 'beam', 'crt', 'cathode', 'xarapuca', 'fieldcage', 'pmt')
+
+def load(parameters, FoamPadding=None, DP_CRT_switch=None):
+    '''
+    Return a Bundle of the Bundles of the parts, by part name, from their
+    parameters, given by part name (see parse()), None for the parts not
+    given. The Bundles hold the parameters derived from those of their
+    part and of the others, and the 'enclosure' one holds the dimensions
+    of the detector enclosure and the origin of the detector in it.
+    '''
+    unknown = sorted(set(parameters) - set(PARTS))
+    if unknown:
+        raise ValueError('Unknown parameter parts: %s' % ', '.join(unknown))
+    bundles = dict((part, None) for part in PARTS + ('enclosure',))
+    for part, values in parameters.items():
+        if values:
+            bundles[part] = parse(part, values)
+
+    def need(part, *others):
+        missing = [other for other in others if bundles[other] is None]
+        if missing:
+            raise ValueError('%s_parameters need %s' % (part, ', '.join(
+                '%s_parameters' % other for other in missing)))
+
+    tpc, cryo, steel = bundles['tpc'], bundles['cryostat'], bundles['steel']
+    if tpc:
+        bundles['tpc'] = tpc = derive_tpc(tpc)
+    if cryo:
+        need('cryostat', 'tpc')
+        bundles['cryostat'] = cryo = derive_cryostat(cryo, tpc)
+    if steel:
+        need('steel', 'tpc', 'cryostat')
+        if FoamPadding is None:
+            raise ValueError('steel_parameters need FoamPadding')
+        bundles['enclosure'] = derive_enclosure(tpc, cryo, steel, FoamPadding)
+        bundles['steel'] = steel = derive_steel(steel, cryo, FoamPadding, DP_CRT_switch)
+    if bundles['beam'] and steel and cryo and FoamPadding:
+        bundles['beam'] = derive_beam(bundles['beam'], cryo, steel, FoamPadding,
+                                      bundles['enclosure'])
+    cathode, xarapuca = bundles['cathode'], bundles['xarapuca']
+    if cathode:
+        bundles['cathode'] = derive_cathode(cathode, tpc, xarapuca)
+    if xarapuca:
+        bundles['xarapuca'] = derive_xarapuca(xarapuca, cathode)
+    return Bundle(bundles)
@@ -33,58 +33,14 @@ class CathodeBuilder(gegede.builder.Builder):
         # if hasattr(self, '_configured'):
         #     return
             
-        # Store cathode params
+        # Store cathode params, the derived mesh, void and TPC parameters
+        # come with the cathode bundle (see bundles.py)
         if cathode_parameters:
             self.params = cathode_parameters
 
-            # Calculate additional derived parameters
-            # Mesh parameters
-            self.params['mesh_length'] = self.params['lengthCathodeVoid'] 
-            self.params['mesh_width'] = self.params['widthCathodeVoid']
-
-            # Define void positions for 4x4 grid in a single cathode
-            self.params['void_positions'] = []
-            
-            # Calculate void positions
-            for i in range(4):  # rows
-                for j in range(4):  # columns
-                    # Calculate x position
-                    if i < 2:
-                        x = (i - 1.5) * self.params['widthCathodeVoid'] + \
-                            (i - 2) * self.params['CathodeBorder']
-                    else:
-                        x = (i - 1.5) * self.params['widthCathodeVoid'] + \
-                            (i - 1) * self.params['CathodeBorder']
-                    
-                    if j < 2:
-                        z = (j - 1.5) * self.params['lengthCathodeVoid'] + \
-                            (j - 2) * self.params['CathodeBorder']
-                    else:
-                        z = (j - 1.5) * self.params['lengthCathodeVoid'] + \
-                            (j - 1) * self.params['CathodeBorder']
-                    
-                    self.params['void_positions'].append([x, z])
-
-
-        
-        # Store TPC params we need
-        if tpc_params:
-            # Set width and length based on CRP dimensions
-            self.params['widthCathode'] = tpc_params['widthCRP']
-            self.params['lengthCathode'] = tpc_params['lengthCRP']
-            
-            # Set mesh dimensions based on void dimensions
-            self.params['CathodeMeshInnerStructureLength_vertical'] = \
-                self.params['lengthCathodeVoid']
-            self.params['CathodeMeshInnerStructureLength_horizontal'] = \
-                self.params['widthCathodeVoid']
-
-        if xarapuca_parameters:
-            self.params['CathodeArapucaMeshRodRadius']=xarapuca_parameters['CathodeArapucaMeshRodRadius']
-
         # Update with any overrides from kwargs
         if kwargs:
-            self.params.update(kwargs)
+            self.params = self.params.replace(**kwargs)
             
         # Store parameters
         self.arapucamesh_switch = arapucamesh_switch  # Add this line
@@ -143,6 +99,14 @@ class CathodeBuilder(gegede.builder.Builder):
         self.add_volume(cathode_vol_1)
         self.add_volume(cathode_vol_2)
 
+        mesh_mode = self.params.get('CathodeMeshMode', 'union')
+        if mesh_mode not in ('union', 'placed'):
+            raise ValueError("Unknown CathodeMeshMode '%s', expected 'union' or 'placed'" % mesh_mode)
+        if mesh_mode == 'placed':
+            self.mesh_vol = self.construct_mesh_envelope(geom)
+            self.add_volume(self.mesh_vol)
+            return
+
         # Create mesh rod shapes
         mesh_rod_vertical = geom.shapes.Box(
             self.name+"_mesh_rod_vertical",
@@ -201,6 +165,90 @@ class CathodeBuilder(gegede.builder.Builder):
         self.mesh_vol = mesh_vol
         self.add_volume(mesh_vol)
 
+    def construct_mesh_envelope(self, geom):
+        """Construct the mesh of a void as rods placed in a LAr envelope.
+
+        The envelope fills the void (it is centered on it) and holds the full
+        length vertical rods; the horizontal rods are cut into the segments
+        between the vertical ones so that no two daughters overlap. Rod and
+        segment volumes are shared, one per distinct length.
+        """
+        thickness = self.params['CathodeMeshInnerStructureThickness']
+        rod_width = self.params['CathodeMeshInnerStructureWidth']
+        separation = self.params['CathodeMeshInnerStructureSeparation']
+        half_width = self.params['mesh_width']/2
+        half_length = self.params['mesh_length']/2
+
+        envelope = geom.structure.Volume(
+            self.name+"_mesh_vol",
+            material="LAr",
+            shape=geom.shapes.Box(
+                self.name+"_mesh_envelope",
+                dx=thickness,
+                dy=half_width,
+                dz=half_length))
+
+        vert_rod_vol = geom.structure.Volume(
+            self.name+"_mesh_rod_vertical_vol",
+            material="G10",
+            shape=geom.shapes.Box(
+                self.name+"_mesh_rod_vertical",
+                dx=thickness,
+                dy=rod_width,
+                dz=half_length))
+
+        # Vertical rods, the first one sits one separation above the lower edge
+        vert_y = []
+        for i in range(self.params['CathodeMeshInnerStructureNumberOfStrips_vertical']):
+            pos_y = -half_width + (i+1)*separation
+            vert_y.append(pos_y)
+            place = geom.structure.Placement(
+                self.name + f"_vrod_place{i}",
+                volume=vert_rod_vol,
+                pos=geom.structure.Position(
+                    self.name + f"_vrod_pos{i}",
+                    x=Q('0cm'),
+                    y=pos_y,
+                    z=Q('0cm')))
+            envelope.placements.append(place.name)
+
+        # Horizontal rod segments between the edges of the vertical rods
+        edges = [-half_width]
+        for pos_y in vert_y:
+            edges += [pos_y - rod_width, pos_y + rod_width]
+        edges.append(half_width)
+        segments = []
+        for lo, hi in zip(edges[0::2], edges[1::2]):
+            if hi > lo:
+                segments.append((lo, hi))
+
+        seg_vols = {}
+        for i in range(self.params['CathodeMeshInnerStructureNumberOfStrips_horizontal']):
+            pos_z = -half_length + (i+1)*separation
+            for k, (lo, hi) in enumerate(segments):
+                length = hi - lo
+                key = round(length.to('cm').magnitude, 9)
+                if key not in seg_vols:
+                    seg_vols[key] = geom.structure.Volume(
+                        self.name + f"_mesh_hseg_vol{len(seg_vols)}",
+                        material="G10",
+                        shape=geom.shapes.Box(
+                            self.name + f"_mesh_hseg{len(seg_vols)}",
+                            dx=thickness,
+                            dy=length/2,
+                            dz=rod_width))
+                place = geom.structure.Placement(
+                    self.name + f"_hrod_place{i}_{k}",
+                    volume=seg_vols[key],
+                    pos=geom.structure.Position(
+                        self.name + f"_hrod_pos{i}_{k}",
+                        x=Q('0cm'),
+                        y=(lo + hi)/2,
+                        z=pos_z))
+                envelope.placements.append(place.name)
+
+        return envelope
+
     def place_in_volume(self, geom, volume, argon_dim, params, xarapuca_builder=None):
         '''Place cathode modules and associated X-ARAPUCAs in the given volume
         
@@ -320,11 +368,16 @@ class CathodeBuilder(gegede.builder.Builder):
                             break
 
                     if (flag_construct):
+                        if self.params.get('CathodeMeshMode', 'union') == 'placed':
+                            # the mesh envelope is centered on the void
+                            mesh_y = base_y + i*self.params['widthCathode'] + void_y
+                        else:
+                            mesh_y = base_y + i*self.params['widthCathode'] + void_y - \
+                            self.params['mesh_width']/2 + self.params['CathodeMeshInnerStructureSeparation']
                         mesh_pos = geom.structure.Position(
                             f"{self.name}_mesh_pos_{i}_{j}_{void_idx}",
                             x=cathode_x,
-                            y=base_y + i*self.params['widthCathode'] + void_y - \
-                            self.params['mesh_width']/2 + self.params['CathodeMeshInnerStructureSeparation'],
+                            y=mesh_y,
                             z=base_z + j*self.params['lengthCathode'] + void_z
                         )
                         
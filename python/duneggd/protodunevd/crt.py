@@ -6,6 +6,21 @@ CRT (Cosmic Ray Tagger) builder for ProtoDUNE-VD geometry
 import gegede.builder
 from gegede import Quantity as Q
 
+# number of paddles in a HD CRT module
+NPADDLES = 64
+
+def write_paddle_table(filename, rows):
+    """Write the copy number to legacy name table of the CRT paddles.
+
+    One line per paddle: module volume, copy number, placement and the
+    name of the paddle volume in the volumes mode.
+    """
+    with open(filename, 'w') as f:
+        f.write("# module copynumber placement volume\n")
+        for row in rows:
+            f.write("%s %d %s %s\n" % row)
+
+
 class CRTBuilder(gegede.builder.Builder):
     '''
     Build the Cosmic Ray Tagger (CRT) for ProtoDUNE-VD.
@@ -187,17 +202,27 @@ class CRTBuilder(gegede.builder.Builder):
             """Helper to create a module volume"""
             return geom.structure.Volume(name, material=material, shape=shape)
 
-        def place_paddle(module_vol, paddle_vol, pos_x, pos_y, pos_z, paddle_id, rotation="rIdentity"):
+        def place_paddle(module_vol, paddle_vol, pos_x, pos_y, pos_z, paddle_id, rotation="rIdentity",
+                         copynumber=None):
             """Helper to place a paddle in a module"""
             pos = geom.structure.Position(
                 f"posCRTPaddleSensitive_{paddle_id}",
                 x=pos_x, y=pos_y, z=pos_z)
+            numbered = {} if copynumber is None else dict(copynumber=copynumber)
             place = geom.structure.Placement(
                 f"placePaddle_{paddle_id}",
                 volume=paddle_vol,
                 pos=pos,
-                rot=rotation)
+                rot=rotation,
+                **numbered)
             module_vol.placements.append(place.name)
+            return place
+
+        # CRTPaddleMode: 'volumes' makes one paddle volume per channel,
+        # 'copynumber' one for all of them, told apart by their copy number
+        paddle_mode = self.crt.get('CRTPaddleMode', 'volumes')
+        if paddle_mode not in ('volumes', 'copynumber'):
+            raise ValueError("Unknown CRTPaddleMode '%s', expected 'volumes' or 'copynumber'" % paddle_mode)
 
         if self.HD_CRT_switch:
             # Create HD CRT basic shapes
@@ -213,26 +238,38 @@ class CRTBuilder(gegede.builder.Builder):
                 dy=self.crt['CRTModHeight']/2,
                 dz=self.crt['CRTModLength']/2)
 
+            if paddle_mode == 'copynumber':
+                shared_paddle_vol = create_paddle_volume("volAuxDetSensitive_CRTPaddle", crt_paddle)
+                self.add_volume(shared_paddle_vol)
+            paddle_table = []
+
             def build_module(side, modnum):
                 """Build a complete CRT module for either U or D side"""
                 # Create paddle volumes
-                paddle_vols = {
-                    f"{side}{modnum}_{i+1}": create_paddle_volume(
-                        f"volAuxDetSensitive_CRTPaddle_{side}{modnum}_{i+1}",
-                        crt_paddle)
-                    for i in range(64)
-                }
-                
-                # Add paddle volumes to builder
-                for vol in paddle_vols.values():
-                    self.add_volume(vol)
+                if paddle_mode == 'copynumber':
+                    paddle_vols = {
+                        f"{side}{modnum}_{i+1}": shared_paddle_vol
+                        for i in range(NPADDLES)
+                    }
+                else:
+                    paddle_vols = {
+                        f"{side}{modnum}_{i+1}": create_paddle_volume(
+                            f"volAuxDetSensitive_CRTPaddle_{side}{modnum}_{i+1}",
+                            crt_paddle)
+                        for i in range(NPADDLES)
+                    }
+
+                    # Add paddle volumes to builder
+                    for vol in paddle_vols.values():
+                        self.add_volume(vol)
                 
                 # Create and populate module
                 mod_vol = create_module_volume(
                     f"volAuxDet_CRTModule_{side}{modnum}",
                     crt_module)
                 
-                # Place paddles in pairs
+                # Place paddles in pairs, the copy number is the legacy paddle index
+                numbered = paddle_mode == 'copynumber'
                 for i in range(32):
                     paddle_x1 = -self.crt['CRTModWidth']/2 + self.crt['CRTPaddleWidth']*(i + 0.5)
                     paddle_x2 = -self.crt['CRTModWidth']/2 + self.crt['CRTPaddleWidth']*(i + 1)
@@ -240,10 +277,14 @@ class CRTBuilder(gegede.builder.Builder):
                     # Place paddle pair
                     place_paddle(mod_vol, paddle_vols[f"{side}{modnum}_{i+1}"], 
                                paddle_x1, self.crt['CRTPaddleHeight']/2, Q('0cm'),
-                               f"{side}{modnum}_{i+1}")
+                               f"{side}{modnum}_{i+1}", copynumber=i+1 if numbered else None)
                     place_paddle(mod_vol, paddle_vols[f"{side}{modnum}_{i+33}"],
                                paddle_x2, -self.crt['CRTPaddleHeight']/2, Q('0cm'),
-                               f"{side}{modnum}_{i+33}")
+                               f"{side}{modnum}_{i+33}", copynumber=i+33 if numbered else None)
+
+                for n in range(1, NPADDLES+1):
+                    paddle_table.append((mod_vol.name, n, f"placePaddle_{side}{modnum}_{n}",
+                                         f"volAuxDetSensitive_CRTPaddle_{side}{modnum}_{n}"))
                 
                 return mod_vol
 
@@ -253,6 +294,9 @@ class CRTBuilder(gegede.builder.Builder):
                     mod_vol = build_module(side, modnum)
                     self.add_volume(mod_vol)
 
+            if paddle_mode == 'copynumber' and self.crt.get('CRTPaddleTableFile'):
+                write_paddle_table(self.crt['CRTPaddleTableFile'], paddle_table)
+
         if self.DP_CRT_switch:
             # Create DP CRT shapes
             def create_dp_shapes():
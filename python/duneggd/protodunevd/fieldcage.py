@@ -5,6 +5,8 @@ Field Cage builder for ProtoDUNE-VD geometry
 
 import gegede.builder
 from gegede import Quantity as Q
+import numpy as np
+from duneggd.gridplace import in_ranges, Member, place_grid
 
 class FieldCageBuilder(gegede.builder.Builder):
     '''
@@ -35,6 +37,8 @@ class FieldCageBuilder(gegede.builder.Builder):
             self.base_length = fieldcage_parameters.get('FieldShaperBaseLength')
             self.base_width = fieldcage_parameters.get('FieldShaperBaseWidth')
             self.first_shaper_to_roof = fieldcage_parameters.get('FirstFieldShaper_to_MembraneRoof')
+            # [start, stop) index ranges of the slim shapers, at the top and bottom
+            self.slim_ranges = fieldcage_parameters.get('SlimFieldShaperRanges', [(0, 36), (78, None)])
 
             # Calculate derived dimensions
             self.length = self.base_length - 2*self.tor_rad
@@ -492,39 +496,22 @@ class FieldCageBuilder(gegede.builder.Builder):
         fc_vol = self.get_volume('volFieldShaper')
         fc_slim_vol = self.get_volume('volFieldShaperSlim')
 
-        # Place field cage shapers
-        for i in range(self.n_shapers):
-            # Calculate position
-            dist = i * self.separation
-            pos_x = offset_x - self.first_shaper_to_roof - dist
-            
-            if i < 36 or i > 77:  # Slim shapers at start and end
-                #Create placement for slim shaper
-                pos = geom.structure.Position(
-                    f"posFieldShaper{i}",
-                    x=pos_x,
-                    y=Q('0cm'),
-                    z=0.5*self.length + self.tor_rad
-                )
-                place = geom.structure.Placement(
-                    f"placeFieldShaper{i}",
-                    volume=fc_slim_vol,
-                    pos=pos,
-                    rot="rPlus90AboutXPlus90AboutZ"
-                )
-            else:  # Thick shapers in middle
-                # Create placement for thick shaper
-                pos = geom.structure.Position(
-                    f"posFieldShaper{i}",
-                    x=pos_x,
-                    y=0.5*self.width + self.tor_rad,
-                    z=Q('0cm')
-                )
-                place = geom.structure.Placement(
-                    f"placeFieldShaper{i}", 
-                    volume=fc_vol,
-                    pos=pos,
-                    rot="rIdentity"
-                )
-            
-            volume.placements.append(place.name)
+        # Place field cage shapers, all at once: slim ones in the slim
+        # ranges, at the start and end, thick ones in the middle
+        i = np.arange(self.n_shapers)
+        pos_x = offset_x - self.first_shaper_to_roof - i*self.separation
+        slim = in_ranges(self.n_shapers, self.slim_ranges)
+        place_grid(geom, volume, i[:, np.newaxis],
+                   [Member(fc_slim_vol, "placeFieldShaper{n}", "posFieldShaper{n}",
+                           x=pos_x.magnitude,
+                           y=Q('0cm'),
+                           z=0.5*self.length + self.tor_rad,
+                           rot="rPlus90AboutXPlus90AboutZ",
+                           cells=slim),
+                    Member(fc_vol, "placeFieldShaper{n}", "posFieldShaper{n}",
+                           x=pos_x.magnitude,
+                           y=0.5*self.width + self.tor_rad,
+                           z=Q('0cm'),
+                           rot="rIdentity",
+                           cells=~slim)],
+                   unit=str(pos_x.units))
@@ -5,6 +5,7 @@ Steel Builder for ProtoDUNE-VD geometry
 
 import gegede.builder
 from gegede import Quantity as Q
+from duneggd.gridplace import offsets, mesh, Member, place_grid
 
 class SteelSupportBuilder(gegede.builder.Builder):
     '''Build the steel support structure for ProtoDUNE-VD'''
@@ -21,7 +22,7 @@ class SteelSupportBuilder(gegede.builder.Builder):
         self.print_construct = print_construct
 
         if steel_parameters:
-            self.params = steel_parameters.copy()
+            self.params = steel_parameters
         
     def construct_TB(self, geom):
         """Construct the top/bottom steel support structure"""
@@ -37,25 +38,7 @@ class SteelSupportBuilder(gegede.builder.Builder):
                                     shape=tb_shape)
 
         # Place the center unit volumes (5x5 grid)
-        for i in range(5):  # x positions: -320, -160, 0, 160, 320
-            for j in range(5):  # y positions: -320, -160, 0, 160, 320
-                x = Q(f"{-320 + i*160}cm")
-                y = Q(f"{-320 + j*160}cm") 
-                z = Q("0cm")
-                
-                # Get central unit volume from earlier construction
-                cent_vol = self.get_volume("volUnitCent")
-                
-                pos = geom.structure.Position(
-                    f"posUnitTBCent_{i}-{j}",
-                    x=x, y=y, z=z)
-                    
-                place = geom.structure.Placement(
-                    f"volUnitTBCent_{i}-{j}",
-                    volume=cent_vol,
-                    pos=pos)
-                    
-                tb_vol.placements.append(place.name)
+        self.place_center_units(geom, tb_vol, "TB")
 
         # Place the edge unit volumes (E, S, W, N) for each row
         for i in range(5):  # x positions: -320 to 320 in steps of 160
@@ -136,6 +119,15 @@ class SteelSupportBuilder(gegede.builder.Builder):
         self.add_volume(tb_vol)
         return tb_vol
 
+    def place_center_units(self, geom, vol, side, rot=None):
+        """Place the 5x5 grid of central units, 160 cm apart, in a side volume"""
+        units = offsets(5, 160, -320)  # -320, -160, 0, 160, 320 cm
+        labels, (x, y) = mesh(units, units)
+        place_grid(geom, vol, labels,
+                   [Member(self.get_volume("volUnitCent"),
+                           f"volUnit{side}Cent_{{i}}-{{j}}", f"posUnit{side}Cent_{{i}}-{{j}}",
+                           x=x, y=y, z=0, rot=rot)])
+
     def construct_unit_volumes(self, geom):
         """Construct the central and top unit volumes that make up the steel support structure"""
         
@@ -357,27 +349,7 @@ class SteelSupportBuilder(gegede.builder.Builder):
 
         # Place the center unit volumes (5x5 grid)
         # Note: All central units have rPlus180AboutY rotation
-        for i in range(5):  # x positions: -320 to 320 in steps of 160
-            for j in range(5):  # y positions: -320 to 320 in steps of 160
-                x = Q(f"{-320 + i*160}cm")
-                y = Q(f"{-320 + j*160}cm") 
-                z = Q("0cm")
-                
-                # Get central unit volume
-                cent_vol = self.get_volume("volUnitCent")
-                
-                pos = geom.structure.Position(
-                    f"posUnitUSCent_{i}-{j}",
-                    x=x, y=y, z=z)
-                    
-                # Note the rPlus180AboutY rotation for all central units
-                place = geom.structure.Placement(
-                    f"volUnitUSCent_{i}-{j}",
-                    volume=cent_vol,
-                    pos=pos,
-                    rot="rPlus180AboutY")
-                    
-                us_vol.placements.append(place.name)
+        self.place_center_units(geom, us_vol, "US", rot="rPlus180AboutY")
 
         # Place the edge unit volumes (E, S, W, N) for each row
         for i in range(5):  # x positions: -320 to 320 in steps of 160
@@ -473,24 +445,7 @@ class SteelSupportBuilder(gegede.builder.Builder):
                                     shape=lr_shape)
 
         # Place the center unit volumes (5x5 grid)
-        for i in range(5):  # x positions: -320 to 320 in steps of 160
-            for j in range(5):  # y positions: -320 to 320 in steps of 160
-                x = Q(f"{-320 + i*160}cm")
-                y = Q(f"{-320 + j*160}cm")
-                z = Q("0cm")
-
-                # Place central unit 
-                cent_vol = self.get_volume("volUnitCent")
-                pos = geom.structure.Position(
-                    f"posUnitLRCent_{i}-{j}",
-                    x=x, y=y, z=z)
-
-                place = geom.structure.Placement(
-                    f"volUnitLRCent_{i}-{j}",
-                    volume=cent_vol,
-                    pos=pos)
-
-                lr_vol.placements.append(place.name)
+        self.place_center_units(geom, lr_vol, "LR")
 
         # Get wall volumes
         wall_L_vol = self.get_volume("volUnitWallL")
@@ -6,7 +6,12 @@ TPC (Time Projection Chamber) builder for ProtoDUNE-VD geometry
 import gegede.builder
 from gegede import Quantity as Q
 import math
+import numpy as np
 from collections import namedtuple
+from functools import partial
+
+from duneggd.fastunits import Length
+from duneggd.wiremap import pool_wire_lengths, write_wire_map
 
 
 def line_clip(x0, y0, nx, ny, rcl, rcw):
@@ -191,6 +196,77 @@ def generate_wires(length, width, nch, pitch, theta_deg, dia, w1offx, w1offy):
     return winfo
 
 
+def generate_z_wires(quad, nch, pitch, length, width):
+    """Generate the Z (collection) wires of a quadrant.
+
+    Args:
+        quad: Quadrant index, the wires are numbered from quad * nch
+        nch: Number of Z wires of the quadrant
+        pitch: Wire pitch
+        length: Length of the plane, along which the wires are spread
+        width: Width of the plane, the length of the wires
+
+    Returns:
+        List of [channel, z, y, length, z1, y1, z2, y2] like generate_wires,
+        the first quadrants of the CRP taking the slack at low z.
+    """
+    zdelta = length - pitch * nch
+    if zdelta < 0:
+        print("Warning: Z delta should be positive or 0")
+        zdelta = 0
+    zoffset = zdelta if quad <= 1 else 0
+
+    zero = Q("0cm")
+    pitchZ = Length(pitch)
+    halfLength = 0.5 * Length(length)
+    zoffset = Length(zoffset)
+    winfo = []
+    for i in range(nch):
+        zpos = zoffset + (i + 0.5) * pitchZ - halfLength
+        if abs(halfLength - abs(zpos)) < 0:
+            raise ValueError(f"Cannot place wire {i} in view Z, plane too small")
+        zpos = zpos.q
+        winfo.append([i + quad * nch, zpos, zero, width, zpos, -width/2, zpos, width/2])
+    return winfo
+
+
+def cached_generate_wires(cache_dir, max_entries, *args):
+    """
+    generate_wires memoized on disk in cache_dir: the rows are stored in cm
+    under a hash of the arguments and of the generating code.
+    """
+    from duneggd.layoutcache import LayoutCache, source_version
+    cache = LayoutCache(cache_dir, max_entries)
+    key = cache.key(*args, version=source_version(line_clip, generate_wires))
+    table = cache.load(key)
+    if table is not None:
+        return [[int(row[0])] + [Q(v, 'cm') for v in row[1:]] for row in table.tolist()]
+    winfo = generate_wires(*args)
+    cache.store(key, np.array([[wire[0]] + [v.to('cm').magnitude for v in wire[1:]]
+                               for wire in winfo], dtype=float).reshape(-1, 8))
+    return winfo
+
+
+def is_point_reflection(src, dst, tol=Q('1e-6cm')):
+    """Check that the wires dst are the wires src rotated by 180 degrees
+    about the drift axis, i.e. with negated centers and the same lengths.
+
+    Args:
+        src: List of wire info of the reference quadrant
+        dst: List of wire info of the candidate quadrant
+        tol: Largest allowed coordinate difference
+
+    Returns:
+        bool: True if dst can be built by rotating src
+    """
+    if len(src) != len(dst):
+        return False
+    for ws, wd in zip(src, dst):
+        if (ws[0] != wd[0] or abs(ws[1] + wd[1]) > tol or
+                abs(ws[2] + wd[2]) > tol or abs(ws[3] - wd[3]) > tol):
+            return False
+    return True
+
 
 class TPCBuilder(gegede.builder.Builder):
     '''
@@ -244,8 +320,13 @@ class TPCBuilder(gegede.builder.Builder):
 
         # Generate wire configurations for first CRU
         if self.params.get('wires_on', 1):  # Check if wires are enabled
+            if self.params.get('wireCacheDir'):
+                gen_wires = partial(cached_generate_wires, self.params['wireCacheDir'],
+                                    self.params.get('wireCacheEntries', 64))
+            else:
+                gen_wires = generate_wires
             # U wires
-            winfo_u1 = generate_wires(
+            winfo_u1 = gen_wires(
             self.params['lengthPCBActive'] - Q('0.04cm'),
             self.params['widthPCBActive'] - Q('0.04cm'),
             self.params['nChans']['Ind1'],
@@ -256,7 +337,7 @@ class TPCBuilder(gegede.builder.Builder):
             self.params['offsetUVwire'][1])
 
             # V wires  
-            winfo_v1 = generate_wires(
+            winfo_v1 = gen_wires(
             self.params['lengthPCBActive'] - Q('0.04cm'),
             self.params['widthPCBActive'] - Q('0.04cm'),
             self.params['nChans']['Ind2'],
@@ -288,7 +369,13 @@ class TPCBuilder(gegede.builder.Builder):
             # Store wire configurations for CRM construction
             self.wire_configs = {
                 'U': [winfo_u1a, winfo_u1b, winfo_u2a, winfo_u2b],
-                'V': [winfo_v1a, winfo_v1b, winfo_v2a, winfo_v2b]
+                'V': [winfo_v1a, winfo_v1b, winfo_v2a, winfo_v2b],
+                'Z': [generate_z_wires(quad,
+                                       self.params['nChans']['Col']//2,
+                                       self.params['wirePitch']['Z'],
+                                       self.params['lengthPCBActive'],
+                                       self.params['widthPCBActive'] / 2)
+                      for quad in range(4)]
             }
 
         # Construct CRM volumes with wire configurations
@@ -340,38 +427,92 @@ class TPCBuilder(gegede.builder.Builder):
         vols['active'].params.append(("StepLimit","0.5*cm"))
         vols['active'].params.append(("Efield","500*V/cm"))
 
+        # Shared wire volumes for the U and V wires of (nearly) equal length
+        wire_pool = {}
+        wire_map = []
+        tol = self.params.get('wireLengthTol')
+        if hasattr(self, 'wire_configs') and tol is not None:
+            for view in ['U', 'V']:
+                wires = [w for quad_wires in self.wire_configs[view] for w in quad_wires]
+                labels, pooled = pool_wire_lengths(
+                    [w[3].to('cm').magnitude for w in wires], Q(tol).to('cm').magnitude)
+                pooled = pooled.tolist()
+                vols_pool = []
+                for k, plen in enumerate(pooled):
+                    wire_shape = geom.shapes.Tubs(
+                        f"CRMWire{view}_L{k}",
+                        rmax=self.params['padWidth']/2,
+                        dz=Q(plen, 'cm')/2.,
+                        sphi="0deg",
+                        dphi="360deg")
+                    vols_pool.append(geom.structure.Volume(
+                        f"volTPCWire{view}_L{k}",
+                        material="Copper_Beryllium_alloy25",
+                        shape=wire_shape))
+                # (volume, placed length) of each wire, per quadrant
+                splits = np.cumsum([len(q) for q in self.wire_configs[view]])[:-1]
+                wire_pool[view] = [[(vols_pool[k], Q(pooled[k], 'cm')) for k in quad_labels.tolist()]
+                                   for quad_labels in np.split(labels, splits)]
+
+        # Quadrants 2 and 3 hold the wires of quadrants 1 and 0 rotated by
+        # 180 degrees about the drift axis: optionally place the same planes
+        reuse = {}
+        if self.params.get('reuseFlippedQuads', False):
+            if not hasattr(self, 'wire_configs') or all(
+                    is_point_reflection(self.wire_configs[view][3 - quad], self.wire_configs[view][quad])
+                    for view in ['U', 'V'] for quad in [2, 3]):
+                reuse = {2: 1, 3: 0}
+            else:
+                print("Warning: quadrants 2/3 are not rotations of quadrants 1/0, building all planes")
+        plane_vols = {}
+
         for quad in range(4):
             """Construct one CRM (Cold Readout Module) quadrant."""
 
             shapes['tpc'] = make_box('CRM', *dims['tpc'], quad=f"_{quad}")
-            vols.update({
-                'tpc': make_volume('volTPC', shapes['tpc'], quad=f"_{quad}"),
-                **{f'plane_{p}': make_volume(f'volTPCPlane{p}', shapes[p], quad=f"_{quad}")
-                   for p in ['U', 'V', 'Z']}
-            })
+            vols['tpc'] = make_volume('volTPC', shapes['tpc'], quad=f"_{quad}")
+            if quad in reuse:
+                vols.update(plane_vols[reuse[quad]])
+            else:
+                plane_vols[quad] = {f'plane_{p}': make_volume(f'volTPCPlane{p}', shapes[p], quad=f"_{quad}")
+                                    for p in ['U', 'V', 'Z']}
+                vols.update(plane_vols[quad])
             #  vols['tpc'] = make_volume('volTPC', shapes['tpc'], quad=f"_{quad}")
             #  vols['tpc'].params.append(("SensDet","SimEnergyDeposit"))
             #  vols['tpc'].params.append(("StepLimit","0.5*cm"))
             #  vols['tpc'].params.append(("Efield","500*V/cm"))
 
             # If wires are enabled
-            if hasattr(self, 'wire_configs'):
+            if hasattr(self, 'wire_configs') and quad in reuse:
+                # Same wires as the source quadrant, Z wires in reverse order
+                src = reuse[quad]
+                nch = self.params['nChans']['Col']//2
+                for row in [r for r in wire_map if r[1] == src]:
+                    wid = row[2]
+                    if row[0] == 'Z':
+                        wid = (nch - 1 - (wid - src * nch)) + quad * nch
+                    wire_map.append((row[0], quad, wid) + row[3:])
+            elif hasattr(self, 'wire_configs'):
                 # Create wire shapes and volumes for U plane
                 if 'U' in self.wire_configs:
-                    for wire in self.wire_configs['U'][quad]:
+                    for iw, wire in enumerate(self.wire_configs['U'][quad]):
                         # print(quad, wire[0],wire[3], wire[2])
                         wid = wire[0]
                         wlen = wire[3]
-                        wire_shape = geom.shapes.Tubs(
-                            f"CRMWireU{wid}_{quad}",
-                            rmax=self.params['padWidth']/2,
-                            dz=wlen/2.,
-                            sphi="0deg",
-                            dphi="360deg")
-                        wire_vol = geom.structure.Volume(
-                            f"volTPCWireU{wid}_{quad}",
-                            material="Copper_Beryllium_alloy25",
-                            shape=wire_shape)
+                        if 'U' in wire_pool:
+                            wire_vol, plen = wire_pool['U'][quad][iw]
+                        else:
+                            wire_shape = geom.shapes.Tubs(
+                                f"CRMWireU{wid}_{quad}",
+                                rmax=self.params['padWidth']/2,
+                                dz=wlen/2.,
+                                sphi="0deg",
+                                dphi="360deg")
+                            wire_vol = geom.structure.Volume(
+                                f"volTPCWireU{wid}_{quad}",
+                                material="Copper_Beryllium_alloy25",
+                                shape=wire_shape)
+                            plen = wlen
                         # Place wire in U plane
                         pos = geom.structure.Position(
                             f"posWireU{wid}_{quad}",
@@ -385,22 +526,28 @@ class TPCBuilder(gegede.builder.Builder):
                             pos=pos,
                             rot=rot)
                         vols['plane_U'].placements.append(place.name)
+                        wire_map.append(('U', quad, wid, place.name, wire_vol.name,
+                                         wlen.to('cm').magnitude, plen.to('cm').magnitude))
 
                 # Create wire shapes and volumes for V plane
                 if 'V' in self.wire_configs:
-                    for wire in self.wire_configs['V'][quad]:
+                    for iw, wire in enumerate(self.wire_configs['V'][quad]):
                         wid = wire[0]
                         wlen = wire[3]
-                        wire_shape = geom.shapes.Tubs(
-                            f"CRMWireV{wid}_{quad}",
-                            rmax=self.params['padWidth']/2,
-                            dz=wlen/2.,
-                            sphi="0deg",
-                            dphi="360deg")
-                        wire_vol = geom.structure.Volume(
-                            f"volTPCWireV{wid}_{quad}",
-                            material="Copper_Beryllium_alloy25",
-                            shape=wire_shape)
+                        if 'V' in wire_pool:
+                            wire_vol, plen = wire_pool['V'][quad][iw]
+                        else:
+                            wire_shape = geom.shapes.Tubs(
+                                f"CRMWireV{wid}_{quad}",
+                                rmax=self.params['padWidth']/2,
+                                dz=wlen/2.,
+                                sphi="0deg",
+                                dphi="360deg")
+                            wire_vol = geom.structure.Volume(
+                                f"volTPCWireV{wid}_{quad}",
+                                material="Copper_Beryllium_alloy25",
+                                shape=wire_shape)
+                            plen = wlen
                         # Place wire in V plane
                         pos = geom.structure.Position(
                             f"posWireV{wid}_{quad}",
@@ -414,16 +561,10 @@ class TPCBuilder(gegede.builder.Builder):
                             pos=pos,
                             rot=rot)
                         vols['plane_V'].placements.append(place.name)
+                        wire_map.append(('V', quad, wid, place.name, wire_vol.name,
+                                         wlen.to('cm').magnitude, plen.to('cm').magnitude))
 
                 # Create and place Z wires
-                nch = self.params['nChans']['Col']//2
-                zdelta = self.params['lengthPCBActive'] - self.params['wirePitch']['Z'] * nch
-                if zdelta < 0:
-                    print("Warning: Z delta should be positive or 0")
-                    zdelta = 0
-
-                zoffset = zdelta if quad <= 1 else 0
-                
                 wire_shape_z = geom.shapes.Tubs(
                     f"CRMWireZ{quad}",
                     rmax=self.params['padWidth']/2,
@@ -436,16 +577,14 @@ class TPCBuilder(gegede.builder.Builder):
                     shape=wire_shape_z)
 
                 # Place Z wires
-                for i in range(nch):
-                    zpos = zoffset + (i + 0.5) * self.params['wirePitch']['Z'] - 0.5 * self.params['lengthPCBActive']
-                    if abs(0.5 * self.params['lengthPCBActive'] - abs(zpos)) < 0:
-                        raise ValueError(f"Cannot place wire {i} in view Z, plane too small")
-                        
-                    wid = i + quad * nch
+                zero = Q("0cm")
+                zlen = dims['plane'][1].to('cm').magnitude
+                for wire in self.wire_configs['Z'][quad]:
+                    wid, zpos = wire[0], wire[1]
                     pos = geom.structure.Position(
                         f"posWireZ{wid}_{quad}",
-                        x=Q("0cm"),
-                        y=Q("0cm"),
+                        x=zero,
+                        y=zero,
                         z=zpos)
                     rot = "rPlus90AboutX"
                     place = geom.structure.Placement(
@@ -454,6 +593,7 @@ class TPCBuilder(gegede.builder.Builder):
                         pos=pos,
                         rot=rot)
                     vols['plane_Z'].placements.append(place.name)
+                    wire_map.append(('Z', quad, wid, place.name, wire_vol_z.name, zlen, zlen))
 
 
             # Define placements
@@ -467,13 +607,30 @@ class TPCBuilder(gegede.builder.Builder):
             # Place all volumes
             for name, (x, y, z) in placements.items():
                 pos = geom.structure.Position(f"pos{name}{quad}_pos", x=x, y=Q('0cm'), z=Q('0cm'))
+                rot = "rPlus180AboutX" if (quad in reuse and name != 'active') else None
                 place = geom.structure.Placement(f"pos{name.split('_')[-1]}{quad}", 
                                               volume=vols[name], 
-                                              pos=pos)
+                                              pos=pos,
+                                              rot=rot)
                 vols['tpc'].placements.append(place.name)
 
             self.add_volume(vols['tpc'])
 
+        if wire_map and self.params.get('wireMapFile'):
+            write_wire_map(self.params['wireMapFile'], wire_map, keys=('view', 'quad'))
+
+        if hasattr(self, 'wire_configs') and self.params.get('wireCrossingFile'):
+            from duneggd.wirecrossings import crossing_table_from_wires, write_crossing_tables
+            for view in ['U', 'V', 'Z']:
+                for quad in range(4):
+                    if not self.wire_configs[view][quad]:
+                        raise ValueError(f"No {view} wires in quadrant {quad}, cannot write the wire crossings")
+            write_crossing_tables(self.params['wireCrossingFile'],
+                                  {f"TPC_{quad}": crossing_table_from_wires(
+                                      {view: self.wire_configs[view][quad]
+                                       for view in ['U', 'V', 'Z']})
+                                   for quad in range(4)})
+
 
     def construct(self, geom):
         if self.print_construct:
@@ -498,12 +655,16 @@ class TPCBuilder(gegede.builder.Builder):
         posX = argon_dim[0]/2 - params['HeightGaseousAr'] - params['Upper_xLArBuffer'] - \
                0.5*(params['driftTPCActive'] + params['ReadoutPlane'])
         posXBot = posX - params['driftTPCActive'] - params['heightCathode'] - params['ReadoutPlane']
+        posX, posXBot = Length(posX), Length(posXBot)
 
-        CRP_y = params['widthCRP'] 
-        CRP_z = params['lengthCRP']
+        # plain lengths in the loops, Quantities only for the positions
+        CRP_y = Length(params['widthCRP'])
+        CRP_z = Length(params['lengthCRP'])
+        borderCRP = Length(params['borderCRP'])
+        gapCRU = Length(params['gapCRU'])
         
         # Start from front of detector
-        posZ = -0.5*argon_dim[2] + params['zLArBuffer'] + 0.5*CRP_z
+        posZ = -0.5*Length(argon_dim[2]) + Length(params['zLArBuffer']) + 0.5*CRP_z
 
         # Loop over CRM rows and columns
         idx = 0
@@ -513,7 +674,7 @@ class TPCBuilder(gegede.builder.Builder):
                 posZ += CRP_z
                 
             # Start from left side
-            posY = -0.5*argon_dim[1] + params['yLArBuffer'] + 0.5*CRP_y
+            posY = -0.5*Length(argon_dim[1]) + Length(params['yLArBuffer']) + 0.5*CRP_y
 
             for jj in range(params['nCRM_x']):
                 # Increment Y position every 2 columns  
@@ -524,27 +685,27 @@ class TPCBuilder(gegede.builder.Builder):
                 if ii % 2 == 0:
                     if jj % 2 == 0:
                         quad = 0
-                        pcbOffsetY = params['borderCRP']/2
-                        pcbOffsetZ = params['borderCRP']/2 - params['gapCRU']/4
+                        pcbOffsetY = borderCRP/2
+                        pcbOffsetZ = borderCRP/2 - gapCRU/4
                         myposTPCY = posY - CRP_y/4 + pcbOffsetY
                         myposTPCZ = posZ - CRP_z/4 + pcbOffsetZ
                     else:
                         quad = 1
-                        pcbOffsetY = -params['borderCRP']/2
-                        pcbOffsetZ = params['borderCRP']/2 - params['gapCRU']/4
+                        pcbOffsetY = -borderCRP/2
+                        pcbOffsetZ = borderCRP/2 - gapCRU/4
                         myposTPCY = posY + CRP_y/4 + pcbOffsetY  
                         myposTPCZ = posZ - CRP_z/4 + pcbOffsetZ
                 else:
                     if jj % 2 == 0:
                         quad = 2
-                        pcbOffsetY = params['borderCRP']/2
-                        pcbOffsetZ = -(params['borderCRP']/2 - params['gapCRU']/4)
+                        pcbOffsetY = borderCRP/2
+                        pcbOffsetZ = -(borderCRP/2 - gapCRU/4)
                         myposTPCY = posY - CRP_y/4 + pcbOffsetY
                         myposTPCZ = posZ + CRP_z/4 + pcbOffsetZ
                     else:
                         quad = 3
-                        pcbOffsetY = -params['borderCRP']/2 
-                        pcbOffsetZ = -(params['borderCRP']/2 - params['gapCRU']/4)
+                        pcbOffsetY = -borderCRP/2 
+                        pcbOffsetZ = -(borderCRP/2 - gapCRU/4)
                         myposTPCY = posY + CRP_y/4 + pcbOffsetY
                         myposTPCZ = posZ + CRP_z/4 + pcbOffsetZ
 
@@ -554,9 +715,9 @@ class TPCBuilder(gegede.builder.Builder):
                 # Place top TPC
                 pos_top = geom.structure.Position(
                     f"posTopTPC_{idx}",
-                    x=posX,
-                    y=myposTPCY, 
-                    z=myposTPCZ
+                    x=posX.q,
+                    y=myposTPCY.q, 
+                    z=myposTPCZ.q
                 )
                 place_top = geom.structure.Placement(
                     f"placeTopTPC_{idx}",
@@ -568,9 +729,9 @@ class TPCBuilder(gegede.builder.Builder):
                 # Place bottom TPC
                 pos_bot = geom.structure.Position(
                     f"posBotTPC_{idx}",
-                    x=posXBot,
-                    y=myposTPCY,
-                    z=myposTPCZ 
+                    x=posXBot.q,
+                    y=myposTPCY.q,
+                    z=myposTPCZ.q 
                 )
                 place_bot = geom.structure.Placement(
                     f"placeBotTPC_{idx}",
@@ -7,6 +7,7 @@ import gegede.builder
 from gegede import Quantity as Q
 
 from protodune import ProtoDUNEVDBuilder
+from bundles import load
 
 class WorldBuilder(gegede.builder.Builder):
     '''
@@ -42,6 +43,7 @@ class WorldBuilder(gegede.builder.Builder):
                  cathode_switch=True, fieldcage_switch=True, arapucamesh_switch=True,  # Add these lines
                  print_config=False,  
                  print_construct=False,  # Add this line
+                 wireTableFile=None,
                  **kwds):
         self.material = material
         
@@ -60,162 +62,35 @@ class WorldBuilder(gegede.builder.Builder):
         self.fieldcage_switch = fieldcage_switch  # Add this line
         self.arapucamesh_switch = arapucamesh_switch  # Add this line
 
-        # Process TPC parameters
-        if tpc_parameters:
-            # Create a dictionary from the string with proper Quantity objects
-            eval_globals = {'Q': Q}
-            self.tpc = eval(tpc_parameters, eval_globals)
-            
-            # Calculate derived TPC parameters
-            self.tpc['widthCRP'] = self.tpc['widthPCBActive'] + 2 * self.tpc['borderCRP']
-            self.tpc['lengthCRP'] = (2 * self.tpc['lengthPCBActive'] + 
-                                   2 * self.tpc['borderCRP'] + 
-                                   self.tpc['gapCRU'])
-
-            # Active TPC dimensions based on CRP
-            self.tpc['widthTPCActive'] = (self.tpc['nCRM_x']/2) * self.tpc['widthCRP'] 
-            self.tpc['lengthTPCActive'] = (self.tpc['nCRM_z']/2) * self.tpc['lengthCRP']
-
-            # Total readout plane thickness
-            self.tpc['ReadoutPlane'] = self.tpc['nViews'] * self.tpc['padWidth']
-
-        # Process Cryostat parameters
-        if cryostat_parameters:
-            eval_globals = {'Q': Q}
-            self.cryo = eval(cryostat_parameters, eval_globals)
-            
-            # Calculate derived parameters
-            self.cryo['xLArBuffer'] = (self.cryo['Argon_x'] - 
-                                      self.tpc['driftTPCActive'] - 
-                                      self.cryo['HeightGaseousAr'] - 
-                                      self.tpc['ReadoutPlane'])
-            
-            self.cryo['Upper_xLArBuffer'] = (self.cryo['Upper_xLArBuffer_base'] - 
-                                            self.tpc['ReadoutPlane'])
-            
-            self.cryo['Lower_xLArBuffer'] = (self.cryo['Lower_xLArBuffer_base'] - 
-                                            self.tpc['ReadoutPlane'])
-            
-            self.cryo['yLArBuffer'] = (self.cryo['Argon_y'] - 
-                                      self.tpc['widthTPCActive']) * 0.5
-            
-            self.cryo['zLArBuffer'] = (self.cryo['Argon_z'] - 
-                                      self.tpc['lengthTPCActive']) * 0.5
-            
-            # print(self.tpc['lengthTPCActive'],self.tpc['widthTPCActive'],self.tpc['ReadoutPlane'])
-            
-            self.cryo['Cryostat_x'] = self.cryo['Argon_x'] + 2 * self.cryo['SteelThickness']
-            self.cryo['Cryostat_y'] = self.cryo['Argon_y'] + 2 * self.cryo['SteelThickness']
-            self.cryo['Cryostat_z'] = self.cryo['Argon_z'] + 2 * self.cryo['SteelThickness']
-
-
-         # Process Steel Support parameters
-        if steel_parameters:
-            eval_globals = {'Q': Q}
-            self.steel = eval(steel_parameters, eval_globals)
-
-            # Calculate detector enclosure dimensions
-            self.DetEncX = (self.cryo['Cryostat_x'] + 
-                                    2*(self.steel['SteelSupport_x'] + self.FoamPadding) + 
-                                    2*self.steel['SpaceSteelSupportToWall'])
-            
-            self.DetEncY = (self.cryo['Cryostat_y'] + 
-                                    2*(self.steel['SteelSupport_y'] + self.FoamPadding) + 
-                                    self.steel['SpaceSteelSupportToCeiling'])
-            
-            self.DetEncZ = (self.cryo['Cryostat_z'] + 
-                                    2*(self.steel['SteelSupport_z'] + self.FoamPadding) + 
-                                    2*self.steel['SpaceSteelSupportToWall'])
-
-            # Calculate position parameters
-            self.steel['posCryoInDetEnc'] = {'x': Q('0cm'), 
-                                            'y': Q('0cm'), 
-                                            'z': Q('0cm')}
-
-            # Calculate steel structure positions
-            self.steel['posTopSteelStruct'] = (self.cryo['Argon_y']/2 + 
-                                            self.FoamPadding + 
-                                            self.steel['SteelSupport_y'])
-            
-            self.steel['posBotSteelStruct'] = -(self.cryo['Argon_y']/2 + 
-                                            self.FoamPadding + 
-                                            self.steel['SteelSupport_y'])
-            
-            self.steel['posZBackSteelStruct'] = (self.cryo['Argon_z']/2 + 
-                                                self.FoamPadding + 
-                                                self.steel['SteelSupport_z'])
-            
-            self.steel['posZFrontSteelStruct'] = -(self.cryo['Argon_z']/2 + 
-                                                self.FoamPadding + 
-                                                self.steel['SteelSupport_z'])
-            
-            self.steel['posLeftSteelStruct'] = (self.cryo['Argon_x']/2 + 
-                                            self.FoamPadding + 
-                                            self.steel['SteelSupport_x'])
-            
-            self.steel['posRightSteelStruct'] = -(self.cryo['Argon_x']/2 + 
-                                                self.FoamPadding + 
-                                                self.steel['SteelSupport_x'])
-
-            # Adjust for CRT if needed  
-            if self.DP_CRT_switch == True:
-                self.steel['posTopSteelStruct'] -= Q('29.7cm')
-                self.steel['posBotSteelStruct'] += Q('29.7cm')
-
-            # Calculate origin positions
-            self.OriginZSet = (self.DetEncZ/2.0 -
-                                    self.steel['SpaceSteelSupportToWall'] -
-                                    self.steel['SteelSupport_z'] -
-                                    self.FoamPadding -
-                                    self.cryo['SteelThickness'] -
-                                    self.cryo['zLArBuffer'])
-
-            self.OriginYSet = (self.DetEncY/2.0 -
-                                    self.steel['SpaceSteelSupportToCeiling']/2.0 -
-                                    self.steel['SteelSupport_y'] -
-                                    self.FoamPadding -
-                                    self.cryo['SteelThickness'] -
-                                    self.cryo['yLArBuffer'] -
-                                    self.tpc['widthTPCActive']/2)
-
-            self.OriginXSet = (self.DetEncX/2.0 -
-                                    self.steel['SpaceSteelSupportToWall'] -
-                                    self.steel['SteelSupport_x'] -
-                                    self.FoamPadding -
-                                    self.cryo['SteelThickness'] -
-                                    self.cryo['xLArBuffer'] +
-                                    Q('6.0cm')/2 +  # heightCathode/2
-                                    self.cryo['Upper_xLArBuffer'])
-
-        # Process beam parameters
-        if beam_parameters:
-            eval_globals = {'Q': Q}
-            self.beam = eval(beam_parameters, eval_globals)
-
-        # Process CRT parameters
-        if crt_parameters:
-            eval_globals = {'Q': Q}
-            self.crt = eval(crt_parameters, eval_globals)
-
-        if cathode_parameters:
-            eval_globals = {'Q': Q}
-            self.cathode = eval(cathode_parameters, eval_globals)
-
-        if xarapuca_parameters:  # Add this block
-            eval_globals = {'Q': Q}
-            self.xarapuca = eval(xarapuca_parameters, eval_globals)
-            # Calculate derived parameters
-            self.xarapuca['FCToArapucaSpaceLat'] = Q('65cm') + self.xarapuca['ArapucaOut_y']
-
-        if fieldcage_parameters:  # Add this block
-            eval_globals = {'Q': Q}
-            self.fieldcage = eval(fieldcage_parameters, eval_globals)
-
-        if pmt_parameters:  # Add this block
-            eval_globals = {'Q': Q}
-            self.pmt = eval(pmt_parameters, eval_globals)
+        # Parse, check and derive the parameters of all the parts once, the
+        # sub-builders share the frozen bundles
+        bundles = load(dict(tpc=tpc_parameters, cryostat=cryostat_parameters,
+                            steel=steel_parameters, beam=beam_parameters,
+                            crt=crt_parameters, cathode=cathode_parameters,
+                            xarapuca=xarapuca_parameters, fieldcage=fieldcage_parameters,
+                            pmt=pmt_parameters),
+                       FoamPadding=self.FoamPadding, DP_CRT_switch=self.DP_CRT_switch)
+        self.tpc = bundles['tpc']
+        self.cryo = bundles['cryostat']
+        self.steel = bundles['steel']
+        self.beam = bundles['beam']
+        self.crt = bundles['crt']
+        self.cathode = bundles['cathode']
+        self.xarapuca = bundles['xarapuca']
+        self.fieldcage = bundles['fieldcage']
+        self.pmt = bundles['pmt']
+
+        # detector enclosure dimensions and origin
+        if bundles['enclosure']:
+            self.DetEncX = bundles['enclosure']['DetEncX']
+            self.DetEncY = bundles['enclosure']['DetEncY']
+            self.DetEncZ = bundles['enclosure']['DetEncZ']
+            self.OriginXSet = bundles['enclosure']['OriginXSet']
+            self.OriginYSet = bundles['enclosure']['OriginYSet']
+            self.OriginZSet = bundles['enclosure']['OriginZSet']
 
         self.print_construct = print_construct
+        self.wireTableFile = wireTableFile
         # Mark as configured
         self._configured = True
 
@@ -564,4 +439,9 @@ class WorldBuilder(gegede.builder.Builder):
         # Add the cryostat placement to the detector enclosure volume
         volume.placements.append(pd_place.name)
 
+        # Export the wire positions alongside the GDML
+        if self.wireTableFile:
+            from duneggd.wiretable import write_wire_table
+            write_wire_table(geom, self.wireTableFile, world=volume.name)
+
 
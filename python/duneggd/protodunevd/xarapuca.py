@@ -70,27 +70,6 @@ class XARAPUCABuilder(gegede.builder.Builder):
             self.list_posx_bot.append(-self.list_posx_bot[0])
             self.list_posz_bot.append(-self.list_posz_bot[0])
 
-        if self.params:
-            # Calculate derived mesh parameters
-            self.params['MeshInnerStructureSeparation'] = (
-                self.params['MeshInnerStructureSeparation_base'] + 
-                self.params['MeshRodOuterRadius']
-            )
-            
-            # Calculate number of mesh bars for cathode X-ARAPUCA
-            if self.cathode:
-                self.params['CathodeArapucaMeshNumberOfBars_vertical'] = int(
-                    self.cathode['lengthCathodeVoid'] / 
-                    self.params['CathodeArapucaMeshRodSeparation']
-                )
-                self.params['CathodeArapucaMeshNumberOfBars_horizontal'] = int(
-                    self.cathode['widthCathodeVoid'] / 
-                    self.params['CathodeArapucaMeshRodSeparation']
-                )
-
-            # Calculate distance between mesh and window
-            self.params['Distance_Mesh_Window'] = Q('1.8cm') + self.params['MeshOuterRadius']
-
         self._configured = True
 
     def construct_cathode_mesh(self, geom):
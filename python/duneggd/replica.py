@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+'''
+Replicated and divided volumes and a GDML exporter for them.
+
+N equally spaced copies of a volume along an axis can be placed as a
+single replica (GDML <replicavol>, G4PVReplica) or, if the copies are
+slices of their mother, as a division (GDML <divisionvol>, G4PVDivision)
+instead of N physical volumes. Geant4 navigates them by computing the
+copy number from the position rather than by looking through N
+daughters, and the GDML holds one element instead of N positions and
+physvols.
+
+Like in Geant4, a replica or a division must be the only daughter of its
+mother volume, and the copies fill it along the axis. For Cartesian
+axes the copies are centered in the mother: copy i is at
+(i - (number-1)/2)*width, the offset applies to rho and phi only.
+
+Builders use replicate() to get a box of copies to place like any other
+volume, place_replicas() to fill a volume they made themselves, or
+divide() to slice a volume. The records are kept with the placements of
+the mother, so that the iterators of gegede and the duneggd passes see
+the replicated volume as a daughter, but they are not placements: only
+the exporter of this module (also used by duneggd.multiunion) writes
+them out,
+
+    $ gegede-cli fgt.cfg -w World -f duneggd.replica -o fgt.gdml
+
+and the plain gegede GDML exporter fails on them rather than writing a
+single copy.
+'''
+
+from collections import namedtuple
+
+from lxml import etree
+from gegede import Quantity as Q
+import gegede.export.gdml as gdml
+
+class _Replicated(object):
+    __slots__ = ()
+
+    @property
+    def copynumber(self):
+        # the first thing the gegede GDML exporter reads of a placement
+        raise ValueError('%s "%s" of %d copies of "%s" can only be exported with '
+                         '"-f duneggd.replica" (or duneggd.multiunion)'
+                         % (type(self).__name__, self.name, self.number, self.volume))
+
+class Replica(_Replicated, namedtuple('Replica', ['name', 'volume', 'number', 'axis',
+                                                  'width', 'offset'])):
+    __slots__ = ()
+
+class Division(_Replicated, namedtuple('Division', ['name', 'volume', 'number', 'axis',
+                                                    'width', 'offset'])):
+    __slots__ = ()
+
+# what the gegede GDML exporter writes as the physvol of a record, before
+# replace_physvols() puts the replica or division in its place
+_Physvol = namedtuple('_Physvol', ['name', 'volume', 'pos', 'rot', 'copynumber'])
+
+AXES = ('x', 'y', 'z', 'rho', 'phi')
+
+# GDML names of the axes of a division
+DIVISION_AXES = dict(x='kXAxis', y='kYAxis', z='kZAxis', rho='kRho', phi='kPhi')
+
+BOX_AXES = dict(x='dx', y='dy', z='dz')
+
+
+def is_replicated(obj):
+    return isinstance(obj, (Replica, Division))
+
+def _unit(axis):
+    return 'degree' if axis == 'phi' else 'cm'
+
+def _check(axis, number, width, offset):
+    if axis not in AXES:
+        raise ValueError('Unknown replication axis "%s", expected one of %s' % (axis, ', '.join(AXES)))
+    if int(number) != number or number < 1:
+        raise ValueError('Need a positive number of copies, got %s' % number)
+    return int(number), Q(width).to(_unit(axis)), Q(offset).to(_unit(axis))
+
+def _add(geom, mother, record):
+    if mother.placements:
+        raise ValueError('Volume "%s" already has daughters, a replica must be its only one'
+                         % mother.name)
+    if record.name in geom.store.structure:
+        raise ValueError('Structure "%s" already defined' % record.name)
+    geom.store.structure[record.name] = record
+    mother.placements.append(record.name)
+    return record
+
+
+def place_replicas(geom, mother, volume, number, width, axis='z', offset='0cm'):
+    '''
+    Fill the mother volume with number copies of volume, width apart along
+    axis, and return the Replica.
+    '''
+    volume = getattr(volume, 'name', volume)
+    number, width, offset = _check(axis, number, width, offset)
+    name = 'replicate%s_in_%s' % (volume, mother.name)
+    return _add(geom, mother, Replica(name, volume, number, axis, width, offset))
+
+
+def replicate(geom, name, volume, number, width, axis='z', material=None):
+    '''
+    Make a box of number copies of a box volume, width apart along the x,
+    y or z axis, and return its volume, 'vol'+name. Its shape, name, has
+    the extent of the copies along the axis and that of the box across.
+    The material defaults to that of the volume, which fills it.
+    '''
+    if axis not in BOX_AXES:
+        raise ValueError('Can only replicate boxes along x, y or z, not "%s"' % axis)
+    volume = geom.store.structure[getattr(volume, 'name', volume)]
+    box = geom.store.shapes[volume.shape]
+    if type(box).__name__ != 'Box':
+        raise ValueError('Can only replicate box volumes, "%s" is a %s'
+                         % (volume.name, type(box).__name__))
+    half = dict((dim, getattr(box, dim)) for dim in BOX_AXES.values())
+    if 2*half[BOX_AXES[axis]] > Q(width):
+        raise ValueError('Volume "%s" is wider than the replication width %s along %s'
+                         % (volume.name, width, axis))
+    half[BOX_AXES[axis]] = 0.5*number*Q(width)
+    shape = geom.shapes.Box(name, **half)
+    lv = geom.structure.Volume('vol'+name, material=material or volume.material, shape=shape)
+    place_replicas(geom, lv, volume, number, width, axis)
+    return lv
+
+
+def divide(geom, mother, name, number, axis='z', material=None):
+    '''
+    Slice the box mother volume into number equal boxes along the x, y or
+    z axis and return the volume of a slice, 'vol'+name, for the caller
+    to put daughters in. The material defaults to that of the mother.
+    '''
+    if axis not in BOX_AXES:
+        raise ValueError('Can only divide boxes along x, y or z, not "%s"' % axis)
+    box = geom.store.shapes[mother.shape]
+    if type(box).__name__ != 'Box':
+        raise ValueError('Can only divide box volumes, "%s" is a %s'
+                         % (mother.name, type(box).__name__))
+    half = dict((dim, getattr(box, dim)) for dim in BOX_AXES.values())
+    width = 2*half[BOX_AXES[axis]]/number
+    half[BOX_AXES[axis]] = 0.5*width
+    shape = geom.shapes.Box(name, **half)
+    lv = geom.structure.Volume('vol'+name, material=material or mother.material, shape=shape)
+    number, width, offset = _check(axis, number, width, '0cm')
+    _add(geom, mother, Division('divide%s_in_%s' % (lv.name, mother.name), lv.name,
+                                number, axis, width, offset))
+    return lv
+
+
+def _value(q):
+    return repr(float(q.magnitude))
+
+def make_replica_node(rep):
+    '''
+    Return the <replicavol> lxml.etree.Element of a Replica.
+    '''
+    unit = _unit(rep.axis)
+    ele = etree.Element('replicavol', number=str(rep.number))
+    ele.append(etree.Element('volumeref', ref=rep.volume))
+    along = etree.SubElement(ele, 'replicate_along_axis')
+    along.append(etree.Element('direction', **{rep.axis: '1'}))
+    along.append(etree.Element('width', value=_value(rep.width), unit=unit))
+    along.append(etree.Element('offset', value=_value(rep.offset), unit=unit))
+    return ele
+
+def make_division_node(div):
+    '''
+    Return the <divisionvol> lxml.etree.Element of a Division.
+    '''
+    # Geant4 computes the width from the number when it is zero
+    ele = etree.Element('divisionvol', axis=DIVISION_AXES[div.axis], number=str(div.number),
+                        width='0', offset=_value(div.offset), unit=_unit(div.axis))
+    ele.append(etree.Element('volumeref', ref=div.volume))
+    return ele
+
+
+def replace_physvols(gdml_node, geom):
+    '''
+    Replace the physvols that gegede wrote for the replicas and divisions
+    in gdml_node by their <replicavol> and <divisionvol>.
+    '''
+    store = geom.store.structure
+    for node in gdml_node.find('structure'):
+        vol = store.get(node.get('name'))
+        if vol is None or not any(is_replicated(store[p]) for p in vol.placements):
+            continue
+        if len(vol.placements) > 1:
+            raise ValueError('Volume "%s" has a replica and other daughters' % vol.name)
+        pvol = node.find('physvol')
+        rep = store[vol.placements[0]]
+        make = make_replica_node if isinstance(rep, Replica) else make_division_node
+        node.replace(pvol, make(rep))
+    return gdml_node
+
+
+# gegede export module interface
+
+def convert(geom):
+    '''
+    Return the GDML lxml.etree of geom with its replicas and divisions.
+    '''
+    store = geom.store.structure
+    records = [obj for obj in store.values() if is_replicated(obj)]
+    for rec in records:
+        store[rec.name] = _Physvol(rec.name, rec.volume, None, None, None)
+    try:
+        gdml_node = gdml.convert(geom)
+    finally:
+        for rec in records:
+            store[rec.name] = rec
+    return replace_physvols(gdml_node, geom)
+
+def dumps(obj):
+    return gdml.dumps(obj)
+
+def output(obj, filename):
+    return gdml.output(obj, filename)
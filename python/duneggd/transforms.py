@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+'''
+Rotations and placement transforms of gegede geometries as NumPy arrays.
+
+The conventions are those of the GDML reader of Geant4, so that the
+frames computed here (by the wire table, the bucketing pass or the
+builders) are those Geant4 sees.
+'''
+
+import numpy as np
+
+from gegede import Quantity
+
+
+def rotation_matrix(rot):
+    '''
+    Matrix taking daughter coordinates to the mother frame for a gegede
+    Rotation, or the (x, y, z) angles of one (Quantities or strings),
+    following the GDML reader: R = Rz*Ry*Rx is inverted.
+    '''
+    if rot is None:
+        return np.identity(3)
+    angles = (rot.x, rot.y, rot.z) if hasattr(rot, 'x') else rot
+    ax, ay, az = [Quantity(a).to('radian').magnitude for a in angles]
+    cx, sx = np.cos(ax), np.sin(ax)
+    cy, sy = np.cos(ay), np.sin(ay)
+    cz, sz = np.cos(az), np.sin(az)
+    rx = np.array([[1, 0, 0], [0, cx, -sx], [0, sx, cx]])
+    ry = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+    rz = np.array([[cz, -sz, 0], [sz, cz, 0], [0, 0, 1]])
+    return (rz @ ry @ rx).T
+
+def placement_transform(store, place):
+    '''
+    (rotation, translation in cm) of a placement in its mother volume.
+    '''
+    pos = store.get(place.pos) if place.pos else None
+    rot = store.get(place.rot) if place.rot else None
+    if pos is None:
+        trans = np.zeros(3)
+    else:
+        trans = np.array([q.to('cm').magnitude for q in (pos.x, pos.y, pos.z)])
+    return rotation_matrix(rot), trans
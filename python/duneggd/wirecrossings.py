@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+'''
+U x V x Z wire crossing tables.
+
+The wires of the three planes of a readout module are given as (z1, y1,
+z2, y2) segments in a common plane frame, as produced by the generate_wires
+functions of the builders (see duneggd.wireindex.wire_endpoints). The U and
+V segments are intersected pairwise with a vectorized kernel, then every
+U/V crossing is matched to the Z wires passing within a tolerance of it.
+
+The result is a structured array of CROSSING_DTYPE sorted by (u, v, z).
+'''
+
+import os
+
+import numpy as np
+
+from duneggd.wireindex import wire_endpoints
+
+CROSSING_DTYPE = np.dtype([('u', '<i4'), ('v', '<i4'), ('z', '<i4'),    # channels
+                           ('ypos', '<f4'), ('zpos', '<f4')])          # cm
+
+
+def segment_intersections(a, b, eps=1e-9, chunk=512):
+    '''
+    Intersections of the (NA, 4) segments a with the (NB, 4) segments b,
+    both given as (z1, y1, z2, y2). Returns the indices (ia, ib) of the
+    intersecting pairs and the (N, 2) intersection points (z, y).
+    '''
+    a = np.asarray(a, dtype=float).reshape(-1, 4)
+    b = np.asarray(b, dtype=float).reshape(-1, 4)
+    p, r = a[:, :2], a[:, 2:] - a[:, :2]
+    q, s = b[:, :2], b[:, 2:] - b[:, :2]
+
+    ia, ib, pts = [], [], []
+    for lo in range(0, len(a), chunk):
+        pc, rc = p[lo:lo+chunk, None, :], r[lo:lo+chunk, None, :]
+        qp = q[None, :, :] - pc
+        denom = rc[..., 0]*s[None, :, 1] - rc[..., 1]*s[None, :, 0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (qp[..., 0]*s[None, :, 1] - qp[..., 1]*s[None, :, 0]) / denom
+            u = (qp[..., 0]*rc[..., 1] - qp[..., 1]*rc[..., 0]) / denom
+        ok = ((np.abs(denom) > eps) &
+              (t >= -eps) & (t <= 1 + eps) & (u >= -eps) & (u <= 1 + eps))
+        i, j = np.nonzero(ok)
+        ia.append(i + lo)
+        ib.append(j)
+        pts.append(p[i + lo] + t[i, j][:, None]*r[i + lo])
+    if not ia:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros((0, 2))
+    return np.concatenate(ia), np.concatenate(ib), np.concatenate(pts)
+
+
+def crossing_table(u, v, z, tol=None):
+    '''
+    Crossing table of the U, V and Z planes, each given as (channels, (N, 4)
+    end points). A U/V crossing forms a triple with every Z wire whose
+    coordinate along the Z pitch is in (s - tol, s + tol], s being that of
+    the crossing and tol half the Z wire pitch by default, and whose
+    segment covers it.
+    '''
+    uch, useg = u
+    vch, vseg = v
+    zch, zseg = z
+    iu, iv, pts = segment_intersections(useg, vseg)
+
+    # Z wires are parallel: sort them along their pitch direction
+    zdir = zseg[0, 2:] - zseg[0, :2]
+    zdir /= np.linalg.norm(zdir)
+    zpitch = np.array([zdir[1], -zdir[0]])
+    zcenter = 0.5*(zseg[:, :2] + zseg[:, 2:])
+    coord = zcenter @ zpitch
+    order = np.argsort(coord, kind='stable')
+    coord = coord[order]
+    if tol is None:
+        tol = 0.5*np.median(np.diff(coord)) if len(coord) > 1 else np.inf
+
+    # all the Z wires in (s - tol, s + tol] of each crossing: a crossing
+    # midway between two wires only matches the upper one
+    s = pts @ zpitch
+    lo = np.searchsorted(coord, s - tol, side='right')
+    hi = np.searchsorted(coord, s + tol, side='right')
+    nmatch = hi - lo
+    icross = np.repeat(np.arange(len(pts)), nmatch)
+    # position of each match inside its [lo, hi) range
+    rank = np.arange(nmatch.sum()) - np.repeat(np.cumsum(nmatch) - nmatch, nmatch)
+    iz = order[lo[icross] + rank]
+
+    # keep the crossings inside the Z segments
+    t = ((pts[icross] - zseg[iz, :2]) * zdir).sum(axis=1)
+    zlen = ((zseg[iz, 2:] - zseg[iz, :2]) * zdir).sum(axis=1)
+    keep = (t >= -tol) & (t <= zlen + tol)
+    icross, iz = icross[keep], iz[keep]
+
+    table = np.zeros(len(icross), dtype=CROSSING_DTYPE)
+    table['u'] = np.asarray(uch)[iu[icross]]
+    table['v'] = np.asarray(vch)[iv[icross]]
+    table['z'] = np.asarray(zch)[iz]
+    table['zpos'] = pts[icross, 0]
+    table['ypos'] = pts[icross, 1]
+    return np.sort(table, order=['u', 'v', 'z'])
+
+def crossing_table_from_wires(winfos, tol=None):
+    '''
+    Crossing table of a {'U': wires, 'V': wires, 'Z': wires} dictionary of
+    generate_wires output.
+    '''
+    return crossing_table(*[wire_endpoints(winfos[view]) for view in ('U', 'V', 'Z')], tol=tol)
+
+def write_crossing_tables(filename, tables):
+    '''
+    Save the {module name: crossing table} dictionary as a .npz file and
+    return its name: filename, with its .npy suffix (if any) replaced by
+    .npz, or .npz appended.
+    '''
+    root, ext = os.path.splitext(filename)
+    if ext != '.npz':
+        filename = (root if ext == '.npy' else filename) + '.npz'
+    with open(filename, 'wb') as f:
+        np.savez(f, **tables)
+    print("Wrote %d wire crossings of %d modules to %s"
+          % (sum(len(t) for t in tables.values()), len(tables), filename))
+    return filename
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+'''
+Nearest-wire lookup for batches of points.
+
+Each wire plane is indexed by the pitch coordinate of its wires (the
+position of the wire centers along the pitch direction), sorted once so
+that a query is a binary search: O(log n) per point and vectorized over
+the points with numpy.searchsorted.
+
+Planes can be built from
+
+ - the wire rows of the generate_wires functions of the FD-VD and
+   ProtoDUNE-VD builders, [channel, zcenter, ycenter, length, z1, y1, z2, y2]
+   (plain numbers in cm or Quantities), or the structured array of the
+   FD-VD WiresBuilder, in the plane frame with x along the drift,
+ - the records of a binary wire table (see duneggd.wiretable), in the
+   world frame.
+'''
+
+import numpy as np
+
+
+def wire_endpoints(wires):
+    '''
+    Channels and (N, 4) (z1, y1, z2, y2) end points in cm of generate_wires output.
+    '''
+    if isinstance(wires, np.ndarray) and wires.dtype.names:
+        return wires['channel'].astype(int), np.asarray(wires['endpoints'], dtype=float)
+    def cm(v):
+        return v.to('cm').magnitude if hasattr(v, 'to') else v
+    channels = np.array([int(w[0]) for w in wires], dtype=int)
+    endpoints = np.array([[cm(v) for v in w[4:8]] for w in wires], dtype=float).reshape(-1, 4)
+    return channels, endpoints
+
+
+class PlaneIndex(object):
+    '''
+    Sorted pitch coordinates of the (parallel) wires of one plane.
+    '''
+
+    def __init__(self, channels, starts, ends, pitch=None):
+        channels = np.asarray(channels)
+        starts = np.asarray(starts, dtype=float)
+        ends = np.asarray(ends, dtype=float)
+        if len(channels) == 0:
+            raise ValueError('Cannot index a plane without wires')
+
+        # common wire direction, oriented like the first wire
+        dirs = ends - starts
+        dirs /= np.linalg.norm(dirs, axis=1)[:, None]
+        dirs *= np.sign(dirs @ dirs[0])[:, None]
+        self.direction = dirs.mean(axis=0)
+        self.direction /= np.linalg.norm(self.direction)
+
+        centers = 0.5*(starts + ends)
+        if pitch is None:
+            if len(centers) < 2:
+                raise ValueError('Need a pitch direction to index a single wire')
+            span = centers[-1] - centers[0]
+            pitch = span - (span @ self.direction)*self.direction
+        pitch = np.asarray(pitch, dtype=float)
+        self.pitch = pitch/np.linalg.norm(pitch)
+
+        coord = centers @ self.pitch
+        order = np.argsort(coord, kind='stable')
+        self.coord = coord[order]
+        self.channels = channels[order]
+        # extent of each wire along its direction
+        ts, te = starts[order] @ self.direction, ends[order] @ self.direction
+        self.tmin = np.minimum(ts, te)
+        self.tmax = np.maximum(ts, te)
+
+    @classmethod
+    def from_wires(cls, wires):
+        '''
+        Index the output of generate_wires, in the plane frame (x, y, z)
+        with the wires at x = 0.
+        '''
+        channels, endpoints = wire_endpoints(wires)
+        zeros = np.zeros(len(endpoints))
+        starts = np.column_stack([zeros, endpoints[:, 1], endpoints[:, 0]])
+        ends = np.column_stack([zeros, endpoints[:, 3], endpoints[:, 2]])
+        return cls(channels, starts, ends)
+
+    def query(self, points):
+        '''
+        Nearest wire of each of the (N, 3) points. Returns the channels, the
+        perpendicular distances to the wires in the plane and whether the
+        point projects onto the wire segment.
+        '''
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        s = points @ self.pitch
+        right = np.searchsorted(self.coord, s).clip(1, len(self.coord) - 1)
+        left = right - 1
+        if len(self.coord) == 1:
+            best = np.zeros(len(s), dtype=int)
+        else:
+            best = np.where(np.abs(s - self.coord[left]) <= np.abs(self.coord[right] - s),
+                            left, right)
+        dist = np.abs(s - self.coord[best])
+        t = points @ self.direction
+        covered = (t >= self.tmin[best]) & (t <= self.tmax[best])
+        return self.channels[best], dist, covered
+
+
+class WireIndex(object):
+    '''
+    Plane indices keyed by plane name (the view, or (tpc, view) for a
+    wire table).
+    '''
+
+    def __init__(self, planes=None):
+        self.planes = dict(planes or {})
+
+    @classmethod
+    def from_generated(cls, winfos):
+        '''
+        Index a {view: wires} dictionary, e.g. WiresBuilder.WireInfo.
+        '''
+        return cls({view: PlaneIndex.from_wires(wires) for view, wires in winfos.items()
+                    if len(wires)})
+
+    @classmethod
+    def from_wire_table(cls, records, tpc=None):
+        '''
+        Index the planes of a wire table, all TPCs or only the given one.
+        '''
+        planes = {}
+        if tpc is not None:
+            records = records[records['tpc'] == tpc]
+        keys = np.unique(records[['tpc', 'plane']])
+        for itpc, iplane in keys.tolist():
+            rec = records[(records['tpc'] == itpc) & (records['plane'] == iplane)]
+            view = rec['view'][0].decode()
+            planes[(itpc, view)] = PlaneIndex(rec['channel'], rec['start'], rec['end'],
+                                              pitch=rec['pitch'][0])
+        return cls(planes)
+
+    def query(self, points):
+        '''
+        {plane: (channels, distances, covered)} for the (N, 3) points.
+        '''
+        return {name: plane.query(points) for name, plane in self.planes.items()}
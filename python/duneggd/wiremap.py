@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+'''
+Wire length pooling and the channel to placement map of the wires.
+
+The wires of a plane whose lengths agree within a tolerance can share one
+shape and volume, cut to the shortest length of the group. The map of the
+wires lists, for each of them, its channel, its placement, the volume it
+places and its generated and placed lengths, so that the pooling can be
+checked and undone downstream. Used by the dunefdvd and protodunevd TPC
+builders.
+'''
+
+import numpy as np
+
+# columns of the map after those identifying the plane
+WIRE_MAP_COLUMNS = ('channel', 'placement', 'volume', 'length_cm', 'placed_length_cm')
+
+
+def pool_wire_lengths(lengths, tol):
+    '''
+    Group wire lengths (plain numbers, one unit) so that the lengths inside
+    a group differ by at most tol (same unit). Returns the group label of
+    each wire and the array of the lengths used for the groups, which are
+    the shortest ones so that no pooled wire sticks out of its plane.
+    '''
+    lengths = np.asarray(lengths, dtype=float)
+    order = np.argsort(lengths, kind='stable')
+    labels = np.empty(lengths.size, dtype=int)
+    pooled = []
+    for i in order:
+        if not pooled or lengths[i] - pooled[-1] > tol:
+            pooled.append(lengths[i])
+        labels[i] = len(pooled) - 1
+    return labels, np.array(pooled)
+
+
+def write_wire_map(filename, rows, keys=('plane',)):
+    '''
+    Write one line per wire: the keys identifying its plane (e.g. the view
+    and the quadrant), then the WIRE_MAP_COLUMNS, lengths in cm. A row
+    holds the values of the keys followed by those of the columns.
+    '''
+    nkeys = len(keys)
+    fmt = ' '.join(['%s']*nkeys) + " %d %s %s %.6f %.6f\n"
+    with open(filename, 'w') as f:
+        f.write("# %s\n" % ' '.join(tuple(keys) + WIRE_MAP_COLUMNS))
+        for row in rows:
+            f.write(fmt % tuple(row))
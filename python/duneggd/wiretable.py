@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+'''
+Binary wire table written alongside the GDML.
+
+The table is extracted from a constructed gegede geometry by following the
+LArSoft naming conventions shared by all the detectors in this package:
+TPCs are the volumes named 'volTPC*' (but not 'volTPCPlane*', 'volTPCWire*'
+or 'volTPCActive*'), their wire planes are the 'volTPCPlane*' daughters and
+the wires are the 'volTPCWire*' Tubs placed in the planes. Channels are
+numbered by placement order inside each plane.
+
+File layout (little endian):
+
+    8 bytes   magic b'DUNEWIRE'
+    uint32    format version
+    uint32    length of the JSON header in bytes
+    JSON      header: version, units, dtype, number of records and the
+              world transform of every TPC (rotation and translation)
+    padding   up to a multiple of 64 bytes
+    records   WIRE_TABLE_DTYPE, one per wire, ordered by tpc, plane, channel
+
+Positions are in cm in the world frame. read_wire_table memory-maps the
+records.
+'''
+
+import json
+import numpy as np
+
+from duneggd.transforms import placement_transform
+
+WIRE_TABLE_MAGIC = b'DUNEWIRE'
+WIRE_TABLE_VERSION = 1
+WIRE_TABLE_ALIGN = 64
+
+WIRE_TABLE_DTYPE = np.dtype([('tpc', '<i4'),        # TPC index, see the header
+                             ('plane', '<i4'),      # plane index inside the TPC
+                             ('view', 'S1'),        # U, V, Z ...
+                             ('channel', '<i4'),    # wire index inside the plane
+                             ('start', '<f8', (3,)),
+                             ('end', '<f8', (3,)),
+                             ('pitch', '<f8', (3,))]) # unit vector, increasing channel
+
+
+def is_tpc(name):
+    return (name.startswith('volTPC') and
+            not name.startswith(('volTPCPlane', 'volTPCWire', 'volTPCActive')))
+
+def is_plane(name):
+    return name.startswith('volTPCPlane')
+
+def is_wire(name):
+    return name.startswith('volTPCWire')
+
+
+def plane_wires(geom, plane):
+    '''
+    Local (start, end) of the wires of a plane volume and its normal axis.
+    '''
+    store = geom.store.structure
+    starts, ends = [], []
+    for pname in plane.placements:
+        place = store[pname]
+        if not is_wire(place.volume):
+            continue
+        shape = geom.store.shapes[store[place.volume].shape]
+        half = shape.dz.to('cm').magnitude
+        rot, trans = placement_transform(store, place)
+        starts.append(trans - half*rot[:, 2])
+        ends.append(trans + half*rot[:, 2])
+    box = geom.store.shapes[plane.shape]
+    halves = [getattr(box, d).to('cm').magnitude for d in ('dx', 'dy', 'dz')]
+    normal = np.identity(3)[int(np.argmin(halves))]
+    return np.array(starts).reshape(-1, 3), np.array(ends).reshape(-1, 3), normal
+
+def plane_pitch(starts, ends, normal):
+    '''
+    Unit pitch direction of a plane, pointing towards increasing channels.
+    '''
+    wdir = ends[0] - starts[0]
+    pitch = np.cross(normal, wdir)
+    pitch /= np.linalg.norm(pitch)
+    centers = 0.5*(starts + ends)
+    if len(centers) > 1 and np.dot(centers[-1] - centers[0], pitch) < 0:
+        pitch = -pitch
+    return pitch
+
+
+def collect_wires(geom, world=None):
+    '''
+    Walk the geometry from the world volume (default: the one of geom) and
+    return the wire records and the list of TPCs (path, volume, rotation,
+    translation).
+    '''
+    world = world or geom.world
+    store = geom.store.structure
+    has_tpc = {}
+    def contains_tpc(vname):
+        if vname not in has_tpc:
+            vol = store[vname]
+            has_tpc[vname] = is_tpc(vname) or any(contains_tpc(store[p].volume)
+                                                  for p in vol.placements or [])
+        return has_tpc[vname]
+
+    planes = {}
+    tpcs = []
+    records = []
+    def visit(vname, rot, trans, path):
+        vol = store[vname]
+        if is_tpc(vname):
+            tpc = len(tpcs)
+            tpcs.append(dict(path=path, volume=vname,
+                             rotation=rot.tolist(), translation=trans.tolist()))
+            iplane = 0
+            for pname in vol.placements or []:
+                place = store[pname]
+                if not is_plane(place.volume):
+                    continue
+                if place.volume not in planes:
+                    planes[place.volume] = plane_wires(geom, store[place.volume])
+                starts, ends, normal = planes[place.volume]
+                prot, ptrans = placement_transform(store, place)
+                wrot, wtrans = rot @ prot, rot @ ptrans + trans
+                rec = np.zeros(len(starts), dtype=WIRE_TABLE_DTYPE)
+                rec['tpc'] = tpc
+                rec['plane'] = iplane
+                rec['view'] = place.volume[len('volTPCPlane'):][:1]
+                rec['channel'] = np.arange(len(starts))
+                rec['start'] = starts @ wrot.T + wtrans
+                rec['end'] = ends @ wrot.T + wtrans
+                if len(starts):
+                    rec['pitch'] = wrot @ plane_pitch(starts, ends, normal)
+                records.append(rec)
+                iplane += 1
+            return
+        for pname in vol.placements or []:
+            place = store[pname]
+            if not contains_tpc(place.volume):
+                continue
+            prot, ptrans = placement_transform(store, place)
+            visit(place.volume, rot @ prot, rot @ ptrans + trans, path + '/' + pname)
+
+    visit(world, np.identity(3), np.zeros(3), world)
+    if records:
+        records = np.concatenate(records)
+    else:
+        records = np.zeros(0, dtype=WIRE_TABLE_DTYPE)
+    return records, tpcs
+
+
+def write_wire_table(geom, filename, world=None):
+    '''
+    Write the wire table of the geometry to <filename>.
+    '''
+    records, tpcs = collect_wires(geom, world)
+    header = json.dumps(dict(version=WIRE_TABLE_VERSION,
+                             units='cm',
+                             dtype=WIRE_TABLE_DTYPE.descr,
+                             nrecords=len(records),
+                             tpcs=tpcs)).encode()
+    offset = len(WIRE_TABLE_MAGIC) + 8 + len(header)
+    padding = -offset % WIRE_TABLE_ALIGN
+    with open(filename, 'wb') as f:
+        f.write(WIRE_TABLE_MAGIC)
+        f.write(np.array([WIRE_TABLE_VERSION, len(header) + padding], dtype='<u4').tobytes())
+        f.write(header + b' '*padding)
+        f.write(records.tobytes())
+    print("Wrote %d wires of %d TPCs to %s" % (len(records), len(tpcs), filename))
+
+def read_wire_table(filename):
+    '''
+    Return the header and the memory-mapped records of a wire table.
+    '''
+    with open(filename, 'rb') as f:
+        if f.read(len(WIRE_TABLE_MAGIC)) != WIRE_TABLE_MAGIC:
+            raise ValueError('Not a wire table: "%s"' % filename)
+        version, hlen = np.frombuffer(f.read(8), dtype='<u4')
+        if version > WIRE_TABLE_VERSION:
+            raise ValueError('Unsupported wire table version %d in "%s"' % (version, filename))
+        header = json.loads(f.read(hlen).decode())
+    offset = len(WIRE_TABLE_MAGIC) + 8 + int(hlen)
+    if header['nrecords'] == 0:
+        return header, np.zeros(0, dtype=WIRE_TABLE_DTYPE)
+    records = np.memmap(filename, dtype=WIRE_TABLE_DTYPE, mode='r',
+                        offset=offset, shape=(header['nrecords'],))
+    return header, records